@@ -26,6 +26,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "soc.metrics.MetricsMiddleware",
+    "soc.profiler.ProfilerMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -60,13 +62,43 @@ ASGI_APPLICATION = "config.asgi.application"
 CHANNEL_LAYERS = {
     "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
 }
+# Several daphne workers on one host: share a SQLite-backed layer (still no Redis)
+if os.environ.get("SOC_CHANNEL_LAYER", "memory") == "sqlite":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "soc.channel_layer.SQLiteChannelLayer",
+            "CONFIG": {"path": os.environ.get("SOC_CHANNEL_LAYER_PATH", str(BASE_DIR / "channels.sqlite3"))},
+        }
+    }
 
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": os.environ.get("SOC_DB_PATH", str(BASE_DIR / "db.sqlite3")),
     }
 }
+# "production": WAL, busy timeout and bigger caches on every new connection;
+# writes take the lock up front (BEGIN IMMEDIATE) instead of failing on upgrade
+SOC_SQLITE_PROFILE = os.environ.get("SOC_SQLITE_PROFILE", "default")
+if SOC_SQLITE_PROFILE == "production":
+    busy_timeout_ms = int(os.environ.get("SOC_SQLITE_BUSY_TIMEOUT_MS", "20000"))
+    DATABASES["default"]["OPTIONS"] = {
+        "timeout": busy_timeout_ms / 1000,
+        "transaction_mode": "IMMEDIATE",
+        "init_command": ";".join([
+            "PRAGMA journal_mode=WAL",
+            f"PRAGMA busy_timeout={busy_timeout_ms}",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA mmap_size={int(os.environ.get('SOC_SQLITE_MMAP_MB', '256')) * 1024 * 1024}",
+            f"PRAGMA cache_size=-{int(os.environ.get('SOC_SQLITE_CACHE_MB', '64')) * 1024}",
+            "PRAGMA temp_store=MEMORY",
+        ]),
+    }
+
+# Single writer: route ORM writes through one thread/connection in batched transactions
+SOC_DB_WRITER = os.environ.get("SOC_DB_WRITER", "0") == "1"
+SOC_DB_WRITER_BATCH = int(os.environ.get("SOC_DB_WRITER_BATCH", "200"))
+SOC_DB_WRITER_MAX_WAIT_MS = int(os.environ.get("SOC_DB_WRITER_MAX_WAIT_MS", "2"))
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -88,3 +120,68 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
 }
+
+# SOC ingest
+SOC_INGEST_BATCH_MAX = int(os.environ.get("SOC_INGEST_BATCH_MAX", "20000"))
+# "sync" writes in the request thread, "async" enqueues and returns 202
+SOC_INGEST_MODE = os.environ.get("SOC_INGEST_MODE", "sync")
+SOC_INGEST_QUEUE_HIGH_WATER = int(os.environ.get("SOC_INGEST_QUEUE_HIGH_WATER", "50000"))
+SOC_INGEST_QUEUE_BATCH_SIZE = int(os.environ.get("SOC_INGEST_QUEUE_BATCH_SIZE", "500"))
+SOC_INGEST_QUEUE_MAX_WAIT_MS = int(os.environ.get("SOC_INGEST_QUEUE_MAX_WAIT_MS", "50"))
+# attempts after a failed batch write (backoff 0.1s, doubling) before its events count as failed
+SOC_INGEST_QUEUE_RETRIES = int(os.environ.get("SOC_INGEST_QUEUE_RETRIES", "5"))
+SOC_INGEST_RETRY_AFTER = int(os.environ.get("SOC_INGEST_RETRY_AFTER", "1"))
+
+# Keyset pagination for /api/cases/ and /api/alerts/ (?page_size=)
+SOC_API_PAGE_SIZE = int(os.environ.get("SOC_API_PAGE_SIZE", "100"))
+SOC_API_MAX_PAGE_SIZE = int(os.environ.get("SOC_API_MAX_PAGE_SIZE", "1000"))
+# How long cidr= filters reuse a block's cached match count to pick the IP index or the created_at walk
+SOC_CIDR_STATS_SECONDS = int(os.environ.get("SOC_CIDR_STATS_SECONDS", "300"))
+
+# WebSocket coalescing: 0 sends every event as its own frame
+SOC_WS_COALESCE_MS = int(os.environ.get("SOC_WS_COALESCE_MS", "0"))
+SOC_WS_COALESCE_MAX_EVENTS = int(os.environ.get("SOC_WS_COALESCE_MAX_EVENTS", "200"))
+
+# Live dashboard views are reloaded from the rollups after this many seconds
+SOC_DASHBOARD_RESYNC_SECONDS = int(os.environ.get("SOC_DASHBOARD_RESYNC_SECONDS", "60"))
+
+# Alert aggregation: repeats within the window bump an existing alert (0 disables)
+SOC_AGGREGATION_WINDOW_SECONDS = int(os.environ.get("SOC_AGGREGATION_WINDOW_SECONDS", "0"))
+SOC_AGGREGATION_MAX_ENTRIES = int(os.environ.get("SOC_AGGREGATION_MAX_ENTRIES", "100000"))
+SOC_AGGREGATION_FLUSH_SECONDS = int(os.environ.get("SOC_AGGREGATION_FLUSH_SECONDS", "2"))
+
+# Rule engine: enabled rules raise severity / force a case on matching events
+SOC_RULES_ENABLED = os.environ.get("SOC_RULES_ENABLED", "0") == "1"
+SOC_RULES_RECHECK_SECONDS = int(os.environ.get("SOC_RULES_RECHECK_SECONDS", "30"))
+
+# Correlation: sliding-window thresholds per (client, type, key); "exact" or "sketch" (count-min)
+SOC_CORRELATION_ENABLED = os.environ.get("SOC_CORRELATION_ENABLED", "0") == "1"
+SOC_CORRELATION_MODE = os.environ.get("SOC_CORRELATION_MODE", "exact")
+SOC_CORRELATION_MAX_KEYS = int(os.environ.get("SOC_CORRELATION_MAX_KEYS", "100000"))
+SOC_CORRELATION_SKETCH_WIDTH = int(os.environ.get("SOC_CORRELATION_SKETCH_WIDTH", "16384"))
+SOC_CORRELATION_SKETCH_DEPTH = int(os.environ.get("SOC_CORRELATION_SKETCH_DEPTH", "4"))
+
+# Retention: archive_old_records writes per-day .jsonl.gz files here
+SOC_ARCHIVE_DIR = os.environ.get("SOC_ARCHIVE_DIR", str(BASE_DIR / "archive"))
+
+# Analytics: export_columnar writes memory-mappable column files here (read with soc.analytics)
+SOC_COLUMNAR_DIR = os.environ.get("SOC_COLUMNAR_DIR", str(BASE_DIR / "columnar"))
+
+# Full-text search: index alerts/cases as they are written (0 = only via rebuild_search_index)
+SOC_SEARCH_SYNC = os.environ.get("SOC_SEARCH_SYNC", "1") == "1"
+# Matches ranked per query (newest first); bounds latency for common terms on large tables
+SOC_SEARCH_MAX_CANDIDATES = int(os.environ.get("SOC_SEARCH_MAX_CANDIDATES", "10000"))
+
+# Observables (IOC) index: link event IPs/hosts/users/URLs/services to alerts and cases at ingest
+SOC_OBSERVABLES_ENABLED = os.environ.get("SOC_OBSERVABLES_ENABLED", "1") == "1"
+# "Related cases" ignores observables seen more often than this (too common to relate anything)
+SOC_OBSERVABLE_MAX_FANOUT = int(os.environ.get("SOC_OBSERVABLE_MAX_FANOUT", "1000"))
+
+# Per-route request metrics (latency, queries, DB/render time, bytes) served at /metrics
+SOC_METRICS_ENABLED = os.environ.get("SOC_METRICS_ENABLED", "1") == "1"
+
+# Sampling profiler, switched on at runtime with `manage.py profile_requests`; folded stacks land here
+SOC_PROFILE_DIR = os.environ.get("SOC_PROFILE_DIR", str(BASE_DIR / "profiles"))
+SOC_PROFILE_INTERVAL_MS = int(os.environ.get("SOC_PROFILE_INTERVAL_MS", "10"))
+# Oldest .folded files are deleted once the directory grows past this
+SOC_PROFILE_MAX_MB = int(os.environ.get("SOC_PROFILE_MAX_MB", "64"))
@@ -17,6 +17,9 @@ urlpatterns = [
     # Playbooks wiki
     path("playbooks/<slug:slug>/", soc_views.playbook_page, name="playbook"),
 
+    # Prometheus scrape target
+    path("metrics", soc_views.metrics_page, name="metrics"),
+
     # API
     path("api/", include("soc.api_urls")),
 ]
@@ -0,0 +1,182 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from django.db import close_old_connections, connection, transaction
+
+from .models import Alert
+from .db_writer import run_write
+
+def event_fingerprint(event: dict, client_id: int) -> str:
+    """
+    Identity of "the same alert": client, incident type, severity, source,
+    host and user/url. Severity is part of it so a repeat that comes in (or
+    is raised by a rule) at a higher severity is a new alert, and opens a
+    case, instead of disappearing into the count of a lower one.
+    """
+    parts = [
+        str(client_id),
+        str(event.get("incident_type", "")),
+        str(event.get("severity", "")),
+        str(event.get("source_ip", "")),
+        str(event.get("hostname") or event.get("host_ip") or ""),
+        str(event.get("username") or event.get("url") or ""),
+    ]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+@dataclass
+class _Entry:
+    alert_id: int
+    last_seen: float
+
+@dataclass
+class FoldResult:
+    leaders: list = field(default_factory=list)       # (index, event, client_id) rows to insert
+    counts: list = field(default_factory=list)        # events folded into each leader
+    fingerprints: list = field(default_factory=list)  # fingerprint of each leader
+    folded: list = field(default_factory=list)        # (index, alert_id) absorbed by an existing alert
+    followers: list = field(default_factory=list)     # (index, leader position) duplicates in this batch
+
+class AlertAggregator:
+    """
+    Folds repeated events into the alert already written for their fingerprint.
+
+    An LRU of fingerprint -> alert id (at most ``max_entries``) is kept per
+    process; an event whose fingerprint was seen within ``window`` seconds
+    (sliding) only bumps that alert's count/last_seen. Those bumps are
+    buffered and written in one executemany every ``flush_interval`` seconds.
+    """
+
+    def __init__(self, window: float, max_entries: int, flush_interval: float):
+        self.window = window
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._lru: OrderedDict[str, _Entry] = OrderedDict()
+        self._pending: dict[int, list] = {}  # alert_id -> [extra count, last_seen epoch]
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+
+    def fold(self, accepted: list[tuple[int, dict, int]]) -> FoldResult:
+        now = time.time()
+        out = FoldResult()
+        leader_pos: dict[str, int] = {}
+        with self._lock:
+            for i, event, client_id in accepted:
+                fp = event_fingerprint(event, client_id)
+                entry = self._lru.get(fp)
+                if entry is not None and now - entry.last_seen <= self.window:
+                    entry.last_seen = now
+                    self._lru.move_to_end(fp)
+                    pending = self._pending.setdefault(entry.alert_id, [0, now])
+                    pending[0] += 1
+                    pending[1] = now
+                    out.folded.append((i, entry.alert_id))
+                    self.hits += 1
+                elif fp in leader_pos:
+                    pos = leader_pos[fp]
+                    out.counts[pos] += 1
+                    out.followers.append((i, pos))
+                    self.hits += 1
+                else:
+                    leader_pos[fp] = len(out.leaders)
+                    out.leaders.append((i, event, client_id))
+                    out.counts.append(1)
+                    out.fingerprints.append(fp)
+                    self.misses += 1
+        if out.folded:
+            self._ensure_flusher()
+        return out
+
+    def register(self, fingerprints: list[str], alerts: list[Alert]):
+        """Remember freshly inserted alerts so later events fold into them."""
+        now = time.time()
+        with self._lock:
+            for fp, alert in zip(fingerprints, alerts):
+                self._lru[fp] = _Entry(alert_id=alert.id, last_seen=now)
+                self._lru.move_to_end(fp)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self.evictions += 1
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        table = Alert._meta.db_table
+        to_db = connection.ops.adapt_datetimefield_value
+        params = [
+            (n, to_db(datetime.fromtimestamp(last, tz=dt_timezone.utc)), alert_id)
+            for alert_id, (n, last) in pending.items()
+        ]
+        try:
+            with transaction.atomic(), connection.cursor() as cur:
+                cur.executemany(f"UPDATE {table} SET count = count + %s, last_seen = %s WHERE id = %s", params)
+        except Exception:
+            # put the bumps back, merged with any folded meanwhile, for the next flush
+            with self._lock:
+                for alert_id, (n, last) in pending.items():
+                    current = self._pending.setdefault(alert_id, [0, last])
+                    current[0] += n
+                    current[1] = max(current[1], last)
+            raise
+        self.flushes += 1
+        return len(params)
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._flush_loop, name="soc-alert-aggregator", daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                close_old_connections()
+                run_write(self.flush)
+            except Exception as e:
+                print("Alert aggregator flush error:", e)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "window_seconds": self.window,
+            "entries": len(self._lru),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "pending_updates": len(self._pending),
+            "flushes": self.flushes,
+        }
+
+_aggregator: AlertAggregator | None = None
+_aggregator_lock = threading.Lock()
+
+def get_aggregator() -> AlertAggregator | None:
+    """The shared aggregator, or None when SOC_AGGREGATION_WINDOW_SECONDS is 0."""
+    from django.conf import settings
+    global _aggregator
+    if settings.SOC_AGGREGATION_WINDOW_SECONDS <= 0:
+        return None
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = AlertAggregator(
+                    window=settings.SOC_AGGREGATION_WINDOW_SECONDS,
+                    max_entries=settings.SOC_AGGREGATION_MAX_ENTRIES,
+                    flush_interval=settings.SOC_AGGREGATION_FLUSH_SECONDS,
+                )
+    return _aggregator
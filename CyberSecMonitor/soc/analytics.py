@@ -0,0 +1,136 @@
+"""
+Columnar snapshots of soc_alert / soc_case for notebooks and offline analysis.
+
+``manage.py export_columnar`` appends new rows to one raw little-endian file
+per column under ``<dir>/<kind>/`` and then rewrites ``meta.json`` (row count,
+last exported id, dtypes, category labels). Readers trust only the first
+``rows`` entries of each file, so an export that dies half way is invisible.
+
+Timestamps are int64 nanoseconds since the epoch (UTC), so they view as
+datetime64[ns] without a copy. Enumerations are int8 codes into the labels
+stored in the meta (-1 = unknown), client ids int32.
+
+This module only needs NumPy (and pandas for ``frame``), not Django, so
+notebooks can import it without settings.
+"""
+import json
+import os
+from pathlib import Path
+import numpy as np
+
+SEVERITIES = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+INCIDENT_TYPES = [
+    "BRUTE_FORCE", "SQL_INJECTION", "XSS", "PATH_TRAVERSAL", "SUSPICIOUS_SERVICE",
+    "DDOS_BOT", "DATA_THEFT", "PHISHING", "INSIDER", "CRYPTOJACK",
+]
+CASE_STATUSES = ["OPEN", "IN_PROGRESS", "RESOLVED"]
+VERDICTS = ["TRUE_POSITIVE", "FALSE_POSITIVE", "DUPLICATE", "OTHER"]
+
+# kind -> column -> (dtype, labels for categorical columns)
+COLUMNS = {
+    "alerts": {
+        "id": ("<i8", None),
+        "created_at": ("<i8", None),
+        "client_id": ("<i4", None),
+        "severity": ("i1", SEVERITIES),
+        "incident_type": ("i1", INCIDENT_TYPES),
+        "count": ("<i4", None),
+    },
+    "cases": {
+        "id": ("<i8", None),
+        "created_at": ("<i8", None),
+        "client_id": ("<i4", None),
+        "severity": ("i1", SEVERITIES),
+        "incident_type": ("i1", INCIDENT_TYPES),
+        "status": ("i1", CASE_STATUSES),
+        "verdict": ("i1", VERDICTS),
+    },
+}
+# columns that change after a row is written (aggregation bumps, triage); the export patches them in place
+MUTABLE_COLUMNS = {"alerts": ["count"], "cases": ["status", "verdict"]}
+TIMESTAMP_COLUMNS = {"created_at"}
+
+META_FILE = "meta.json"
+
+def column_path(directory, kind: str, column: str) -> Path:
+    return Path(directory) / kind / f"{column}.bin"
+
+def read_meta(directory, kind: str) -> dict:
+    """Meta of an export, or an empty one (0 rows) when nothing was exported yet."""
+    try:
+        return json.loads((Path(directory) / kind / META_FILE).read_text())
+    except FileNotFoundError:
+        return {
+            "rows": 0,
+            "last_id": 0,
+            "columns": {column: dtype for column, (dtype, _) in COLUMNS[kind].items()},
+            "categories": {column: labels for column, (_, labels) in COLUMNS[kind].items() if labels},
+        }
+
+def write_meta(directory, kind: str, meta: dict):
+    path = Path(directory) / kind / META_FILE
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(meta, indent=1))
+    os.replace(tmp, path)
+
+def encode(values, labels: list[str]) -> np.ndarray:
+    codes = {label: i for i, label in enumerate(labels)}
+    return np.fromiter((codes.get(v, -1) for v in values), dtype="i1", count=len(values))
+
+def open_columns(directory, kind: str, start: int = 0, rows: int | None = None) -> dict[str, np.ndarray]:
+    """
+    Read-only memmaps of rows [start, rows) of every column; nothing is
+    read from disk until the arrays are touched. ``rows`` defaults to the
+    exported row count.
+    """
+    meta = read_meta(directory, kind)
+    rows = meta["rows"] if rows is None else min(rows, meta["rows"])
+    arrays = {}
+    for column, dtype in meta["columns"].items():
+        if rows <= start:
+            arrays[column] = np.empty(0, dtype=dtype)
+            continue
+        path = column_path(directory, kind, column)
+        arrays[column] = np.memmap(path, dtype=dtype, mode="r", shape=(rows,))[start:]
+    return arrays
+
+def frame(directory, kind: str, start: int = 0, rows: int | None = None):
+    """
+    pandas DataFrame over the memmaps: numeric columns and created_at
+    (datetime64[ns], naive UTC) are views, enumerations Categoricals over
+    the int8 codes.
+    """
+    import pandas as pd
+
+    meta = read_meta(directory, kind)
+    labels = meta.get("categories", {})
+    data = {}
+    for column, values in open_columns(directory, kind, start, rows).items():
+        if column in TIMESTAMP_COLUMNS:
+            # naive UTC like the database; tz_localize would copy the column
+            data[column] = pd.DatetimeIndex(values.view("datetime64[ns]"), copy=False)
+        elif column in labels:
+            data[column] = pd.Categorical.from_codes(values, categories=labels[column], validate=False)
+        else:
+            data[column] = values
+    return pd.DataFrame(data, copy=False)
+
+class Snapshot:
+    """
+    Keeps an export open across refreshes: ``refresh()`` returns only the
+    rows appended since the previous call (and remaps the files).
+
+        snap = Snapshot("columnar", "alerts")
+        df = snap.refresh()       # everything exported so far
+        ...                       # export_columnar runs again
+        new = snap.refresh()      # just the tail
+    """
+
+    def __init__(self, directory, kind: str):
+        self.directory = directory
+        self.kind = kind
+        self.rows = 0
+
+    def refresh(self):
+        start, self.rows = self.rows, read_meta(self.directory, self.kind)["rows"]
+        return frame(self.directory, self.kind, start, self.rows)
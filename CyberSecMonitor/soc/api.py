@@ -1,27 +1,73 @@
+import json
 from datetime import timedelta
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
 from django.utils import timezone
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import generics
 from rest_framework.permissions import AllowAny
+from rest_framework.utils.urls import replace_query_param
 
-from .models import Case, Alert, Rule, Task, Dispatch, DispatchChannel, Verdict, CaseStatus
+from .models import (
+    Case, Alert, Rule, Task, Dispatch, DispatchChannel, Verdict, CaseStatus, Observable, ObservableLink,
+    ObservableType,
+)
 from core.models import Client, Employee
-from .serializers import CaseSerializer, AlertSerializer, RuleSerializer, EmployeeSerializer, ClientSerializer
+from .serializers import (
+    CaseSerializer, CaseListSerializer, AlertSerializer, AlertListSerializer,
+    RuleSerializer, EmployeeSerializer, ClientSerializer,
+)
 from .filters import CaseFilter, AlertFilter
-from .services import compute_dashboard, ingest_event
+from .pagination import KeysetPagination
+from .services import get_live_dashboard, ingest_event, ingest_events, validate_event
+from .ingest_queue import get_ingest_queue, async_ingest_enabled
+from .aggregation import get_aggregator
+from .correlation import get_correlation_engine
+from .archive import load_archived
+from .db_writer import run_write
+from .exports import EXPORTS, export_queryset, iter_csv, iter_ndjson, parse_bound
+from .search import INDEXES, SearchSyntaxError, search
+from . import observables
 
 class CaseListAPI(generics.ListAPIView):
     queryset = Case.objects.all().order_by("-created_at")
-    serializer_class = CaseSerializer
+    serializer_class = CaseListSerializer
     filterset_class = CaseFilter
+    pagination_class = KeysetPagination
     permission_classes = [AllowAny]
 
-class CaseDetailAPI(generics.RetrieveUpdateAPIView):
+    def get_queryset(self):
+        qs = super().get_queryset()
+        fields = self.serializer_class.resolve_fields(self.request.query_params)
+        if "evidence" not in fields:
+            qs = qs.defer("evidence")
+        else:
+            qs = qs.select_related("blob")
+        if "tasks" in fields:
+            qs = qs.prefetch_related("tasks")
+        return qs
+
+class ArchiveFallbackMixin:
+    """Detail views that read records moved out by archive_old_records (read-only)."""
+    archive_kind = ""
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if self.request.method != "GET":
+                raise
+            obj = load_archived(self.archive_kind, self.kwargs["pk"])
+            if obj is None:
+                raise
+            return obj
+
+class CaseDetailAPI(ArchiveFallbackMixin, generics.RetrieveUpdateAPIView):
     queryset = Case.objects.all()
     serializer_class = CaseSerializer
     permission_classes = [AllowAny]
+    archive_kind = "cases"
 
     def patch(self, request, *args, **kwargs):
         case = self.get_object()
@@ -31,7 +77,7 @@ class CaseDetailAPI(generics.RetrieveUpdateAPIView):
             if k in allowed:
                 setattr(case, k, v)
         case.updated_at = timezone.now()
-        case.save()
+        run_write(case.save)
         return Response(CaseSerializer(case).data)
 
 @api_view(["POST"])
@@ -40,22 +86,37 @@ def case_add_task(request, case_id: int):
     title = (request.data.get("title") or "").strip()
     if not title:
         return Response({"ok": False, "error": "title required"}, status=400)
-    t = Task.objects.create(case=case, title=title, done=False)
+    t = run_write(Task.objects.create, case=case, title=title, done=False)
     return Response({"ok": True, "task_id": t.id})
 
 @api_view(["POST"])
 def case_toggle_task(request, case_id: int, task_id: int):
     t = Task.objects.get(id=task_id, case_id=case_id)
     t.done = not t.done
-    t.save()
+    run_write(t.save)
     return Response({"ok": True, "done": t.done})
 
 class AlertListAPI(generics.ListAPIView):
     queryset = Alert.objects.all().order_by("-created_at")
-    serializer_class = AlertSerializer
+    serializer_class = AlertListSerializer
     filterset_class = AlertFilter
+    pagination_class = KeysetPagination
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if "raw_event" not in self.serializer_class.resolve_fields(self.request.query_params):
+            qs = qs.defer("raw_event")
+        else:
+            qs = qs.select_related("blob")
+        return qs
+
+class AlertDetailAPI(ArchiveFallbackMixin, generics.RetrieveAPIView):
+    queryset = Alert.objects.all()
+    serializer_class = AlertSerializer
+    permission_classes = [AllowAny]
+    archive_kind = "alerts"
+
 class RuleListAPI(generics.ListAPIView):
     queryset = Rule.objects.filter(enabled=True).order_by("incident_type")
     serializer_class = RuleSerializer
@@ -81,9 +142,11 @@ class EmployeeListAPI(generics.ListAPIView):
 def dashboard_api(request):
     client_id = request.query_params.get("client")
     client = Client.objects.filter(id=client_id).first() if client_id else None
-    stats = compute_dashboard(client)
+    stats = get_live_dashboard().stats(client)
     return Response({
+        "client_id": client.id if client else None,
         "total_alerts_today": stats.total_alerts_today,
+        "severity_counts": stats.severity_counts,
         "severity_percent": stats.severity_percent,
         "last_scan_seconds_ago": stats.last_scan_seconds_ago,
         "incidents_today": stats.incidents_today,
@@ -91,11 +154,97 @@ def dashboard_api(request):
         "threat_map_points": stats.threat_map_points,
     })
 
+def _throttled_response():
+    q = get_ingest_queue()
+    resp = Response(
+        {"ok": False, "error": "ingest queue full", "depth": q.depth(), "high_water": q.high_water},
+        status=429,
+    )
+    resp["Retry-After"] = str(settings.SOC_INGEST_RETRY_AFTER)
+    return resp
+
 @api_view(["POST"])
 def ingest_api(request):
+    if async_ingest_enabled():
+        error = validate_event(request.data)
+        if error:
+            return Response({"ok": False, "error": error}, status=400)
+        if not get_ingest_queue().offer([dict(request.data)]):
+            return _throttled_response()
+        return Response({"ok": True, "queued": True}, status=202)
+
     alert, case = ingest_event(request.data)
     return Response({"ok": True, "alert_id": alert.id, "case_id": case.id if case else None})
 
+def _parse_event_batch(request) -> list:
+    """Body is either a JSON array of events or NDJSON (one event per line)."""
+    body = request.body.decode("utf-8")
+    if "ndjson" in (request.content_type or "") or not body.lstrip().startswith("["):
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    return json.loads(body)
+
+@api_view(["POST"])
+def ingest_batch_api(request):
+    try:
+        events = _parse_event_batch(request)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        return Response({"ok": False, "error": f"invalid body: {e}"}, status=400)
+    if not isinstance(events, list):
+        return Response({"ok": False, "error": "expected a JSON array or NDJSON"}, status=400)
+    if len(events) > settings.SOC_INGEST_BATCH_MAX:
+        return Response({"ok": False, "error": f"batch too large (max {settings.SOC_INGEST_BATCH_MAX})"}, status=413)
+
+    if async_ingest_enabled():
+        # offer() is all-or-none, so a batch over the high-water mark would get 429 forever
+        high_water = get_ingest_queue().high_water
+        if len(events) > high_water:
+            return Response({"ok": False, "error": f"batch too large for async ingest (max {high_water})"},
+                            status=413)
+        results = []
+        queued = []
+        for i, event in enumerate(events):
+            error = validate_event(event)
+            if error:
+                results.append({"index": i, "ok": False, "error": error})
+            else:
+                results.append({"index": i, "ok": True, "queued": True})
+                queued.append(event)
+        if queued and not get_ingest_queue().offer(queued):
+            return _throttled_response()
+        return Response({
+            "ok": len(queued) == len(results),
+            "accepted": len(queued),
+            "rejected": len(results) - len(queued),
+            "results": results,
+        }, status=202)
+
+    results = ingest_events(events)
+    accepted = sum(1 for r in results if r["ok"])
+    return Response({
+        "ok": accepted == len(results),
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "results": results,
+    })
+
+@api_view(["GET"])
+def ingest_queue_api(request):
+    return Response({"mode": settings.SOC_INGEST_MODE, **get_ingest_queue().metrics()})
+
+@api_view(["GET"])
+def ingest_aggregation_api(request):
+    aggregator = get_aggregator()
+    if aggregator is None:
+        return Response({"enabled": False})
+    return Response({"enabled": True, **aggregator.stats()})
+
+@api_view(["GET"])
+def ingest_correlation_api(request):
+    engine = get_correlation_engine()
+    if engine is None:
+        return Response({"enabled": False})
+    return Response({"enabled": True, **engine.stats()})
+
 @api_view(["POST"])
 def dispatch_case(request, case_id: int):
     case = Case.objects.get(id=case_id)
@@ -103,22 +252,91 @@ def dispatch_case(request, case_id: int):
     recipients = request.data.get("recipients", [])
     if channel not in DispatchChannel.values:
         return Response({"ok": False, "error": "invalid channel"}, status=400)
-    d = Dispatch.objects.create(case=case, channel=channel, recipients=recipients, sent_at=timezone.now())
+    d = run_write(Dispatch.objects.create, case=case, channel=channel, recipients=recipients, sent_at=timezone.now())
     return Response({"ok": True, "dispatch_id": d.id})
 
+def _export_response(kind: str, fmt: str, qs, filename: str):
+    if fmt == "csv":
+        resp = StreamingHttpResponse(iter_csv(kind, qs), content_type="text/csv")
+    else:
+        resp = StreamingHttpResponse(iter_ndjson(kind, qs), content_type="application/x-ndjson")
+    resp["Content-Disposition"] = f"attachment; filename={filename}"
+    return resp
+
 @api_view(["GET"])
+def export_records(request, kind: str, fmt: str):
+    """Stream cases/alerts as CSV or NDJSON for ?from=&to= plus the list filters."""
+    if kind not in EXPORTS or fmt not in ("csv", "ndjson"):
+        return Response({"ok": False, "error": "unknown export"}, status=404)
+    try:
+        start = parse_bound(request.query_params.get("from", ""))
+        end = parse_bound(request.query_params.get("to", ""), end=True)
+    except ValueError as e:
+        return Response({"ok": False, "error": str(e)}, status=400)
+    qs = export_queryset(kind, request.query_params, start, end)
+    return _export_response(kind, fmt, qs, f"{kind}.{fmt}")
 
 @api_view(["GET"])
 def export_today_cases_csv(request):
     start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    qs = Case.objects.filter(created_at__gte=start).order_by("-created_at")
-    lines = ["case_id,created_at,client,severity,incident_type,status,verdict,title,source_ip,host_ip,hostname"]
-    for c in qs:
-        safe_title = (c.title or "").replace('"', '""')
-        lines.append(
-            f'{c.id},{c.created_at.isoformat()},{c.client.name},{c.severity},{c.incident_type},{c.status},{c.verdict},"{safe_title}",{c.source_ip},{c.host_ip},{c.hostname}'
-        )
-    content = "\n".join(lines)
-    resp = HttpResponse(content, content_type="text/csv")
-    resp["Content-Disposition"] = "attachment; filename=today_cases.csv"
-    return resp
+    qs = export_queryset("cases", {}, start=start)
+    return _export_response("cases", "csv", qs, "today_cases.csv")
+
+@api_view(["GET"])
+def search_api(request):
+    """
+    Full-text search over cases and alerts: ?q= plus kind=cases|alerts,
+    severity, incident_type, client, today, from/to; best matches first.
+    """
+    params = request.query_params
+    kinds = [params["kind"]] if params.get("kind") else list(INDEXES)
+    if any(k not in INDEXES for k in kinds):
+        return Response({"ok": False, "error": "kind must be cases or alerts"}, status=400)
+    try:
+        start = parse_bound(params.get("from", ""))
+        end = parse_bound(params.get("to", ""), end=True)
+    except ValueError as e:
+        return Response({"ok": False, "error": str(e)}, status=400)
+    if params.get("today") in ("true", "True", "1"):
+        start = max(filter(None, [start, timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)]))
+    filters = {
+        "client_id": params.get("client"),
+        "severity": params.get("severity"),
+        "incident_type": params.get("incident_type"),
+        "start": start,
+        "end": end,
+    }
+    if filters["client_id"] and not filters["client_id"].isdigit():
+        return Response({"ok": False, "error": "client must be an id"}, status=400)
+    try:
+        results, cursor = search(params.get("q", ""), kinds, filters, params.get("cursor", ""),
+                                 limit=KeysetPagination().get_page_size(request))
+    except SearchSyntaxError as e:
+        return Response({"ok": False, "error": str(e)}, status=400)
+    next_link = replace_query_param(request.build_absolute_uri(), "cursor", cursor) if cursor else None
+    return Response({"next": next_link, "results": results})
+
+@api_view(["GET"])
+def observable_api(request, type: str, value: str):
+    """Cases and alerts carrying one observable, newest first, keyset-paged (?kind=case|alert)."""
+    if type not in ObservableType.values:
+        return Response({"ok": False, "error": f"unknown observable type: {type}"}, status=400)
+    observable = Observable.objects.filter(type=type, value=observables.normalize(type, value)).first()
+    if observable is None:
+        raise Http404
+    links = ObservableLink.objects.filter(observable=observable)
+    kind = request.query_params.get("kind")
+    if kind:
+        links = links.filter(kind=kind)
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(links, request)
+    response = paginator.get_paginated_response(observables.hydrate(page))
+    response.data = {
+        "type": observable.type,
+        "value": observable.value,
+        "sightings": observable.sightings,
+        "first_seen": observable.first_seen,
+        "last_seen": observable.last_seen,
+        **response.data,
+    }
+    return response
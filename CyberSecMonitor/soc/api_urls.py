@@ -4,14 +4,22 @@ from . import api
 urlpatterns = [
     path("dashboard/", api.dashboard_api),
     path("ingest/", api.ingest_api),
+    path("ingest/batch/", api.ingest_batch_api),
+    path("ingest/queue/", api.ingest_queue_api),
+    path("ingest/aggregation/", api.ingest_aggregation_api),
+    path("ingest/correlation/", api.ingest_correlation_api),
     path("cases/", api.CaseListAPI.as_view()),
     path("cases/<int:pk>/", api.CaseDetailAPI.as_view()),
     path("cases/<int:case_id>/tasks/add/", api.case_add_task),
     path("cases/<int:case_id>/tasks/<int:task_id>/toggle/", api.case_toggle_task),
     path("alerts/", api.AlertListAPI.as_view()),
+    path("alerts/<int:pk>/", api.AlertDetailAPI.as_view()),
     path("rules/", api.RuleListAPI.as_view()),
     path("clients/", api.ClientListAPI.as_view()),
     path("employees/", api.EmployeeListAPI.as_view()),
     path("cases/<int:case_id>/dispatch/", api.dispatch_case),
     path("reports/today.csv", api.export_today_cases_csv),
+    path("export/<slug:kind>.<slug:fmt>", api.export_records),
+    path("search/", api.search_api),
+    path("observables/<slug:type>/<path:value>/", api.observable_api),
 ]
@@ -6,6 +6,9 @@ class SocConfig(AppConfig):
     name = "soc"
 
     def ready(self):
+        from . import rules  # noqa: F401  (Rule save/delete signals)
+        from . import search  # noqa: F401  (Alert/Case index signals)
+
         # чтобы не запускалось дважды из-за приколов StatReloader
         if os.environ.get("RUN_MAIN") != "true":
             return
@@ -0,0 +1,157 @@
+import gzip
+import json
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from django.conf import settings
+from django.db import models
+from django.utils.dateparse import parse_datetime
+
+from .exports import ExportJSONEncoder
+from .models import Alert, Case, Task
+
+# kind -> hot table model
+ARCHIVED_MODELS = {"alerts": Alert, "cases": Case}
+
+_lock = threading.Lock()
+
+def kind_dir(kind: str) -> Path:
+    return Path(settings.SOC_ARCHIVE_DIR) / kind
+
+def day_paths(kind: str, day: date) -> tuple[Path, Path]:
+    """(<day>.jsonl.gz, <day>.idx.json) for one archived day."""
+    base = kind_dir(kind) / day.isoformat()
+    return base.with_suffix(".jsonl.gz"), base.with_suffix(".idx.json")
+
+def _read_json(path: Path, default):
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return default
+
+def _write_json(path: Path, data):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+def append_day(kind: str, day: date, records: list[dict]):
+    """
+    Append records to a day's archive as one gzip member, then record the
+    member's byte range, id range and time range in the sidecar index and
+    the per-kind manifest. Readers decompress only the member they need.
+    """
+    if not records:
+        return
+    data_path, index_path = day_paths(kind, day)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    body = "".join(json.dumps(r, cls=ExportJSONEncoder) + "\n" for r in records).encode()
+    ids = [r["id"] for r in records]
+    times = [r["created_at"].isoformat() for r in records]
+
+    with _lock:
+        with open(data_path, "ab") as f:
+            offset = f.tell()
+            f.write(gzip.compress(body, compresslevel=6))
+            f.flush()
+            os.fsync(f.fileno())
+            length = f.tell() - offset
+
+        index = _read_json(index_path, {"day": day.isoformat(), "count": 0, "members": []})
+        index["members"].append({
+            "offset": offset,
+            "length": length,
+            "count": len(records),
+            "min_id": min(ids),
+            "max_id": max(ids),
+            "first": min(times),
+            "last": max(times),
+        })
+        index["count"] += len(records)
+        _write_json(index_path, index)
+
+        manifest_path = kind_dir(kind) / "manifest.json"
+        manifest = _read_json(manifest_path, {})
+        lo, hi, count = manifest.get(day.isoformat(), [min(ids), max(ids), 0])
+        manifest[day.isoformat()] = [min(lo, *ids), max(hi, *ids), count + len(records)]
+        _write_json(manifest_path, manifest)
+
+def record_cutoff(cutoff: datetime):
+    """Remember that rows older than ``cutoff`` may have been moved out of the hot tables."""
+    path = Path(settings.SOC_ARCHIVE_DIR) / "cutoff.json"
+    with _lock:
+        previous = archived_before()
+        if previous is None or cutoff > previous:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_json(path, {"archived_before": cutoff.isoformat()})
+
+def archived_before() -> datetime | None:
+    """The latest archive cutoff, or None if nothing was ever archived."""
+    data = _read_json(Path(settings.SOC_ARCHIVE_DIR) / "cutoff.json", None)
+    return parse_datetime(data["archived_before"]) if data else None
+
+_index_cache: dict[Path, tuple[int, object]] = {}
+
+def _cached_json(path: Path):
+    """JSON file contents, re-read only when the file changes."""
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _index_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = _index_cache[path] = (mtime, json.loads(path.read_text()))
+    return cached[1]
+
+def find_record(kind: str, pk: int) -> dict | None:
+    """Look an archived record up by id: manifest -> day index -> one gzip member."""
+    manifest = _cached_json(kind_dir(kind) / "manifest.json") or {}
+    for day, (lo, hi, _) in manifest.items():
+        if not lo <= pk <= hi:
+            continue
+        data_path, index_path = day_paths(kind, date.fromisoformat(day))
+        index = _cached_json(index_path) or {"members": []}
+        for member in index["members"]:
+            if not member["min_id"] <= pk <= member["max_id"]:
+                continue
+            with open(data_path, "rb") as f:
+                f.seek(member["offset"])
+                chunk = gzip.decompress(f.read(member["length"]))
+            for line in chunk.splitlines():
+                record = json.loads(line)
+                if record["id"] == pk:
+                    return record
+    return None
+
+def iter_day(kind: str, day: date):
+    """Every record archived for one day, in archive order."""
+    data_path, _ = day_paths(kind, day)
+    if not data_path.exists():
+        return
+    with gzip.open(data_path, "rt") as f:
+        for line in f:
+            yield json.loads(line)
+
+def _instance(model, record: dict):
+    values = {}
+    for f in model._meta.concrete_fields:
+        if f.attname not in record:
+            continue
+        value = record[f.attname]
+        if isinstance(f, models.DateTimeField) and isinstance(value, str):
+            value = parse_datetime(value)
+        values[f.attname] = value
+    return model(**values)
+
+def load_archived(kind: str, pk: int):
+    """
+    An unsaved model instance rebuilt from the archive, or None.
+    Archived cases come back with their tasks attached.
+    """
+    record = find_record(kind, int(pk))
+    if record is None:
+        return None
+    obj = _instance(ARCHIVED_MODELS[kind], record)
+    if kind == "cases":
+        obj._prefetched_objects_cache = {"tasks": [_instance(Task, t) for t in record.get("tasks", [])]}
+    return obj
@@ -6,6 +6,8 @@ from django.db import transaction
 
 from soc.models import Alert, Case
 from soc.ws import broadcast_event
+from soc.services import update_rollups, get_live_dashboard
+from soc.db_writer import run_write
 
 from core.models import Client
 
@@ -40,6 +42,8 @@ def _create_event():
             incident_type=inc,
             title=title,
             created_at=now,
+            first_seen=now,
+            last_seen=now,
         )
 
         # кейс создаётся не всегда 
@@ -53,15 +57,19 @@ def _create_event():
                 created_at=now,
             )
 
+            update_rollups([alert], [case])
+            get_live_dashboard().record([alert], [case])
             broadcast_event("new_case", case)
 
         else:
+            update_rollups([alert])
+            get_live_dashboard().record([alert])
             broadcast_event("new_alert", alert)
 
 def generator_loop():
     while True:
         try:
-            _create_event()
+            run_write(_create_event)
             _sleep_realistic()
         except Exception as e:
             print("Background generator error:", e)
@@ -0,0 +1,160 @@
+import itertools
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from core.models import Client
+from .models import Case, CaseStatus
+from .api import AlertListAPI, CaseDetailAPI, CaseListAPI, export_records
+from .services import compute_dashboard, ingest_event
+from .ws import _group_send, groups_for_event, subscription_groups
+from .management.commands.run_log_generator import build_event
+
+# seed_history --alerts for each named dataset
+DATASETS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+CASE_FILTERS = ["", "incident_type=BRUTE_FORCE", "severity=HIGH", "status=OPEN", "verdict=TRUE_POSITIVE",
+                "today=true"]
+ALERT_FILTERS = ["", "incident_type=SQL_INJECTION", "severity=CRITICAL", "today=true"]
+
+@dataclass
+class Bench:
+    name: str
+    run: object  # () -> None
+    setup: object = None  # () -> None, untimed, before every run
+
+@dataclass
+class BenchResult:
+    name: str
+    runs: int
+    wall_ms: dict = field(default_factory=dict)
+    queries: int = 0
+    peak_kb: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {"runs": self.runs, "wall_ms": self.wall_ms, "queries": self.queries, "peak_kb": self.peak_kb}
+
+def measure(bench: Bench, repeat: int) -> BenchResult:
+    """
+    One warm-up run, ``repeat`` timed runs, then one instrumented run for
+    the query count and tracemalloc peak (kept out of the timings, since
+    both instruments slow the code they watch).
+    """
+    def once():
+        if bench.setup:
+            bench.setup()
+        started = time.perf_counter()
+        bench.run()
+        return time.perf_counter() - started
+
+    once()
+    timings = sorted(once() for _ in range(repeat))
+    if bench.setup:
+        bench.setup()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as ctx:
+            bench.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return BenchResult(
+        name=bench.name,
+        runs=repeat,
+        wall_ms={
+            "median": round(statistics.median(timings) * 1000, 3),
+            "min": round(timings[0] * 1000, 3),
+            "max": round(timings[-1] * 1000, 3),
+        },
+        queries=len(ctx.captured_queries),
+        peak_kb=round(peak / 1024, 1),
+    )
+
+def _get(view, path: str, query: str = "", **kwargs):
+    def run():
+        response = view(APIRequestFactory().get(f"{path}?{query}" if query else path), **kwargs)
+        if getattr(response, "streaming", False):
+            for _ in response.streaming_content:
+                pass
+        else:
+            response.render()
+    return run
+
+def _fanout(sockets: int, events: int) -> Bench:
+    """group_send cost of publishing ``events`` to ``sockets`` all-clients subscribers (in-memory layer)."""
+    layer = get_channel_layer()
+    groups = subscription_groups([], "LOW")
+
+    async def subscribe():
+        await layer.flush()
+        for _ in range(sockets):
+            channel = await layer.new_channel()
+            for group in groups:
+                await layer.group_add(group, channel)
+
+    payloads = [{"event": "alert_created", **build_event(1)} for _ in range(events)]
+
+    def run():
+        for payload in payloads:
+            for group in groups_for_event(payload):
+                _group_send(group, {"type": "broadcast", "payload": payload})
+
+    return Bench(f"ws_fanout[{sockets} sockets x {events} events]", run, setup=async_to_sync(subscribe))
+
+def build_benches(sockets: int = 100) -> list[Bench]:
+    client = Client.objects.order_by("id").first()
+    case_id = Case.objects.order_by("-id").values_list("id", flat=True).first()
+    since = (timezone.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    statuses = itertools.cycle([CaseStatus.OPEN, CaseStatus.IN_PROGRESS])
+
+    benches = [
+        Bench("ingest_event", lambda: ingest_event(build_event(client.id))),
+        Bench("compute_dashboard[global]", lambda: compute_dashboard()),
+        Bench("compute_dashboard[client]", lambda: compute_dashboard(client)),
+    ]
+    cases_view, alerts_view = CaseListAPI.as_view(), AlertListAPI.as_view()
+    benches += [Bench(f"CaseListAPI[{q or 'all'}]", _get(cases_view, "/api/cases/", q)) for q in CASE_FILTERS]
+    benches += [Bench(f"AlertListAPI[{q or 'all'}]", _get(alerts_view, "/api/alerts/", q)) for q in ALERT_FILTERS]
+    benches.append(Bench("export[cases.csv, 1 day]",
+                         _get(export_records, "/api/export/cases.csv", f"from={since}", kind="cases", fmt="csv")))
+
+    if case_id is not None:
+        detail = CaseDetailAPI.as_view()
+
+        def patch():
+            body = {"status": next(statuses), "analyst_name": "bench"}
+            detail(APIRequestFactory().patch(f"/api/cases/{case_id}/", body, format="json"), pk=case_id)
+        benches.append(Bench("CaseDetailAPI.patch", patch))
+
+    benches.append(_fanout(sockets, events=50))
+    return benches
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Regressions of ``results`` against ``baseline`` (both {dataset: {bench:
+    BenchResult.as_dict()}}): median wall time or peak memory more than
+    ``threshold`` (a fraction) above the baseline, or any extra queries.
+    """
+    problems = []
+    for dataset, benches in results.items():
+        for name, now in benches.items():
+            before = baseline.get(dataset, {}).get(name)
+            if before is None:
+                continue
+            label = f"{dataset} {name}"
+            old_ms, new_ms = before["wall_ms"]["median"], now["wall_ms"]["median"]
+            if old_ms and new_ms > old_ms * (1 + threshold):
+                problems.append(f"{label}: median {new_ms} ms vs {old_ms} ms (+{(new_ms / old_ms - 1) * 100:.0f}%)")
+            if now["queries"] > before["queries"]:
+                problems.append(f"{label}: {now['queries']} queries vs {before['queries']}")
+            if before["peak_kb"] and now["peak_kb"] > before["peak_kb"] * (1 + threshold):
+                problems.append(f"{label}: peak {now['peak_kb']} KiB vs {before['peak_kb']} KiB")
+    return problems
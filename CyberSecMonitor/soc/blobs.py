@@ -0,0 +1,60 @@
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from .db_writer import run_write
+from .models import Alert, Case, EventBlob
+
+def store_blobs(payloads: list[dict], batch_size: int = 500) -> list[EventBlob]:
+    """
+    Write each distinct payload once and return one blob per payload, in order.
+    Payloads already stored (by digest) are not written again.
+    """
+    blobs = [EventBlob.from_payload(p) for p in payloads]
+    unique = list({b.digest: b for b in blobs}.values())
+    EventBlob.objects.bulk_create(unique, batch_size=batch_size, ignore_conflicts=True)
+    return blobs
+
+def store_blob(payload: dict) -> EventBlob:
+    return store_blobs([payload])[0]
+
+def inline_payloads(rows: list[dict], inline_field: str):
+    """Replace blob references in ``.values()`` rows with the payload itself (for archives)."""
+    digests = {r["blob_id"] for r in rows if r.get("blob_id")}
+    data = dict(EventBlob.objects.filter(digest__in=digests).values_list("digest", "data"))
+    for r in rows:
+        digest = r.pop("blob_id", None)
+        if digest in data:
+            r[inline_field] = EventBlob.decode(data[digest])
+
+def _prune_chunk(digests: list[str]) -> int:
+    # one statement: the reference check and the delete see the same snapshot under the write lock,
+    # so a blob reused by store_blobs since the chunk was listed is kept
+    blobs, alerts, cases = EventBlob._meta.db_table, Alert._meta.db_table, Case._meta.db_table
+    placeholders = ", ".join(["%s"] * len(digests))
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(
+            f"DELETE FROM {blobs} WHERE digest IN ({placeholders}) "
+            f"AND NOT EXISTS (SELECT 1 FROM {alerts} WHERE blob_id = {blobs}.digest) "
+            f"AND NOT EXISTS (SELECT 1 FROM {cases} WHERE blob_id = {blobs}.digest)",
+            digests,
+        )
+        return cur.rowcount
+
+def prune_blobs(chunk_size: int = 500) -> int:
+    """
+    Delete blobs no alert or case points at any more, ``chunk_size`` digests
+    per short write transaction so ingest is never blocked for long.
+    """
+    unreferenced = EventBlob.objects.filter(
+        ~Exists(Alert.objects.filter(blob_id=OuterRef("digest"))),
+        ~Exists(Case.objects.filter(blob_id=OuterRef("digest"))),
+    )
+    deleted, last = 0, ""
+    while True:
+        digests = list(
+            unreferenced.filter(digest__gt=last).order_by("digest").values_list("digest", flat=True)[:chunk_size]
+        )
+        if not digests:
+            return deleted
+        deleted += run_write(_prune_chunk, digests)
+        last = digests[-1]
@@ -0,0 +1,283 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS layer_message (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS layer_message_channel ON layer_message (channel, id);
+CREATE TABLE IF NOT EXISTS layer_group (
+    grp TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (grp, channel)
+);
+"""
+
+def _prefix_range(prefix: str) -> tuple[str, str]:
+    # channel >= lo AND channel < hi  <=>  channel LIKE 'prefix%', but uses the index
+    return prefix, prefix + "\uffff"
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    """
+    Channel layer shared by every process on one host through a WAL-mode
+    SQLite file, so daphne workers, the ingest writer and management commands
+    can reach each other's sockets without Redis.
+
+    Each process owns the channels it creates (``specific.<process>!<id>``).
+    One poller task per process drains all of them with one indexed query
+    and hands messages to per-channel queues. Sends to channels owned by
+    the same process skip the database entirely.
+
+    CONFIG: ``path`` (database file), ``poll_interval`` / ``max_poll_interval``
+    (seconds, backs off while idle), plus the usual expiry/capacity options.
+    Messages are stored as JSON.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(
+        self,
+        path="channels.sqlite3",
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        poll_interval=0.002,
+        max_poll_interval=0.05,
+        batch=500,
+    ):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        # BaseChannelLayer keeps the raw dict; get_capacity() needs compiled patterns
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.path = str(path)
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.batch = batch
+        self.client_prefix = uuid.uuid4().hex[:12]
+        self._local = threading.local()
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._local_groups: dict[str, set[str]] = {}
+        self._owner_loop: asyncio.AbstractEventLoop | None = None
+        self._poller: asyncio.Task | None = None
+        self._lock = threading.Lock()
+        self._conn().executescript(SCHEMA)
+
+    # ---- sqlite plumbing (one connection per thread) ----
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            # lets group fan-out honour channel_capacity overrides inside its one INSERT
+            conn.create_function("channel_capacity", 1, self.get_capacity, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    async def _db(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    def _is_local(self, channel: str) -> bool:
+        return channel.startswith(f"specific.{self.client_prefix}!")
+
+    # ---- local delivery ----
+
+    def _deliver_local(self, channel: str, message: dict) -> bool:
+        """Hand a message to this process's queue for ``channel``; False if it is full."""
+        loop = self._owner_loop
+        if loop is None or loop.is_closed():
+            return False
+        queue = self._queues.get(channel)
+        if queue is not None and queue.qsize() >= self.get_capacity(channel):
+            return False
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._queue_for(channel).put_nowait(message)
+        else:
+            loop.call_soon_threadsafe(lambda: self._queue_for(channel).put_nowait(message))
+        return True
+
+    def _queue_for(self, channel: str) -> asyncio.Queue:
+        queue = self._queues.get(channel)
+        if queue is None:
+            queue = self._queues[channel] = asyncio.Queue()
+        return queue
+
+    # ---- channel layer API ----
+
+    async def new_channel(self, prefix="specific"):
+        return f"{prefix}.{self.client_prefix}!{uuid.uuid4().hex}"
+
+    def _insert(self, channel: str, body: str, capacity: int) -> bool:
+        cur = self._conn().execute(
+            "INSERT INTO layer_message (channel, expires, body) "
+            "SELECT ?, ?, ? WHERE (SELECT COUNT(*) FROM layer_message WHERE channel = ?) < ?",
+            (channel, time.time() + self.expiry, body, channel, capacity),
+        )
+        return cur.rowcount == 1
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        if self._is_local(channel) and self._owner_loop is not None:
+            if not self._deliver_local(channel, message):
+                raise ChannelFull(channel)
+            return
+        if not await self._db(self._insert, channel, json.dumps(message), self.get_capacity(channel)):
+            raise ChannelFull(channel)
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        if "!" in channel:
+            self._ensure_poller()
+            queue = self._queue_for(channel)
+            try:
+                return await queue.get()
+            finally:
+                # the poller recreates queues on demand, so idle channels cost nothing
+                if queue.empty() and self._queues.get(channel) is queue:
+                    del self._queues[channel]
+        # non-process channels (workers) are polled directly
+        delay = self.poll_interval
+        while True:
+            message = await self._db(self._pop_one, channel)
+            if message is not None:
+                return message
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_poll_interval)
+
+    def _pop_one(self, channel: str):
+        row = self._conn().execute(
+            "DELETE FROM layer_message WHERE id = ("
+            "SELECT id FROM layer_message WHERE channel = ? AND expires > ? ORDER BY id LIMIT 1"
+            ") RETURNING body",
+            (channel, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _pop_process(self) -> list[tuple[str, dict]]:
+        lo, hi = _prefix_range(f"specific.{self.client_prefix}!")
+        rows = self._conn().execute(
+            "DELETE FROM layer_message WHERE id IN ("
+            "SELECT id FROM layer_message WHERE channel >= ? AND channel < ? ORDER BY id LIMIT ?"
+            ") RETURNING id, channel, expires, body",
+            (lo, hi, self.batch),
+        ).fetchall()
+        now = time.time()
+        rows.sort()
+        return [(channel, json.loads(body)) for _, channel, expires, body in rows if expires > now]
+
+    def _ensure_poller(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._poller is not None and not self._poller.done() and self._owner_loop is loop:
+                return
+            self._owner_loop = loop
+            self._queues = {}
+            self._poller = loop.create_task(self._poll_loop())
+
+    async def _poll_loop(self):
+        delay = self.poll_interval
+        last_cleanup = time.monotonic()
+        while True:
+            messages = await self._db(self._pop_process)
+            for channel, message in messages:
+                self._queue_for(channel).put_nowait(message)
+            if messages:
+                delay = self.poll_interval
+            else:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_poll_interval)
+            if time.monotonic() - last_cleanup > self.expiry:
+                last_cleanup = time.monotonic()
+                await self._db(self._cleanup)
+
+    def _cleanup(self):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("DELETE FROM layer_message WHERE expires <= ?", (now,))
+        conn.execute("DELETE FROM layer_group WHERE expires <= ?", (now,))
+
+    def queue_depth(self) -> int:
+        """Messages waiting in this process's queues plus undelivered rows in the shared table."""
+        local = sum(queue.qsize() for queue in list(self._queues.values()))
+        return local + self._conn().execute("SELECT COUNT(*) FROM layer_message").fetchone()[0]
+
+    # ---- groups ----
+
+    def _group_add(self, group: str, channel: str):
+        self._conn().execute(
+            "INSERT INTO layer_group (grp, channel, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (grp, channel) DO UPDATE SET expires = excluded.expires",
+            (group, channel, time.time() + self.group_expiry),
+        )
+
+    def _group_discard(self, group: str, channel: str):
+        self._conn().execute("DELETE FROM layer_group WHERE grp = ? AND channel = ?", (group, channel))
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        if self._is_local(channel):
+            self._local_groups.setdefault(group, set()).add(channel)
+        await self._db(self._group_add, group, channel)
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        members = self._local_groups.get(group)
+        if members is not None:
+            members.discard(channel)
+            if not members:
+                self._local_groups.pop(group, None)
+        await self._db(self._group_discard, group, channel)
+
+    def _group_fanout(self, group: str, body: str, skip_local: bool):
+        # every remote member gets one row; full channels are skipped like in channels_redis
+        lo, hi = _prefix_range(f"specific.{self.client_prefix}!") if skip_local else ("", "")
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO layer_message (channel, expires, body) "
+            "SELECT g.channel, ?, ? FROM layer_group g "
+            "WHERE g.grp = ? AND g.expires > ? AND NOT (g.channel >= ? AND g.channel < ?) "
+            "AND (SELECT COUNT(*) FROM layer_message m WHERE m.channel = g.channel) < channel_capacity(g.channel)",
+            (now + self.expiry, body, group, now, lo, hi),
+        )
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        self.require_valid_group_name(group)
+        local_loop = self._owner_loop is not None and not self._owner_loop.is_closed()
+        if local_loop:
+            for channel in list(self._local_groups.get(group, ())):
+                self._deliver_local(channel, message)
+        await self._db(self._group_fanout, group, json.dumps(message), local_loop)
+
+    async def flush(self):
+        def _flush():
+            conn = self._conn()
+            conn.execute("DELETE FROM layer_message")
+            conn.execute("DELETE FROM layer_group")
+        await self._db(_flush)
+        self._queues = {}
+        self._local_groups = {}
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
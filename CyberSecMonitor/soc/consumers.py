@@ -1,14 +1,97 @@
 import json
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from .services import dashboard_group
+from .ws import SEVERITY_ORDER, subscription_groups
+
+def _split(value) -> list[str]:
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value or "").split(",") if v.strip()]
+
 class MonitorConsumer(AsyncWebsocketConsumer):
+    """
+    Live monitor feed. A socket only joins the (client, severity) groups it is
+    subscribed to, so events are fanned out to interested sockets only.
+
+    Subscription sources, later ones win: the session (settings page), the
+    query string (?clients=1,2&min_severity=HIGH&types=XSS,BRUTE_FORCE) and
+    {"action": "subscribe", ...} messages with the same keys. ``dashboard``
+    ("all" or a client id) additionally joins that view's dashboard deltas.
+    """
+
+    subscription_keys = ("clients", "min_severity", "types", "dashboard")
+
     async def connect(self):
-        self.group_name = "monitor"
-        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        self.groups_joined: list[str] = []
+        self.subscription = await database_sync_to_async(self._session_subscription)()
+        query = {k: v[-1] for k, v in parse_qs(self.scope.get("query_string", b"").decode()).items()}
         await self.accept()
+        await self._apply_subscription(query)
+
+    def _session_subscription(self) -> dict:
+        session = self.scope.get("session")
+        if session is None:
+            return {}
+        return {
+            "clients": session.get("ws_clients", []),
+            "min_severity": session.get("ws_min_severity", ""),
+            "types": session.get("ws_types", []),
+        }
+
+    async def _apply_subscription(self, changes: dict):
+        self.subscription.update({k: changes[k] for k in self.subscription_keys if k in changes})
+        sub = self.subscription
+        client_ids = sorted({int(c) for c in _split(sub.get("clients")) if c.isdigit()})
+        min_severity = sub.get("min_severity") or SEVERITY_ORDER[0]
+        if min_severity not in SEVERITY_ORDER:
+            min_severity = SEVERITY_ORDER[0]
+        self.incident_types = set(_split(sub.get("types")))
+
+        groups = subscription_groups(client_ids, min_severity)
+        dashboard = str(sub.get("dashboard") or "")
+        if dashboard == "all":
+            groups.append(dashboard_group(None))
+        elif dashboard.isdigit():
+            groups.append(dashboard_group(dashboard))
+        for group in set(self.groups_joined) - set(groups):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        for group in set(groups) - set(self.groups_joined):
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.groups_joined = groups
+
+        await self.send(text_data=json.dumps({
+            "event": "subscribed",
+            "clients": client_ids,
+            "min_severity": min_severity,
+            "types": sorted(self.incident_types),
+            "dashboard": dashboard,
+        }))
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        for group in getattr(self, "groups_joined", []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            msg = json.loads(text_data or "{}")
+        except json.JSONDecodeError:
+            return
+        if isinstance(msg, dict) and msg.get("action") == "subscribe":
+            await self._apply_subscription(msg)
+
+    def _wanted(self, payload: dict) -> bool:
+        if payload.get("event") == "dashboard_delta":
+            return True
+        return not self.incident_types or payload.get("incident_type") in self.incident_types
 
     async def broadcast(self, event):
-        await self.send(text_data=json.dumps(event["payload"]))
+        if self._wanted(event["payload"]):
+            await self.send(text_data=json.dumps(event["payload"]))
+
+    async def broadcast_batch(self, event):
+        events = [e for e in event["events"] if self._wanted(e)]
+        if events or event["dropped"]:
+            await self.send(text_data=json.dumps({"events": events, "dropped": event["dropped"]}))
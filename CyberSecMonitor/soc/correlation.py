@@ -0,0 +1,273 @@
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from .models import IncidentType, Severity
+
+@dataclass(frozen=True)
+class Detection:
+    name: str
+    incident_type: str
+    key_field: str
+    threshold: int
+    window_seconds: int
+    buckets: int
+    severity: str
+    title: str  # formatted with key, count, window
+
+# Threshold detections evaluated on every ingested event
+DETECTIONS = [
+    Detection("bruteforce_source", IncidentType.BRUTE_FORCE, "source_ip", 20, 3600, 12, Severity.HIGH,
+              "Brute-force: {count} attempts from {key} in {window}"),
+    Detection("bruteforce_user", IncidentType.BRUTE_FORCE, "username", 50, 3600, 12, Severity.HIGH,
+              "Brute-force: {count} failed logins for {key} in {window}"),
+    Detection("ddos_source", IncidentType.DDOS_BOT, "source_ip", 100, 60, 12, Severity.CRITICAL,
+              "DDoS bot: {count} events from {key} in {window}"),
+    Detection("web_attack_source", IncidentType.SQL_INJECTION, "source_ip", 10, 600, 10, Severity.CRITICAL,
+              "SQL injection campaign: {count} attempts from {key} in {window}"),
+]
+
+def _format_window(seconds: int) -> str:
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+class WindowCounter:
+    """
+    Exact sliding-window counts for up to ``max_keys`` keys.
+
+    Every key owns a slot with a ring of ``buckets`` counters in one flat
+    array; buckets that fell out of the window are zeroed when the key is
+    next touched. When all slots are taken the least recently seen key is
+    evicted and its slot reused.
+    """
+
+    def __init__(self, window_seconds: int, buckets: int, max_keys: int):
+        self.bucket_seconds = window_seconds / buckets
+        self.buckets = buckets
+        self.max_keys = max_keys
+        self._slots: OrderedDict = OrderedDict()
+        self._next_slot = 0
+        self._counts = array("I", bytes(4 * max_keys * buckets))
+        self._totals = array("I", bytes(4 * max_keys))
+        self._last = array("q", bytes(8 * max_keys))
+        self._zero = array("I", bytes(4 * buckets))
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _expire(self, slot: int, bucket: int):
+        last = self._last[slot]
+        if bucket == last:
+            return
+        base = slot * self.buckets
+        if bucket - last >= self.buckets:
+            self._counts[base:base + self.buckets] = self._zero
+            self._totals[slot] = 0
+        else:
+            for b in range(last + 1, bucket + 1):
+                i = base + b % self.buckets
+                self._totals[slot] -= self._counts[i]
+                self._counts[i] = 0
+        self._last[slot] = bucket
+
+    def add(self, key, now: float) -> int:
+        """Count one event for ``key`` and return its total over the window."""
+        bucket = int(now // self.bucket_seconds)
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._next_slot < self.max_keys:
+                slot = self._next_slot
+                self._next_slot += 1
+            else:
+                _, slot = self._slots.popitem(last=False)
+                self.evictions += 1
+            self._slots[key] = slot
+            base = slot * self.buckets
+            self._counts[base:base + self.buckets] = self._zero
+            self._totals[slot] = 0
+            self._last[slot] = bucket
+        else:
+            self._slots.move_to_end(key)
+            self._expire(slot, bucket)
+        self._counts[slot * self.buckets + bucket % self.buckets] += 1
+        self._totals[slot] += 1
+        return self._totals[slot]
+
+    def memory_bytes(self) -> int:
+        arrays = (self._counts, self._totals, self._last)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+class SketchCounter:
+    """
+    Approximate sliding-window counts in fixed memory (count-min sketch).
+
+    One ``depth`` x ``width`` plane per ring bucket; a plane is cleared when
+    its bucket is reused. Estimates never undercount, so thresholds fire no
+    later than with exact counts but may fire early on heavy collisions.
+    """
+
+    def __init__(self, window_seconds: int, buckets: int, width: int, depth: int):
+        self.bucket_seconds = window_seconds / buckets
+        self.buckets = buckets
+        self.width = width
+        self.depth = depth
+        self._plane = width * depth
+        self._counts = array("I", bytes(4 * self._plane * buckets))
+        self._stamps = array("q", [-1] * buckets)
+        self._zero = array("I", bytes(4 * self._plane))
+        self._bucket = -1
+        self._live: list[int] = []
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return 0  # keys aren't stored
+
+    def _advance(self, bucket: int):
+        pos = bucket % self.buckets
+        if self._stamps[pos] != bucket:
+            start = pos * self._plane
+            self._counts[start:start + self._plane] = self._zero
+            self._stamps[pos] = bucket
+        self._live = [p * self._plane for p in range(self.buckets) if self._stamps[p] > bucket - self.buckets]
+        self._bucket = bucket
+
+    def add(self, key, now: float) -> int:
+        bucket = int(now // self.bucket_seconds)
+        if bucket != self._bucket:
+            self._advance(bucket)
+        current = (bucket % self.buckets) * self._plane
+        h1 = hash(key)
+        h2 = hash((key, "cm")) | 1
+        cells = [current + row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+        # conservative update: only the smallest current-bucket cells grow
+        low = min(self._counts[c] for c in cells) + 1
+        for c in cells:
+            if self._counts[c] < low:
+                self._counts[c] = low
+        return min(sum(self._counts[c - current + base] for base in self._live) for c in cells)
+
+    def memory_bytes(self) -> int:
+        return self._counts.itemsize * len(self._counts)
+
+class CorrelationEngine:
+    """
+    Streaming threshold detections over (client, incident_type, key field).
+
+    ``observe`` counts accepted events as they are ingested and returns a
+    synthetic correlated event for every key that crosses its detection's
+    threshold. A key fires at most once per window.
+    """
+
+    def __init__(self, detections: list[Detection], mode: str, max_keys: int, sketch_width: int, sketch_depth: int):
+        self.mode = mode
+        self.detections = detections
+        self._by_type: dict[str, list[Detection]] = {}
+        self._counters = {}
+        for d in detections:
+            self._by_type.setdefault(d.incident_type, []).append(d)
+            if mode == "sketch":
+                self._counters[d.name] = SketchCounter(d.window_seconds, d.buckets, sketch_width, sketch_depth)
+            else:
+                self._counters[d.name] = WindowCounter(d.window_seconds, d.buckets, max_keys)
+        self._fired: OrderedDict = OrderedDict()  # (detection, client, key) -> fired at
+        self._max_fired = max_keys
+        self._lock = threading.Lock()
+
+        self.events_seen = 0
+        self.fired = 0
+
+    def _recently_fired(self, ident: tuple, detection: Detection, now: float) -> bool:
+        fired_at = self._fired.get(ident)
+        if fired_at is not None and now - fired_at < detection.window_seconds:
+            return True
+        self._fired[ident] = now
+        self._fired.move_to_end(ident)
+        while len(self._fired) > self._max_fired:
+            self._fired.popitem(last=False)
+        return False
+
+    def observe(self, accepted: list[tuple[int, dict, int]]) -> list[dict]:
+        now = time.time()
+        out = []
+        with self._lock:
+            for _, event, client_id in accepted:
+                if event.get("correlated"):
+                    continue
+                self.events_seen += 1
+                for d in self._by_type.get(event.get("incident_type"), ()):
+                    key = event.get(d.key_field)
+                    if key in (None, ""):
+                        continue
+                    count = self._counters[d.name].add((client_id, key), now)
+                    if count < d.threshold or self._recently_fired((d.name, client_id, key), d, now):
+                        continue
+                    self.fired += 1
+                    out.append(self._correlated_event(d, client_id, key, count))
+        return out
+
+    def _correlated_event(self, d: Detection, client_id: int, key, count: int) -> dict:
+        window = _format_window(d.window_seconds)
+        return {
+            "client_id": client_id,
+            "incident_type": d.incident_type,
+            "severity": d.severity,
+            "title": d.title.format(key=key, count=count, window=window)[:200],
+            "description": f"{count} {d.incident_type} events with {d.key_field}={key} within {window} "
+                           f"(threshold {d.threshold}).",
+            d.key_field: key,
+            "force_case": True,
+            "correlated": True,
+            "correlation": {
+                "detection": d.name,
+                "key_field": d.key_field,
+                "key": key,
+                "count": count,
+                "threshold": d.threshold,
+                "window_seconds": d.window_seconds,
+            },
+        }
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "events_seen": self.events_seen,
+            "fired": self.fired,
+            "detections": {
+                d.name: {
+                    "incident_type": d.incident_type,
+                    "key_field": d.key_field,
+                    "threshold": d.threshold,
+                    "window_seconds": d.window_seconds,
+                    "keys": len(self._counters[d.name]),
+                    "evictions": self._counters[d.name].evictions,
+                    "memory_bytes": self._counters[d.name].memory_bytes(),
+                }
+                for d in self.detections
+            },
+        }
+
+_engine: CorrelationEngine | None = None
+_engine_lock = threading.Lock()
+
+def get_correlation_engine() -> CorrelationEngine | None:
+    """The shared engine, or None unless SOC_CORRELATION_ENABLED is set."""
+    from django.conf import settings
+    global _engine
+    if not settings.SOC_CORRELATION_ENABLED:
+        return None
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = CorrelationEngine(
+                    DETECTIONS,
+                    mode=settings.SOC_CORRELATION_MODE,
+                    max_keys=settings.SOC_CORRELATION_MAX_KEYS,
+                    sketch_width=settings.SOC_CORRELATION_SKETCH_WIDTH,
+                    sketch_depth=settings.SOC_CORRELATION_SKETCH_DEPTH,
+                )
+    return _engine
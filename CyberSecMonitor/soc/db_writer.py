@@ -0,0 +1,102 @@
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+class WriteExecutor:
+    """
+    Runs every submitted write on one thread, so SQLite sees a single writer.
+
+    Jobs waiting in the queue are committed together: up to ``batch_size``
+    jobs, each in its own savepoint, inside one transaction. A failing job
+    only rolls back its savepoint. Callers get their result once the batch
+    is committed. Reads keep using the calling thread's own connection.
+    """
+
+    def __init__(self, batch_size: int, max_wait: float):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._q: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="soc-db-writer", daemon=True)
+        self._thread.start()
+
+        self.batches = 0
+        self.jobs = 0
+
+    def on_writer_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        self._q.put((future, fn, args, kwargs))
+        return future
+
+    def _next_batch(self) -> list:
+        batch = [self._q.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                batch.append(self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            close_old_connections()
+            outcomes = []
+            try:
+                with transaction.atomic():
+                    for future, fn, args, kwargs in batch:
+                        if not future.set_running_or_notify_cancel():
+                            continue
+                        try:
+                            with transaction.atomic():
+                                outcomes.append((future, fn(*args, **kwargs), None))
+                        except Exception as e:
+                            outcomes.append((future, None, e))
+            except Exception as e:
+                # the commit itself failed: nothing in this batch was written
+                outcomes = [(future, None, e) for future, _, _ in outcomes]
+            for future, result, error in outcomes:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            self.batches += 1
+            self.jobs += len(batch)
+
+_executor: WriteExecutor | None = None
+_executor_lock = threading.Lock()
+
+def get_write_executor() -> WriteExecutor | None:
+    """The shared writer, or None unless SOC_DB_WRITER is on (callers then write directly)."""
+    global _executor
+    if not settings.SOC_DB_WRITER:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = WriteExecutor(
+                    batch_size=settings.SOC_DB_WRITER_BATCH,
+                    max_wait=settings.SOC_DB_WRITER_MAX_WAIT_MS / 1000.0,
+                )
+    return _executor
+
+def run_write(fn, *args, **kwargs):
+    """Call ``fn`` on the single writer when it is enabled, otherwise right here."""
+    executor = get_write_executor()
+    if executor is None or executor.on_writer_thread():
+        return fn(*args, **kwargs)
+    return executor.submit(fn, *args, **kwargs).result()
+
+def serialized_write(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return run_write(fn, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,110 @@
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django_filters.utils import translate_validation
+
+from .models import Case, Alert
+from .filters import CaseFilter, AlertFilter
+
+CHUNK_SIZE = 2000
+
+# kind -> (model, filterset, export columns, JSON column for NDJSON)
+EXPORTS = {
+    "cases": (
+        Case, CaseFilter,
+        ["id", "created_at", "client__name", "severity", "incident_type", "status", "verdict",
+         "title", "source_ip", "host_ip", "hostname"],
+        "evidence",
+    ),
+    "alerts": (
+        Alert, AlertFilter,
+        ["id", "created_at", "client__name", "severity", "incident_type", "title", "is_false_positive"],
+        "raw_event",
+    ),
+}
+
+CSV_HEADERS = {
+    "cases": ["case_id", "created_at", "client", "severity", "incident_type", "status", "verdict",
+              "title", "source_ip", "host_ip", "hostname"],
+    "alerts": ["alert_id", "created_at", "client", "severity", "incident_type", "title", "is_false_positive"],
+}
+
+class ExportJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder with full-precision datetimes, written as isoformat() like the CSV columns."""
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+class _Echo:
+    """csv.writer target that hands each formatted row back instead of buffering it."""
+    def write(self, value):
+        return value
+
+def parse_bound(value: str, end: bool = False) -> datetime | None:
+    """
+    Parse a ?from=/?to= value (ISO date or datetime, local time if naive).
+    A bare date used as an upper bound means the end of that day.
+    """
+    if not value:
+        return None
+    # dates first: parse_datetime also accepts a bare date (as midnight)
+    try:
+        d = parse_date(value)
+    except ValueError:
+        d = None
+    if d is not None:
+        dt = datetime.combine(d + timedelta(days=1) if end else d, time.min)
+    else:
+        try:
+            dt = parse_datetime(value)
+        except ValueError:
+            dt = None
+        if dt is None:
+            raise ValueError(f"invalid date: {value}")
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+def export_queryset(kind: str, params, start: datetime | None = None, end: datetime | None = None):
+    """
+    Rows to export, newest first. Invalid filter values raise a DRF
+    ValidationError (400 with the filterset errors, like the list APIs)
+    instead of being dropped, which would export the whole table.
+    """
+    model, filterset_class, columns, _ = EXPORTS[kind]
+    filterset = filterset_class(params, queryset=model.objects.all())
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    qs = filterset.qs
+    if start:
+        qs = qs.filter(created_at__gte=start)
+    if end:
+        qs = qs.filter(created_at__lt=end)
+    return qs.order_by("-created_at", "-id")
+
+def iter_csv(kind: str, qs):
+    columns = EXPORTS[kind][2]
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADERS[kind])
+    for row in qs.values_list(*columns).iterator(chunk_size=CHUNK_SIZE):
+        row = list(row)
+        row[1] = row[1].isoformat()
+        yield writer.writerow(row)
+
+def iter_ndjson(kind: str, qs):
+    _, _, columns, json_column = EXPORTS[kind]
+    keys = CSV_HEADERS[kind]
+    rows = qs.values_list(*columns, json_column, "blob__data").iterator(chunk_size=CHUNK_SIZE)
+    for *row, inline, blob_data in rows:
+        head = json.dumps(dict(zip(keys, row)), cls=ExportJSONEncoder)[:-1]
+        # blobs already hold compact JSON; splice it in instead of parsing and re-encoding
+        if blob_data is not None:
+            payload = zlib.decompress(blob_data).decode()
+        else:
+            payload = json.dumps(inline, cls=ExportJSONEncoder)
+        yield f'{head}, "{json_column}": {payload}}}\n'
@@ -1,5 +1,118 @@
+import math
+import threading
+import time
 import django_filters
+from django import forms
+from django.conf import settings
+from django.db.models import CharField, F, Func, Max, Q
+
 from .models import Case, Alert
+from .ipnet import cidr_range
+from .pagination import KeysetPagination
+
+class CIDRField(forms.CharField):
+    def clean(self, value):
+        value = super().clean(value)
+        if not value:
+            return None
+        try:
+            return cidr_range(value)
+        except ValueError:
+            raise forms.ValidationError(f"invalid CIDR block or address: {value}")
+
+class BlockStats:
+    """
+    Row counts behind the CIDR density check, cached for ``ttl`` seconds so
+    a repeated pivot costs no extra queries: the table size (max id stands
+    in for it) and the number of rows a block matches, counted up to the cap
+    that matters for the largest page.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._values: dict[tuple, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: tuple, compute) -> int:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._values.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        value = compute()
+        with self._lock:
+            if len(self._values) >= self.max_entries:
+                self._values.clear()
+            self._values[key] = (now + self.ttl, value)
+        return value
+
+    def table_rows(self, model) -> int:
+        return self._get((model._meta.db_table,), lambda: model.objects.aggregate(n=Max("id"))["n"] or 0)
+
+    def matches(self, model, key: tuple, match: Q, cap: int) -> int:
+        return self._get((model._meta.db_table, *key), lambda: model.objects.filter(match)[:cap].count())
+
+_block_stats: BlockStats | None = None
+_block_stats_lock = threading.Lock()
+
+def get_block_stats() -> BlockStats:
+    global _block_stats
+    if _block_stats is None:
+        with _block_stats_lock:
+            if _block_stats is None:
+                _block_stats = BlockStats(settings.SOC_CIDR_STATS_SECONDS)
+    return _block_stats
+
+class CIDRFilter(django_filters.Filter):
+    """
+    ?cidr=185.10.0.0/16 (IPv4 or IPv6): rows whose source or host IP is in
+    the block, as range scans over the ip_num indexes. ``fields`` narrows
+    it to one side.
+
+    A block holding a large share of the table is cheaper to find by walking
+    the newest-first (created_at) index until a page is full than by
+    range-scanning the IP index and sorting every match. SQLite keeps no
+    statistics that tell the two apart, so dense blocks (by the cached
+    BlockStats and the request's page size) hide the IP index from the
+    planner.
+    """
+    field_class = CIDRField
+
+    def __init__(self, *args, fields=("source_ip_num", "host_ip_num"), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ip_fields = fields
+
+    def _match(self, value, fields) -> Q:
+        match = Q()
+        for field in fields:
+            match |= Q(**{f"{field}__range": value})
+        return match
+
+    def _page_size(self) -> int:
+        request = getattr(self.parent, "request", None)
+        return KeysetPagination().get_page_size(request) if request is not None else settings.SOC_API_PAGE_SIZE
+
+    def _dense(self, model, value) -> bool:
+        # walking created_at reads ~page/share rows, the IP range share*total plus a sort:
+        # past sqrt(page*total) matches the walk wins
+        stats = get_block_stats()
+        total = stats.table_rows(model)
+        dense_at = int(math.sqrt(self._page_size() * total))
+        if not dense_at:
+            return False
+        cap = int(math.sqrt(settings.SOC_API_MAX_PAGE_SIZE * total))
+        return stats.matches(model, (self.ip_fields, value), self._match(value, self.ip_fields), cap) >= dense_at
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        if not self._dense(qs.model, value):
+            return qs.filter(self._match(value, self.ip_fields))
+        # unary + keeps the column out of index selection
+        unindexed = {f"{f}_noindex": Func(F(f), template="+%(expressions)s", output_field=CharField())
+                     for f in self.ip_fields}
+        return qs.alias(**unindexed).filter(self._match(value, unindexed))
 
 class CaseFilter(django_filters.FilterSet):
     incident_type = django_filters.CharFilter(field_name="incident_type", lookup_expr="exact")
@@ -7,6 +120,9 @@ class CaseFilter(django_filters.FilterSet):
     status = django_filters.CharFilter(field_name="status", lookup_expr="exact")
     verdict = django_filters.CharFilter(field_name="verdict", lookup_expr="exact")
     today = django_filters.BooleanFilter(method="filter_today")
+    cidr = CIDRFilter()
+    source_cidr = CIDRFilter(fields=("source_ip_num",))
+    host_cidr = CIDRFilter(fields=("host_ip_num",))
 
     def filter_today(self, qs, name, value):
         if not value:
@@ -17,12 +133,15 @@ class CaseFilter(django_filters.FilterSet):
 
     class Meta:
         model = Case
-        fields = ["incident_type","severity","status","verdict","today"]
+        fields = ["incident_type","severity","status","verdict","today","cidr","source_cidr","host_cidr"]
 
 class AlertFilter(django_filters.FilterSet):
     incident_type = django_filters.CharFilter(field_name="incident_type", lookup_expr="exact")
     severity = django_filters.CharFilter(field_name="severity", lookup_expr="exact")
     today = django_filters.BooleanFilter(method="filter_today")
+    cidr = CIDRFilter()
+    source_cidr = CIDRFilter(fields=("source_ip_num",))
+    host_cidr = CIDRFilter(fields=("host_ip_num",))
 
     def filter_today(self, qs, name, value):
         if not value:
@@ -33,4 +152,4 @@ class AlertFilter(django_filters.FilterSet):
 
     class Meta:
         model = Alert
-        fields = ["incident_type","severity","today"]
+        fields = ["incident_type","severity","today","cidr","source_cidr","host_cidr"]
@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections
+
+from .services import ingest_events
+
+class IngestQueue:
+    """
+    Bounded in-process queue between the ingest endpoints and the database.
+
+    Request threads only validate and enqueue; one writer thread drains the
+    queue in micro-batches (``batch_size`` events or ``max_wait`` seconds,
+    whichever comes first) through ingest_events(). A batch that fails to
+    write (e.g. "database is locked") is retried ``retries`` times with
+    doubling backoff before its events are counted as failed.
+    """
+
+    def __init__(self, high_water: int, batch_size: int, max_wait: float,
+                 retries: int = 5, retry_backoff: float = 0.1):
+        self.high_water = high_water
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self._q: queue.Queue = queue.Queue(maxsize=high_water)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+        self.enqueued = 0
+        self.throttled = 0
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_drain_ms = 0.0
+        self.max_drain_ms = 0.0
+        self.total_drain_ms = 0.0
+        self.last_lag_ms = 0.0
+
+    def depth(self) -> int:
+        return self._q.qsize()
+
+    def offer(self, events: list[dict]) -> bool:
+        """Enqueue all events or none of them. False means the high-water mark was hit."""
+        self.start()
+        with self._lock:
+            if self._q.qsize() + len(events) > self.high_water:
+                self.throttled += len(events)
+                return False
+            ts = time.monotonic()
+            for event in events:
+                self._q.put_nowait((ts, event))
+            self.enqueued += len(events)
+        return True
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._writer_loop, name="soc-ingest-writer", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self) -> list[tuple[float, dict]]:
+        batch = [self._q.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _writer_loop(self):
+        while True:
+            self._drain(self._next_batch())
+
+    def _write(self, batch: list[tuple[float, dict]]) -> int:
+        """Write one batch, retrying the whole transaction; returns events stored, 0 once retries run out."""
+        delay = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            try:
+                close_old_connections()
+                results = ingest_events([event for _, event in batch], batch_size=self.batch_size)
+                return sum(1 for r in results if r["ok"])
+            except Exception as e:
+                print("Ingest writer error:", e)
+                if attempt == self.retries:
+                    return 0
+                self.retried += 1
+                time.sleep(delay)
+                delay *= 2
+        return 0
+
+    def _drain(self, batch: list[tuple[float, dict]]):
+        started = time.monotonic()
+        ok = self._write(batch)
+        finished = time.monotonic()
+
+        drain_ms = (finished - started) * 1000.0
+        self.batches += 1
+        self.written += ok
+        self.failed += len(batch) - ok
+        self.last_batch_size = len(batch)
+        self.last_drain_ms = drain_ms
+        self.total_drain_ms += drain_ms
+        self.max_drain_ms = max(self.max_drain_ms, drain_ms)
+        self.last_lag_ms = (finished - batch[0][0]) * 1000.0
+
+    def metrics(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "depth": self.depth(),
+            "high_water": self.high_water,
+            "enqueued": self.enqueued,
+            "throttled": self.throttled,
+            "written": self.written,
+            "failed": self.failed,
+            "retried": self.retried,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "drain_ms_last": round(self.last_drain_ms, 2),
+            "drain_ms_avg": round(self.total_drain_ms / self.batches, 2) if self.batches else 0.0,
+            "drain_ms_max": round(self.max_drain_ms, 2),
+            "lag_ms_last": round(self.last_lag_ms, 2),
+        }
+
+_queue: IngestQueue | None = None
+_queue_lock = threading.Lock()
+
+def get_ingest_queue() -> IngestQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = IngestQueue(
+                    high_water=settings.SOC_INGEST_QUEUE_HIGH_WATER,
+                    batch_size=settings.SOC_INGEST_QUEUE_BATCH_SIZE,
+                    max_wait=settings.SOC_INGEST_QUEUE_MAX_WAIT_MS / 1000.0,
+                    retries=settings.SOC_INGEST_QUEUE_RETRIES,
+                )
+    return _queue
+
+def async_ingest_enabled() -> bool:
+    return settings.SOC_INGEST_MODE == "async"
@@ -0,0 +1,24 @@
+import ipaddress
+
+# IPs are indexed as 32 hex digits of their 128-bit value, IPv4 mapped into
+# ::ffff:0:0/96, so string order is numeric order and a CIDR block is one
+# contiguous range of an ordinary index.
+_V4_MAPPED = 0xFFFF << 32
+
+def _as_int(ip: ipaddress.IPv4Address | ipaddress.IPv6Address) -> int:
+    return _V4_MAPPED | int(ip) if ip.version == 4 else int(ip)
+
+def ip_key(value) -> str:
+    """Index key for an address, or "" when there is none (or it does not parse)."""
+    if not value:
+        return ""
+    try:
+        return f"{_as_int(ipaddress.ip_address(str(value).strip())):032x}"
+    except ValueError:
+        return ""
+
+def cidr_range(value: str) -> tuple[str, str]:
+    """(first, last) index keys of a block like "185.10.0.0/16"; a bare address is its own block."""
+    net = ipaddress.ip_network(value.strip(), strict=False)
+    first = _as_int(net.network_address)
+    return f"{first:032x}", f"{first + net.num_addresses - 1:032x}"
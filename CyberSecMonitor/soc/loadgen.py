@@ -0,0 +1,174 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import aiohttp
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of microsecond values.
+
+    Each power of two is split into 2**sub_bits buckets, so any recorded
+    value is reported within 1/2**(sub_bits-1) of itself whatever its
+    magnitude, in constant memory.
+    """
+
+    def __init__(self, sub_bits: int = 7):
+        self.sub_bits = sub_bits
+        self.counts: Counter = Counter()
+        self.total = 0
+        self.max_us = 0
+
+    def _index(self, value: int) -> int:
+        shift = max(value.bit_length() - self.sub_bits, 0)
+        return (shift << self.sub_bits) | (value >> shift)
+
+    def _upper(self, index: int) -> int:
+        shift = index >> self.sub_bits
+        mantissa = index & ((1 << self.sub_bits) - 1)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        value = max(int(seconds * 1_000_000), 0)
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.max_us = max(self.max_us, value)
+
+    def percentile(self, p: float) -> float:
+        """Value at percentile ``p`` in milliseconds."""
+        if not self.total:
+            return 0.0
+        rank = max(1, int(round(p / 100.0 * self.total)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper(index), self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def summary(self) -> dict:
+        return {
+            "p50": round(self.percentile(50), 2),
+            "p95": round(self.percentile(95), 2),
+            "p99": round(self.percentile(99), 2),
+            "max": round(self.max_us / 1000.0, 2),
+        }
+
+def parse_mix(spec: str, choices: list[str]) -> tuple[list[str], list[float]] | None:
+    """"HIGH=20,LOW=80" -> (names, weights); empty means keep build_event's defaults."""
+    if not spec:
+        return None
+    names, weights = [], []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().upper()
+        if name not in choices:
+            raise ValueError(f"unknown value in mix: {name} (expected one of {', '.join(choices)})")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+@dataclass
+class LoadResult:
+    requests: int = 0
+    events: int = 0
+    ok: int = 0
+    rejected_events: int = 0
+    errors: Counter = field(default_factory=Counter)
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "seconds": round(self.seconds, 2),
+            "requests": self.requests,
+            "events": self.events,
+            "ok_requests": self.ok,
+            "requests_per_sec": round(self.requests / self.seconds, 1) if self.seconds else 0.0,
+            "events_per_sec": round(self.events / self.seconds, 1) if self.seconds else 0.0,
+            "rejected_events": self.rejected_events,
+            "errors": dict(self.errors),
+            "latency_ms": self.latency.summary(),
+        }
+
+async def run_load(make_body, url: str, concurrency: int, rate: float, duration: float, total: int,
+                   events_per_request: int, timeout: float) -> LoadResult:
+    """
+    Drive ``url`` with ``concurrency`` workers over one pooled connector.
+
+    With ``rate`` > 0 requests are scheduled open-loop at fixed intervals and
+    latency is measured from the scheduled time, so a stalled server shows
+    up as latency instead of quietly lowering the send rate. With ``rate``
+    0 every worker sends back-to-back (closed loop).
+    """
+    result = LoadResult()
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+    slots: asyncio.Queue = asyncio.Queue()
+
+    def more() -> bool:
+        if total and result.requests >= total:
+            return False
+        return deadline is None or time.perf_counter() < deadline
+
+    async def schedule():
+        interval = 1.0 / rate
+        i = 0
+        while (not total or i < total) and (deadline is None or started + i * interval < deadline):
+            due = started + i * interval
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await slots.put(due)
+            i += 1
+        for _ in range(concurrency):
+            await slots.put(None)
+
+    async def send(session, scheduled: float):
+        body = make_body()
+        result.requests += 1
+        result.events += events_per_request
+        try:
+            async with session.post(url, json=body) as resp:
+                payload = await resp.json(content_type=None) if resp.status < 500 else await resp.text()
+                if resp.status >= 400:
+                    result.errors[f"HTTP {resp.status}"] += 1
+                    return
+                result.ok += 1
+                if isinstance(payload, dict) and "rejected" in payload:
+                    result.rejected_events += payload["rejected"]
+        except asyncio.TimeoutError:
+            result.errors["timeout"] += 1
+        except aiohttp.ClientError as e:
+            result.errors[type(e).__name__] += 1
+        except ValueError:
+            result.errors["bad response"] += 1
+        finally:
+            result.latency.record(time.perf_counter() - scheduled)
+
+    async def open_loop_worker(session):
+        while True:
+            scheduled = await slots.get()
+            if scheduled is None:
+                return
+            await send(session, scheduled)
+
+    async def closed_loop_worker(session):
+        while more():
+            await send(session, time.perf_counter())
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        if rate > 0:
+            workers = [asyncio.create_task(open_loop_worker(session)) for _ in range(concurrency)]
+            await asyncio.gather(schedule(), *workers)
+        else:
+            await asyncio.gather(*(closed_loop_worker(session) for _ in range(concurrency)))
+    result.seconds = time.perf_counter() - started
+    return result
+
+def weighted(mix: tuple[list[str], list[float]] | None) -> str | None:
+    return random.choices(mix[0], weights=mix[1], k=1)[0] if mix else None
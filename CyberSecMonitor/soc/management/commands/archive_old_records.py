@@ -0,0 +1,80 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from soc.archive import append_day, record_cutoff
+from soc.blobs import inline_payloads, prune_blobs
+from soc.models import Alert, Case, CaseStatus, Dispatch, Task
+
+class Command(BaseCommand):
+    help = "Move alerts and resolved cases older than N days into per-day compressed archives."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90, help="Keep this many days in the hot tables.")
+        parser.add_argument("--kind", choices=["alerts", "cases", "all"], default="all")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Rows archived and deleted per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived.")
+        parser.add_argument("--vacuum", action="store_true", help="VACUUM the database afterwards to shrink the file.")
+
+    def _queryset(self, kind: str, cutoff):
+        if kind == "alerts":
+            return Alert.objects.filter(created_at__lt=cutoff)
+        return Case.objects.filter(created_at__lt=cutoff, status=CaseStatus.RESOLVED)
+
+    def _attach_related(self, rows: list[dict]):
+        ids = [r["id"] for r in rows]
+        tasks, dispatches = {}, {}
+        for t in Task.objects.filter(case_id__in=ids).values("id", "case_id", "title", "done"):
+            tasks.setdefault(t["case_id"], []).append(t)
+        for d in Dispatch.objects.filter(case_id__in=ids).values("id", "case_id", "channel", "recipients", "sent_at"):
+            dispatches.setdefault(d["case_id"], []).append(d)
+        for r in rows:
+            r["tasks"] = tasks.get(r["id"], [])
+            r["dispatches"] = dispatches.get(r["id"], [])
+
+    def _archive(self, kind: str, cutoff, chunk_size: int) -> int:
+        model = Alert if kind == "alerts" else Case
+        moved = 0
+        while True:
+            # always the oldest remaining chunk; deleted rows drop out of the next query
+            rows = list(self._queryset(kind, cutoff).order_by("created_at", "id").values()[:chunk_size])
+            if not rows:
+                return moved
+            # archives are self-contained: payloads are copied out of the blob store
+            inline_payloads(rows, "raw_event" if kind == "alerts" else "evidence")
+            if kind == "cases":
+                self._attach_related(rows)
+
+            by_day: dict = {}
+            for r in rows:
+                by_day.setdefault(timezone.localtime(r["created_at"]).date(), []).append(r)
+            # archive first: a crash before the delete leaves duplicates in the archive, never a gap
+            for day, records in by_day.items():
+                append_day(kind, day, records)
+
+            with transaction.atomic():
+                model.objects.filter(id__in=[r["id"] for r in rows]).delete()
+            moved += len(rows)
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(days=opts["days"])
+        kinds = ["alerts", "cases"] if opts["kind"] == "all" else [opts["kind"]]
+
+        for kind in kinds:
+            if opts["dry_run"]:
+                self.stdout.write(f"{kind}: {self._queryset(kind, cutoff).count()} older than {cutoff:%Y-%m-%d %H:%M}")
+                continue
+            moved = self._archive(kind, cutoff, opts["chunk_size"])
+            if moved:
+                # rebuild_rollups keeps the buckets before this, which the hot tables no longer cover
+                record_cutoff(cutoff)
+            self.stdout.write(self.style.SUCCESS(f"{kind}: archived {moved} rows older than {cutoff:%Y-%m-%d %H:%M}"))
+
+        if not opts["dry_run"]:
+            self.stdout.write(f"blobs: pruned {prune_blobs()} unreferenced")
+
+        if opts["vacuum"] and not opts["dry_run"]:
+            with connection.cursor() as cur:
+                cur.execute("VACUUM")
+            self.stdout.write("Database vacuumed.")
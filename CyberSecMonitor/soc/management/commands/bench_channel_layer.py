@@ -0,0 +1,123 @@
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import statistics
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+
+from soc.channel_layer import SQLiteChannelLayer
+
+GROUP = "bench"
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+def _worker(path: str, sockets: int, expected: int, capacity: int, ready, results):
+    """One 'daphne worker': owns ``sockets`` channels in GROUP and times every delivery."""
+    async def run():
+        layer = SQLiteChannelLayer(path=path, capacity=capacity)
+        channels = [await layer.new_channel() for _ in range(sockets)]
+        for ch in channels:
+            await layer.group_add(GROUP, ch)
+        latencies: list[float] = []
+        last = [0.0]
+
+        async def consume(ch):
+            for _ in range(expected):
+                msg = await layer.receive(ch)
+                last[0] = time.time()
+                latencies.append(last[0] - msg["ts"])
+
+        ready.put(os.getpid())
+        tasks = [asyncio.create_task(consume(ch)) for ch in channels]
+        await asyncio.wait(tasks, timeout=60)
+        results.put((latencies, last[0]))
+        await layer.close()
+
+    asyncio.run(run())
+
+class Command(BaseCommand):
+    help = "Benchmark group_send throughput/latency of the SQLite channel layer across worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+        parser.add_argument("--sockets", type=int, default=10, help="Group members per worker process.")
+        parser.add_argument("--messages", type=int, default=500, help="group_send calls per run.")
+        parser.add_argument("--rate", type=float, default=0, help="Sends per second (0 = as fast as possible).")
+        parser.add_argument("--path", default="", help="Layer database (default: fresh temp file per run).")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def _run(self, workers: int, opts) -> dict:
+        path = opts["path"] or os.path.join(tempfile.mkdtemp(prefix="soc-layer-"), "layer.sqlite3")
+        messages = opts["messages"]
+        ctx = mp.get_context("spawn")
+        ready, results = ctx.Queue(), ctx.Queue()
+        procs = [
+            ctx.Process(target=_worker, args=(path, opts["sockets"], messages, messages + 10, ready, results))
+            for _ in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        for _ in procs:
+            ready.get(timeout=60)
+        time.sleep(0.2)
+
+        sent_at = time.time()
+
+        async def send_all():
+            layer = SQLiteChannelLayer(path=path, capacity=messages + 10)
+            interval = 1.0 / opts["rate"] if opts["rate"] else 0
+            started = time.perf_counter()
+            for i in range(messages):
+                await layer.group_send(GROUP, {"type": "bench", "i": i, "ts": time.time()})
+                if interval:
+                    await asyncio.sleep(max(0.0, started + (i + 1) * interval - time.perf_counter()))
+            return time.perf_counter() - started
+
+        send_seconds = asyncio.run(send_all())
+        latencies: list[float] = []
+        finished = sent_at
+        for _ in procs:
+            worker_latencies, worker_last = results.get(timeout=120)
+            latencies.extend(worker_latencies)
+            finished = max(finished, worker_last)
+        for p in procs:
+            p.join(timeout=10)
+        total_seconds = finished - sent_at
+
+        latencies.sort()
+        expected = workers * opts["sockets"] * messages
+        return {
+            "workers": workers,
+            "sockets": workers * opts["sockets"],
+            "group_sends": messages,
+            "group_send_per_sec": round(messages / send_seconds, 1),
+            "deliveries": len(latencies),
+            "lost": expected - len(latencies),
+            "deliveries_per_sec": round(len(latencies) / total_seconds, 1) if total_seconds else 0.0,
+            "latency_ms": {
+                "p50": round(_percentile(latencies, 50) * 1000, 2),
+                "p95": round(_percentile(latencies, 95) * 1000, 2),
+                "p99": round(_percentile(latencies, 99) * 1000, 2),
+                "max": round((latencies[-1] if latencies else 0.0) * 1000, 2),
+                "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            },
+        }
+
+    def handle(self, *args, **opts):
+        rows = [self._run(n, opts) for n in opts["workers"]]
+        if opts["json"]:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+        self.stdout.write(f"{'workers':>7} {'sockets':>7} {'send/s':>9} {'deliv/s':>9} {'lost':>5} "
+                          f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+        for r in rows:
+            lat = r["latency_ms"]
+            self.stdout.write(f"{r['workers']:>7} {r['sockets']:>7} {r['group_send_per_sec']:>9} "
+                              f"{r['deliveries_per_sec']:>9} {r['lost']:>5} {lat['p50']:>7} "
+                              f"{lat['p95']:>7} {lat['p99']:>7} {lat['max']:>7}")
@@ -0,0 +1,80 @@
+import json
+import random
+import time
+from django.core.management.base import BaseCommand
+
+from soc.models import IncidentType, Severity
+from soc.rules import CompiledRule, RuleSet, compile_query, event_source
+from soc.management.commands.run_log_generator import build_event
+
+REAL_SOURCES = ["auth.failed", "web.access", "windows.service_install"]
+
+def synthetic_query(rng: random.Random, extra_sources: int) -> str:
+    """Rule shaped like the seeded ones; most target sources the generator never emits."""
+    if rng.random() < 0.2:
+        source = rng.choice(REAL_SOURCES)
+    else:
+        source = f"src{rng.randrange(extra_sources)}.events"
+    condition = rng.choice([
+        f"attempts > {rng.randint(10, 200)} and src_ip == <IP>",
+        f'url contains "{rng.choice(["UNION", "<script", "../", "select", "%00", "onerror="])}"',
+        f'hostname == "{rng.choice(["WIN-APP-01", "WEB-01", "DB-01", "AD-01"])}" and not user == "svc_backup"',
+        f'service_path contains "{rng.choice(["ProgramData", "Temp", "AppData"])}" or service_name startswith "Sys"',
+        f'(url matches "id=\\d+" or url endswith ".php") and origin_zone >= {rng.randint(1, 5)}',
+    ])
+    return f"{source} | where {condition} | last {rng.choice(['1h', '24h', '15m'])}"
+
+class Command(BaseCommand):
+    help = "Benchmark compiled rule matching (events/sec) for growing rule sets, indexed vs linear scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rules", type=int, nargs="+", default=[5, 500, 5000])
+        parser.add_argument("--events", type=int, default=20000)
+        parser.add_argument("--sources", type=int, default=50, help="Distinct synthetic event sources.")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def _run(self, n_rules: int, events: list[dict], opts) -> dict:
+        rng = random.Random(opts["seed"])
+        started = time.perf_counter()
+        compiled = []
+        for i in range(n_rules):
+            source, predicate, window, key_fields = compile_query(synthetic_query(rng, opts["sources"]))
+            compiled.append(CompiledRule(
+                id=i, name=f"bench-{i}", source=source,
+                severity=rng.choice(Severity.values), incident_type=rng.choice(IncidentType.values),
+                predicate=predicate, window_seconds=window, key_fields=key_fields,
+            ))
+        ruleset = RuleSet.build(compiled)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        matches = sum(1 for event in events if ruleset.apply(event) is not event)
+        indexed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for event in events:
+            source = event_source(event)
+            [r for r in compiled if r.source in (source, "*") and r.predicate(event)]
+        linear = time.perf_counter() - started
+
+        return {
+            "rules": n_rules,
+            "events": len(events),
+            "compile_ms": round(compile_ms, 1),
+            "indexed_events_per_sec": round(len(events) / indexed),
+            "linear_events_per_sec": round(len(events) / linear),
+            "matched_events": matches,
+        }
+
+    def handle(self, *args, **opts):
+        random.seed(opts["seed"])
+        events = [build_event(1) for _ in range(opts["events"])]
+        rows = [self._run(n, events, opts) for n in opts["rules"]]
+        if opts["json"]:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+        self.stdout.write(f"{'rules':>6} {'compile ms':>10} {'indexed ev/s':>13} {'linear ev/s':>12} {'matched':>8}")
+        for r in rows:
+            self.stdout.write(f"{r['rules']:>6} {r['compile_ms']:>10} {r['indexed_events_per_sec']:>13} "
+                              f"{r['linear_events_per_sec']:>12} {r['matched_events']:>8}")
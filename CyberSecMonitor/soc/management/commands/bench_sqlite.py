@@ -0,0 +1,120 @@
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import threading
+import time
+from django.core.management.base import BaseCommand
+
+from soc.management.commands.bench_channel_layer import _percentile
+
+# (label, SOC_SQLITE_PROFILE, SOC_DB_WRITER)
+CONFIGS = [
+    ("default", "default", "0"),
+    ("production", "production", "0"),
+    ("production+writer", "production", "1"),
+]
+
+def _bench(db_path: str, profile: str, writer: str, opts: dict, results):
+    """Runs in a fresh process so the DB settings under test are the ones Django starts with."""
+    os.environ.update(SOC_DB_PATH=db_path, SOC_SQLITE_PROFILE=profile, SOC_DB_WRITER=writer)
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.db import OperationalError, connection
+    from core.models import Client
+    from soc.models import Alert
+    from soc.services import ingest_event, load_dashboard_counters
+    from soc.management.commands.run_log_generator import build_event
+
+    call_command("migrate", verbosity=0)
+    client_id = Client.objects.create(name="Bench").id
+    connection.close()
+
+    stop = time.monotonic() + opts["seconds"]
+    stats = {"writes": 0, "reads": 0, "locked": 0, "errors": 0}
+    write_latencies: list[float] = []
+    lock = threading.Lock()
+
+    def count(key: str, n: int = 1):
+        with lock:
+            stats[key] += n
+
+    def writer():
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            try:
+                ingest_event(build_event(client_id))
+            except OperationalError as e:
+                count("locked" if "locked" in str(e) else "errors")
+                continue
+            with lock:
+                write_latencies.append(time.perf_counter() - started)
+                stats["writes"] += 1
+        connection.close()
+
+    def reader():
+        n = 0
+        while time.monotonic() < stop:
+            try:
+                if n % 2:
+                    load_dashboard_counters()
+                else:
+                    list(Alert.objects.order_by("-created_at")[:50])
+            except OperationalError as e:
+                count("locked" if "locked" in str(e) else "errors")
+                continue
+            n += 1
+            count("reads")
+        connection.close()
+
+    threads = [threading.Thread(target=writer) for _ in range(opts["writers"])]
+    threads += [threading.Thread(target=reader) for _ in range(opts["readers"])]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    write_latencies.sort()
+    results.put({
+        **stats,
+        "writes_per_sec": round(stats["writes"] / elapsed, 1),
+        "reads_per_sec": round(stats["reads"] / elapsed, 1),
+        "write_ms": {
+            "p50": round(_percentile(write_latencies, 50) * 1000, 2),
+            "p99": round(_percentile(write_latencies, 99) * 1000, 2),
+        },
+    })
+
+class Command(BaseCommand):
+    help = "Benchmark mixed read/write throughput for the default and production SQLite profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4, help="Threads calling ingest_event.")
+        parser.add_argument("--readers", type=int, default=4, help="Threads reading alert lists and dashboard counters.")
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def handle(self, *args, **opts):
+        ctx = mp.get_context("spawn")
+        rows = []
+        for label, profile, writer in CONFIGS:
+            db_path = os.path.join(tempfile.mkdtemp(prefix="soc-sqlite-"), "bench.sqlite3")
+            results = ctx.Queue()
+            p = ctx.Process(target=_bench, args=(db_path, profile, writer, opts, results))
+            p.start()
+            row = results.get(timeout=opts["seconds"] + 120)
+            p.join(timeout=10)
+            rows.append({"config": label, **row})
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+        self.stdout.write(f"{'config':>18} {'writes/s':>9} {'reads/s':>9} {'locked':>7} {'errors':>7} "
+                          f"{'w p50 ms':>9} {'w p99 ms':>9}")
+        for r in rows:
+            self.stdout.write(f"{r['config']:>18} {r['writes_per_sec']:>9} {r['reads_per_sec']:>9} "
+                              f"{r['locked']:>7} {r['errors']:>7} {r['write_ms']['p50']:>9} "
+                              f"{r['write_ms']['p99']:>9}")
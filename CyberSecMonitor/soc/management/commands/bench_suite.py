@@ -0,0 +1,94 @@
+import json
+import multiprocessing as mp
+import os
+import platform
+import queue
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+def _bench(db_path: str, rows: int, opts: dict, results):
+    """Runs in a fresh process so Django starts on the dataset's database."""
+    os.environ.update(SOC_DB_PATH=db_path, DJANGO_DEBUG="0")
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from soc.models import Alert
+    from soc.benchmarks import build_benches, measure
+
+    call_command("migrate", verbosity=0)
+    if not Alert.objects.exists():
+        with open(os.devnull, "w") as devnull:
+            call_command("seed_history", alerts=rows, clients=20, days=30, seed=1,
+                         workers=max(1, (os.cpu_count() or 1) - 1), stdout=devnull)
+
+    out = {}
+    for bench in build_benches(sockets=opts["sockets"]):
+        if opts["only"] and not any(s in bench.name for s in opts["only"]):
+            continue
+        out[bench.name] = measure(bench, opts["repeat"]).as_dict()
+    results.put(out)
+
+class Command(BaseCommand):
+    help = "Benchmark the SOC hot paths on seeded datasets and compare against a stored baseline."
+
+    def add_arguments(self, parser):
+        from soc.benchmarks import DATASETS
+        parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), default=["10k"])
+        parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "soc-bench"),
+                            help="Seeded databases are kept here and reused between runs.")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark.")
+        parser.add_argument("--sockets", type=int, default=100, help="Subscribers in the WebSocket fan-out bench.")
+        parser.add_argument("--only", nargs="*", default=[], help="Run benchmarks whose name contains any of these.")
+        parser.add_argument("--output", default="", help="Write results as JSON to this file.")
+        parser.add_argument("--baseline", default="", help="Results file to compare against.")
+        parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown, as a fraction.")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def handle(self, *args, **opts):
+        # soc.benchmarks imports models, so the spawned workers must not load it at import time
+        from soc.benchmarks import DATASETS, compare
+        os.makedirs(opts["data_dir"], exist_ok=True)
+        ctx = mp.get_context("spawn")
+        results = {}
+        for name in opts["datasets"]:
+            db_path = os.path.join(opts["data_dir"], f"bench-{name}.sqlite3")
+            out = ctx.Queue()
+            p = ctx.Process(target=_bench, args=(db_path, DATASETS[name], opts, out))
+            p.start()
+            while name not in results:
+                try:
+                    results[name] = out.get(timeout=5)
+                except queue.Empty:
+                    if not p.is_alive():
+                        raise CommandError(f"benchmark process for {name} exited with code {p.exitcode}")
+            p.join(timeout=30)
+
+        report = {
+            "meta": {"created_at": timezone.now().isoformat(), "python": platform.python_version(),
+                     "machine": platform.machine(), "repeat": opts["repeat"]},
+            "results": results,
+        }
+        if opts["output"]:
+            with open(opts["output"], "w") as f:
+                json.dump(report, f, indent=2)
+
+        regressions = []
+        if opts["baseline"]:
+            with open(opts["baseline"]) as f:
+                regressions = compare(results, json.load(f)["results"], opts["threshold"])
+
+        if opts["json"]:
+            self.stdout.write(json.dumps({**report, "regressions": regressions}, indent=2))
+        else:
+            self.stdout.write(f"{'dataset':>7} {'benchmark':<46} {'median ms':>10} {'max ms':>9} "
+                              f"{'queries':>8} {'peak KiB':>9}")
+            for dataset, benches in results.items():
+                for bench, r in benches.items():
+                    self.stdout.write(f"{dataset:>7} {bench:<46} {r['wall_ms']['median']:>10} "
+                                      f"{r['wall_ms']['max']:>9} {r['queries']:>8} {r['peak_kb']:>9}")
+            for line in regressions:
+                self.stdout.write(self.style.WARNING(f"REGRESSION {line}"))
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) over {opts['threshold']:.0%} against "
+                               f"{opts['baseline']}")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from soc.blobs import store_blobs
+from soc.models import Alert, Case
+
+# model -> inline payload column written before the blob store
+INLINE_FIELDS = [(Alert, "raw_event"), (Case, "evidence")]
+
+class Command(BaseCommand):
+    help = "Move inline raw_event/evidence payloads of older rows into the deduplicated blob store."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        for model, field in INLINE_FIELDS:
+            moved = 0
+            last_id = 0
+            while True:
+                rows = list(
+                    model.objects.filter(blob__isnull=True, id__gt=last_id)
+                    .order_by("id").values_list("id", field)[:opts["chunk_size"]]
+                )
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                rows = [(pk, payload) for pk, payload in rows if payload]
+                if not rows:
+                    continue
+                with transaction.atomic():
+                    blobs = store_blobs([payload for _, payload in rows])
+                    objs = [model(id=pk, blob_id=blob.digest, **{field: {}}) for (pk, _), blob in zip(rows, blobs)]
+                    model.objects.bulk_update(objs, ["blob", field])
+                moved += len(rows)
+            self.stdout.write(self.style.SUCCESS(f"{model._meta.db_table}: moved {moved} payloads"))
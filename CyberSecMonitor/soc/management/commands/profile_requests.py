@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from soc.profiler import ProfileControl, profile_dir, read_control, write_control
+
+class Command(BaseCommand):
+    help = ("Switch the sampling profiler on for requests whose route matches a pattern (route names as in "
+            "/metrics, e.g. dashboard_api, CaseListAPI, '*_page'); running workers pick it up within a second.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--route", default="*", help="fnmatch pattern over route names.")
+        parser.add_argument("--percent", type=float, default=100.0, help="Share of matching requests to sample.")
+        parser.add_argument("--minutes", type=float, default=10.0, help="Switch off again after this long.")
+        parser.add_argument("--off", action="store_true", help="Stop profiling now.")
+        parser.add_argument("--status", action="store_true", help="Show the current setting and profile files.")
+
+    def handle(self, *args, **opts):
+        if opts["status"]:
+            control = read_control()
+            if control is None:
+                self.stdout.write("profiling is off")
+            else:
+                left = (control.until - time.time()) / 60
+                self.stdout.write(f"profiling {control.route!r} at {control.percent:g}% for {left:.1f} more minutes")
+            files = sorted(profile_dir().glob("*.folded"))
+            for path in files:
+                self.stdout.write(f"  {path.name}  {path.stat().st_size / 1024:,.1f} KiB")
+            self.stdout.write(f"{len(files)} profile files in {profile_dir()}")
+            return
+
+        if opts["off"]:
+            write_control(None)
+            self.stdout.write(self.style.SUCCESS("profiling switched off"))
+            return
+
+        if not 0 < opts["percent"] <= 100:
+            raise CommandError("--percent must be in (0, 100]")
+        if opts["minutes"] <= 0:
+            raise CommandError("--minutes must be positive")
+        write_control(ProfileControl(opts["route"], opts["percent"], time.time() + opts["minutes"] * 60))
+        self.stdout.write(self.style.SUCCESS(
+            f"profiling {opts['route']!r} at {opts['percent']:g}% of requests for {opts['minutes']:g} minutes; "
+            f"folded stacks go to {profile_dir()} (flamegraph.pl / speedscope)"
+        ))
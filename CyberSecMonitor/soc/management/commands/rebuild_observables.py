@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from soc import observables
+from soc.models import Alert, Case, Observable, ObservableLink
+
+class Command(BaseCommand):
+    help = ("Index observables of alerts/cases that have none in the observable index (rows written before "
+            "it existed, bulk-seeded, or with SOC_OBSERVABLES_ENABLED=0); --full starts over.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Drop every observable and link first.")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        if opts["full"]:
+            with connection.cursor() as cur:
+                cur.execute(f"DELETE FROM {ObservableLink._meta.db_table}")
+                cur.execute(f"DELETE FROM {Observable._meta.db_table}")
+
+        for kind, model in ((ObservableLink.KIND_ALERT, Alert), (ObservableLink.KIND_CASE, Case)):
+            # anti-join through soc_obslink_object_idx, so history older than live rows is found too
+            unlinked = model.objects.filter(
+                ~Exists(ObservableLink.objects.filter(kind=kind, object_id=OuterRef("id")))
+            ).select_related("blob").order_by("id")
+            last_id, done = 0, 0
+            started = time.perf_counter()
+            while True:
+                rows = list(unlinked.filter(id__gt=last_id)[:opts["chunk_size"]])
+                if not rows:
+                    break
+                events = [r.payload for r in rows]
+                with transaction.atomic():
+                    if kind == ObservableLink.KIND_ALERT:
+                        observables.record(rows, events)
+                    else:
+                        observables.record([], [], rows, events)
+                last_id = rows[-1].id
+                done += len(rows)
+                rate = done / (time.perf_counter() - started)
+                self.stdout.write(f"{model._meta.db_table}: {done} rows ({rate:,.0f}/s)")
+            self.stdout.write(self.style.SUCCESS(f"{model._meta.db_table}: indexed observables of {done} rows"))
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+from soc.archive import archived_before
+from soc.models import Alert, Case, DashboardRollup
+
+class Command(BaseCommand):
+    help = ("Rebuild hourly dashboard rollups from the Alert and Case tables (backfill history). "
+            "Hours before the archive_old_records cutoff are kept, since their rows are archived.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", default="", help="Only rebuild buckets from this date (YYYY-MM-DD, UTC).")
+        parser.add_argument("--client", type=int, default=0, help="Only rebuild this client id.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def _grouped(self, model, since, client_id):
+        qs = model.objects.all()
+        if since:
+            qs = qs.filter(created_at__gte=since)
+        if client_id:
+            qs = qs.filter(client_id=client_id)
+        return (
+            qs.annotate(bucket=TruncHour("created_at", tzinfo=dt_timezone.utc))
+            .values_list("client_id", "bucket", "severity", "incident_type")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+
+    def handle(self, *args, **opts):
+        since = None
+        if opts["since"]:
+            try:
+                since = datetime.strptime(opts["since"], "%Y-%m-%d").replace(tzinfo=dt_timezone.utc)
+            except ValueError:
+                raise CommandError("--since must be YYYY-MM-DD")
+        archived = archived_before()
+        if archived is not None:
+            # first whole hour after the cutoff: every row from there on is still in the hot tables
+            first_live = archived.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+            if first_live < archived:
+                first_live += timedelta(hours=1)
+            if since is None or since < first_live:
+                since = first_live
+                self.stdout.write(f"Keeping buckets before {since:%Y-%m-%d %H:%M} UTC (archived).")
+        client_id = opts["client"]
+
+        # counted inside the transaction that replaces the rows, so ingest between the two can't be lost
+        with transaction.atomic():
+            buckets: dict[tuple, list[int]] = {}
+            for client, bucket, sev, itype, n in self._grouped(Alert, since, client_id):
+                buckets.setdefault((client, bucket, sev, itype), [0, 0])[0] += n
+            for client, bucket, sev, itype, n in self._grouped(Case, since, client_id):
+                buckets.setdefault((client, bucket, sev, itype), [0, 0])[1] += n
+
+            stale = DashboardRollup.objects.all()
+            if since:
+                stale = stale.filter(hour__gte=since)
+            if client_id:
+                stale = stale.filter(client_id=client_id)
+            deleted, _ = stale.delete()
+            DashboardRollup.objects.bulk_create(
+                [
+                    DashboardRollup(
+                        client_id=client, hour=bucket, severity=sev, incident_type=itype,
+                        alerts=n_alerts, cases=n_cases,
+                    )
+                    for (client, bucket, sev, itype), (n_alerts, n_cases) in buckets.items()
+                ],
+                batch_size=opts["batch_size"],
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(buckets)} rollup buckets (removed {deleted} old rows)."
+        ))
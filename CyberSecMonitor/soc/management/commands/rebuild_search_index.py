@@ -0,0 +1,66 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from soc.exports import parse_bound
+from soc.search import INDEXES, index_row, write_rows
+
+class Command(BaseCommand):
+    help = ("Index alerts/cases for /api/search/. By default only rows missing from the index "
+            "(e.g. bulk-seeded or written with SOC_SEARCH_SYNC=0); --full starts over.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=list(INDEXES), default="", help="Only this kind (default: both).")
+        parser.add_argument("--full", action="store_true", help="Empty the index and reindex every row.")
+        parser.add_argument("--updated-since", default="",
+                            help="Also reindex cases updated since this date (YYYY-MM-DD or ISO datetime).")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def _unindexed(self, kind: str):
+        """Rows with no index entry, chunked by id (anti-join on the FTS rowid)."""
+        model, table = INDEXES[kind]
+        sql = (f"SELECT id FROM {model._meta.db_table} AS r WHERE id > %s "
+               f"AND NOT EXISTS (SELECT 1 FROM {table} WHERE rowid = r.id) ORDER BY id LIMIT %s")
+
+        def chunk(last_id: int, chunk_size: int) -> list:
+            with connection.cursor() as cur:
+                cur.execute(sql, [last_id, chunk_size])
+                ids = [row_id for (row_id,) in cur.fetchall()]
+            return list(model.objects.filter(id__in=ids).select_related("blob").order_by("id"))
+        return chunk
+
+    def _index(self, kind: str, next_chunk, chunk_size: int) -> int:
+        done, last_id = 0, 0
+        started = time.perf_counter()
+        while True:
+            rows = next_chunk(last_id, chunk_size)
+            if not rows:
+                return done
+            with transaction.atomic():
+                write_rows(kind, [index_row(r, r.payload, getattr(r, "description", "")) for r in rows])
+            last_id = rows[-1].id
+            done += len(rows)
+            self.stdout.write(f"{kind}: {done} rows ({done / (time.perf_counter() - started):,.0f}/s)")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "sqlite":
+            raise CommandError("full-text search needs SQLite FTS5")
+        try:
+            updated_since = parse_bound(opts["updated_since"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for kind in [opts["kind"]] if opts["kind"] else list(INDEXES):
+            model, table = INDEXES[kind]
+            if opts["full"]:
+                with connection.cursor() as cur:
+                    cur.execute(f"DELETE FROM {table}")
+            total = self._index(kind, self._unindexed(kind), opts["chunk_size"])
+            if updated_since and kind == "cases":
+                updated = model.objects.filter(updated_at__gte=updated_since).select_related("blob").order_by("id")
+                total += self._index(kind, lambda last_id, n: list(updated.filter(id__gt=last_id)[:n]),
+                                     opts["chunk_size"])
+            if opts["full"]:
+                with connection.cursor() as cur:
+                    cur.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+            self.stdout.write(self.style.SUCCESS(f"Indexed {total} {kind}."))
@@ -1,15 +1,18 @@
 import asyncio
+import json
 import random
 import aiohttp
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 
+from soc.loadgen import parse_mix, run_load, weighted
+
 INCIDENTS = ["BRUTE_FORCE","SQL_INJECTION","XSS","PATH_TRAVERSAL","SUSPICIOUS_SERVICE"]
 SEVERITIES = ["LOW","MEDIUM","HIGH","CRITICAL"]
 
-def build_event(client_id: int):
-    it = random.choice(INCIDENTS)
-    sev = random.choices(SEVERITIES, weights=[32,40,20,8], k=1)[0]
+def build_event(client_id: int, incident_type: str | None = None, severity: str | None = None):
+    it = incident_type or random.choice(INCIDENTS)
+    sev = severity or random.choices(SEVERITIES, weights=[32,40,20,8], k=1)[0]
 
     base = {
         "client_id": client_id,
@@ -94,13 +97,23 @@ def build_event(client_id: int):
     return base
 
 class Command(BaseCommand):
-    help = "Run async log generator that sends events into REST ingest endpoint."
+    help = "Run async log generator that sends events into REST ingest endpoint (or load-test it with --concurrency)."
 
     def add_arguments(self, parser):
         parser.add_argument("--url", default="http://127.0.0.1:8000/api/ingest/")
         parser.add_argument("--client", type=int, default=1)
         parser.add_argument("--interval", type=float, default=2.0)
         parser.add_argument("--count", type=int, default=0, help="If >0, send exactly N events then exit.")
+        # load mode
+        parser.add_argument("--concurrency", type=int, default=0, help="Load mode: N concurrent workers.")
+        parser.add_argument("--rate", type=float, default=0, help="Load mode: target requests/sec, open loop (0 = as fast as possible).")
+        parser.add_argument("--duration", type=float, default=10, help="Load mode: seconds to run (0 = until --count).")
+        parser.add_argument("--severity-mix", default="", help='e.g. "LOW=32,MEDIUM=40,HIGH=20,CRITICAL=8".')
+        parser.add_argument("--incident-mix", default="", help='e.g. "BRUTE_FORCE=3,XSS=1".')
+        parser.add_argument("--batch", type=int, default=0, help="Load mode: POST N events per request to --batch-url.")
+        parser.add_argument("--batch-url", default="http://127.0.0.1:8000/api/ingest/batch/")
+        parser.add_argument("--timeout", type=float, default=10)
+        parser.add_argument("--json", action="store_true", help="Load mode: print the result as JSON.")
 
     async def _run(self, url, client_id, interval, count):
         async with aiohttp.ClientSession() as session:
@@ -117,5 +130,51 @@ class Command(BaseCommand):
                     return
                 await asyncio.sleep(interval)
 
+    def _load(self, opts):
+        try:
+            severities = parse_mix(opts["severity_mix"], SEVERITIES)
+            incidents = parse_mix(opts["incident_mix"], INCIDENTS)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        def event():
+            return build_event(opts["client"], incident_type=weighted(incidents), severity=weighted(severities))
+
+        if opts["batch"]:
+            url, per_request = opts["batch_url"], opts["batch"]
+            make_body = lambda: [event() for _ in range(per_request)]
+        else:
+            url, per_request = opts["url"], 1
+            make_body = event
+
+        result = asyncio.run(run_load(
+            make_body, url,
+            concurrency=opts["concurrency"],
+            rate=opts["rate"],
+            duration=opts["duration"],
+            total=opts["count"],
+            events_per_request=per_request,
+            timeout=opts["timeout"],
+        ))
+        report = {
+            "url": url,
+            "concurrency": opts["concurrency"],
+            "target_rate": opts["rate"],
+            "batch": opts["batch"],
+            **result.as_dict(),
+        }
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        lat = report["latency_ms"]
+        self.stdout.write(f"{report['requests']} requests / {report['events']} events in {report['seconds']}s: "
+                          f"{report['requests_per_sec']} req/s, {report['events_per_sec']} events/s")
+        self.stdout.write(f"latency ms: p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+        errors = ", ".join(f"{k}: {v}" for k, v in sorted(report["errors"].items())) or "none"
+        self.stdout.write(f"errors: {errors}; rejected events: {report['rejected_events']}")
+
     def handle(self, *args, **opts):
+        if opts["concurrency"] > 0:
+            self._load(opts)
+            return
         asyncio.run(self._run(opts["url"], opts["client"], opts["interval"], opts["count"]))
@@ -0,0 +1,188 @@
+import json
+import multiprocessing as mp
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.db.models.constants import OnConflict
+
+from core.models import Client
+from soc.aggregation import event_fingerprint
+from soc.ipnet import ip_key
+from soc.models import Alert, Case, CaseStatus, Dispatch, DispatchChannel, EventBlob, Task, Verdict
+from soc.services import _needs_case
+from soc.management.commands.run_log_generator import build_event
+
+# alerts per hour of day: office-hours peak over a steady floor of overnight scanning
+HOUR_WEIGHTS = [3, 3, 2, 2, 2, 3, 4, 6, 9, 11, 12, 12, 11, 12, 12, 11, 10, 9, 7, 6, 5, 4, 4, 3]
+VERDICTS = [Verdict.TRUE_POSITIVE, Verdict.FALSE_POSITIVE, Verdict.OTHER]
+VERDICT_WEIGHTS = [55, 30, 15]
+
+ALERT_COLUMNS = ["created_at", "client_id", "severity", "incident_type", "title", "raw_event", "blob_id",
+                 "is_false_positive", "count", "fingerprint", "first_seen", "last_seen",
+                 "source_ip_num", "host_ip_num"]
+CASE_COLUMNS = ["id", "created_at", "updated_at", "client_id", "severity", "incident_type", "status", "verdict",
+                "title", "description", "analyst_name", "analyst_group", "source_ip", "host_ip", "hostname",
+                "evidence", "blob_id", "source_ip_num", "host_ip_num"]
+
+def _insert_sql(model, columns: list[str], on_conflict=None) -> str:
+    return (f"{connection.ops.insert_statement(on_conflict=on_conflict)} {model._meta.db_table} "
+            f"({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})")
+
+def _generate_hour(task: tuple) -> dict:
+    """
+    Rows for one hour of history. Cases carry no id yet (the writer numbers
+    them), so tasks and dispatches point at the case's index in this chunk.
+    Runs in pool workers, so it must not touch the database.
+    """
+    start, n, clients, now, seed, inline, dispatch_ratio = task
+    rng = random.Random(seed)
+    random.seed(seed)  # build_event draws from the module-level generator
+    to_db = connection.ops.adapt_datetimefield_value
+    out = {"alerts": [], "blobs": {}, "cases": [], "tasks": [], "dispatches": []}
+
+    for created in sorted(start + timedelta(seconds=rng.random() * 3600) for _ in range(n)):
+        created = min(created, now)
+        client_id = rng.choice(clients)
+        event = build_event(client_id)
+        event["created_at"] = created.isoformat()
+        created_db = to_db(created)
+        ip_keys = (ip_key(event["source_ip"]), ip_key(event["host_ip"]))
+
+        blob_id, payload = None, "{}"
+        if inline:
+            payload = json.dumps(event)
+        else:
+            blob = EventBlob.from_payload(event)
+            out["blobs"].setdefault(blob.digest, (blob.digest, blob.data, blob.size, created_db))
+            blob_id = blob.digest
+
+        out["alerts"].append((
+            created_db, client_id, event["severity"], event["incident_type"], event["title"], payload, blob_id,
+            rng.random() < 0.08, 1, event_fingerprint(event, client_id), created_db, created_db, *ip_keys,
+        ))
+        if not _needs_case(event):
+            continue
+
+        # older cases are mostly closed out
+        resolved = rng.random() < (0.9 if (now - created).days > 7 else 0.3)
+        status = CaseStatus.RESOLVED if resolved else rng.choice([CaseStatus.OPEN, CaseStatus.IN_PROGRESS])
+        verdict = rng.choices(VERDICTS, weights=VERDICT_WEIGHTS, k=1)[0] if resolved else Verdict.OTHER
+        updated_db = to_db(min(now, created + timedelta(minutes=rng.randint(5, 72 * 60))))
+        index = len(out["cases"])
+        out["cases"].append((
+            created_db, updated_db, client_id, event["severity"], event["incident_type"], status, verdict,
+            event.get("case_title") or event["title"], "Seeded case.", "Unassigned", "SOC L1",
+            event["source_ip"], event["host_ip"], event["hostname"], payload, blob_id, *ip_keys,
+        ))
+        for title in event.get("tasks", [])[:5]:
+            out["tasks"].append((index, title, resolved))
+        if rng.random() < dispatch_ratio:
+            out["dispatches"].append((index, rng.choice(DispatchChannel.values),
+                                      json.dumps(["soc@example.local"]), updated_db))
+    return out
+
+class Command(BaseCommand):
+    help = "Bulk-insert synthetic alert/case/task/dispatch history for scale testing (millions of rows)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alerts", type=int, default=100_000)
+        parser.add_argument("--clients", type=int, default=10)
+        parser.add_argument("--days", type=int, default=30, help="History span ending now.")
+        parser.add_argument("--batch-size", type=int, default=50_000, help="Alerts per transaction.")
+        parser.add_argument("--workers", type=int, default=1, help="Processes generating rows (one writer).")
+        parser.add_argument("--dispatch-ratio", type=float, default=0.1, help="Share of cases with a dispatch.")
+        parser.add_argument("--payloads", choices=["blob", "inline"], default="blob",
+                            help="Store events in the blob store (like ingest) or inline in raw_event/evidence.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (0 = random).")
+        parser.add_argument("--no-rollups", action="store_true", help="Skip rebuilding dashboard rollups.")
+
+    def _clients(self, n: int) -> list[int]:
+        ids = list(Client.objects.order_by("id").values_list("id", flat=True)[:n])
+        for i in range(len(ids), n):
+            ids.append(Client.objects.get_or_create(name=f"Seed Client {i + 1:02d}")[0].id)
+        return ids
+
+    def _hours(self, opts: dict, clients: list[int], first_day: datetime, now: datetime) -> list[tuple]:
+        """Spread --alerts over days (quieter weekends) and hours (HOUR_WEIGHTS), in time order."""
+        rng = random.Random(opts["seed"] or None)
+        slots = [first_day + timedelta(days=d, hours=h) for d in range(opts["days"]) for h in range(24)]
+        slots = [s for s in slots if s < now]
+        weights = [HOUR_WEIGHTS[s.hour] * (0.6 if s.weekday() >= 5 else 1.0) for s in slots]
+        per_slot = Counter(rng.choices(range(len(slots)), weights=weights, k=opts["alerts"]))
+        tasks = []
+        for i, start in enumerate(slots):
+            if per_slot[i]:
+                tasks.append((start, per_slot[i], clients, now, rng.getrandbits(64),
+                              opts["payloads"] == "inline", opts["dispatch_ratio"]))
+        return tasks
+
+    def handle(self, *args, **opts):
+        clients = self._clients(opts["clients"])
+        now = datetime.now(dt_timezone.utc)
+        first_day = datetime.combine(now.date() - timedelta(days=opts["days"] - 1), datetime.min.time(),
+                                     dt_timezone.utc)
+        hours = self._hours(opts, clients, first_day, now)
+
+        alert_sql = _insert_sql(Alert, ALERT_COLUMNS)
+        case_sql = _insert_sql(Case, CASE_COLUMNS)
+        task_sql = _insert_sql(Task, ["case_id", "title", "done"])
+        dispatch_sql = _insert_sql(Dispatch, ["case_id", "channel", "recipients", "sent_at"])
+        blob_sql = _insert_sql(EventBlob, ["digest", "data", "size", "created_at"], on_conflict=OnConflict.IGNORE)
+
+        next_case_id = (Case.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+        totals = {"alerts": 0, "cases": 0, "tasks": 0, "dispatches": 0}
+        rows = {"alerts": [], "blobs": {}, "cases": [], "tasks": [], "dispatches": []}
+        started = time.perf_counter()
+
+        def flush():
+            with transaction.atomic(), connection.cursor() as cur:
+                if rows["blobs"]:
+                    cur.executemany(blob_sql, list(rows["blobs"].values()))
+                for key, sql in (("alerts", alert_sql), ("cases", case_sql), ("tasks", task_sql),
+                                 ("dispatches", dispatch_sql)):
+                    if rows[key]:
+                        cur.executemany(sql, rows[key])
+                        totals[key] += len(rows[key])
+            for key in rows:
+                rows[key] = {} if key == "blobs" else []
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"alerts {totals['alerts']}/{opts['alerts']}  cases {totals['cases']}  "
+                              f"tasks {totals['tasks']}  dispatches {totals['dispatches']}  "
+                              f"{totals['alerts'] / elapsed:,.0f} alerts/s")
+
+        def add(chunk: dict):
+            nonlocal next_case_id
+            base = next_case_id
+            rows["alerts"] += chunk["alerts"]
+            rows["blobs"].update(chunk["blobs"])
+            rows["cases"] += [(base + i, *case) for i, case in enumerate(chunk["cases"])]
+            rows["tasks"] += [(base + i, *rest) for i, *rest in chunk["tasks"]]
+            rows["dispatches"] += [(base + i, *rest) for i, *rest in chunk["dispatches"]]
+            next_case_id += len(chunk["cases"])
+            if len(rows["alerts"]) >= opts["batch_size"]:
+                flush()
+
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cur:
+                cur.execute("PRAGMA synchronous=OFF")
+
+        if opts["workers"] > 1:
+            with mp.get_context("fork").Pool(opts["workers"]) as pool:
+                for chunk in pool.imap(_generate_hour, hours):
+                    add(chunk)
+        else:
+            for task in hours:
+                add(_generate_hour(task))
+        flush()
+
+        if not opts["no_rollups"]:
+            call_command("rebuild_rollups", since=first_day.strftime("%Y-%m-%d"), stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {totals['alerts']} alerts, {totals['cases']} cases, {totals['tasks']} tasks, "
+            f"{totals['dispatches']} dispatches for {len(clients)} clients in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,255 @@
+import threading
+import time
+from bisect import bisect_left
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import StreamingHttpResponse
+
+# Process-local metrics in the Prometheus text format. Each daphne worker
+# keeps its own numbers; scrape every worker (or sum them) for the host.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+BYTES_BUCKETS = tuple(256 * 4 ** i for i in range(10))  # 256 B .. 64 MB
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, n: float = 1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + n
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items()) or ([((), 0)] if not self.label_names else [])
+        lines += [f"{self.name}{_labels(self.label_names, k)} {v}" for k, v in sorted(values)]
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram; ``observe`` is one bisect and a few adds under a lock."""
+
+    def __init__(self, name: str, help: str, buckets: tuple, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(k, list(s[0]), s[1], s[2]) for k, s in self._series.items()]
+        names = self.label_names + ("le",)
+        for labels, counts, total, n in sorted(snapshot):
+            running = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                running += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {n}")
+        return lines
+
+class Gauge:
+    """Read at scrape time from ``fn`` (a number, or a {label values: number} dict)."""
+
+    def __init__(self, name: str, help: str, fn, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.fn, self.label_names = name, help, fn, labels
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.fn()
+        except Exception as e:
+            print("Metrics gauge error:", self.name, e)
+            return lines
+        values = value.items() if isinstance(value, dict) else [((), value)]
+        lines += [f"{self.name}{_labels(self.label_names, k)} {v}" for k, v in sorted(values)]
+        return lines
+
+class RateMeter:
+    """Events per second over the last ``window`` whole seconds (one slot per second)."""
+
+    def __init__(self, window: int = 10):
+        self.window = window
+        self._slots = [0] * (window + 1)
+        self._stamps = [0] * (window + 1)
+        self._lock = threading.Lock()
+
+    def mark(self, n: int = 1):
+        now = int(time.time())
+        i = now % len(self._slots)
+        with self._lock:
+            if self._stamps[i] != now:
+                self._stamps[i], self._slots[i] = now, 0
+            self._slots[i] += n
+
+    def rate(self) -> float:
+        now = int(time.time())
+        with self._lock:
+            total = sum(n for n, t in zip(self._slots, self._stamps) if now - self.window <= t < now)
+        return total / self.window
+
+# ---- metrics ----
+
+REQUEST_LABELS = ("route", "method")
+
+http_requests = Counter("soc_http_requests_total", "HTTP requests by route, method and status class.",
+                        ("route", "method", "status"))
+http_latency = Histogram("soc_http_request_duration_seconds", "Wall time from the first middleware to the "
+                         "rendered response.", LATENCY_BUCKETS, REQUEST_LABELS)
+http_queries = Histogram("soc_http_db_queries", "ORM queries run by the request thread per request.",
+                         QUERY_BUCKETS, REQUEST_LABELS)
+http_db_time = Histogram("soc_http_db_duration_seconds", "Time spent in database calls per request.",
+                         LATENCY_BUCKETS, REQUEST_LABELS)
+http_render_time = Histogram("soc_http_render_duration_seconds", "Time rendering a DRF/template response "
+                             "after the view returned (serialization).", LATENCY_BUCKETS, REQUEST_LABELS)
+http_response_bytes = Histogram("soc_http_response_bytes", "Response body size (streamed exports excluded).",
+                                BYTES_BUCKETS, REQUEST_LABELS)
+
+ingest_events = Counter("soc_ingest_events_total", "Events accepted by ingest (folded repeats included).")
+ingest_rejected = Counter("soc_ingest_rejected_total", "Events rejected by ingest validation.")
+ingest_cases = Counter("soc_ingest_cases_created_total", "Cases opened by ingest.")
+ingest_rate = RateMeter()
+ws_sent = Counter("soc_ws_broadcasts_sent_total", "Group sends handed to the channel layer.")
+ws_failed = Counter("soc_ws_broadcasts_failed_total", "Group sends that raised.")
+ws_dropped = Counter("soc_ws_coalescer_dropped_total", "Events discarded by the WebSocket coalescer because "
+                     "the group's buffer was full.", ("group",))
+
+def record_ingest(accepted: int, rejected: int, cases: int):
+    ingest_events.inc(accepted)
+    ingest_rate.mark(accepted)
+    if rejected:
+        ingest_rejected.inc(rejected)
+    if cases:
+        ingest_cases.inc(cases)
+
+def _channel_layer_depth():
+    from channels.layers import get_channel_layer
+    layer = get_channel_layer()
+    if layer is None:
+        return 0
+    if hasattr(layer, "queue_depth"):
+        return layer.queue_depth()
+    # InMemoryChannelLayer
+    return sum(queue.qsize() for queue in getattr(layer, "channels", {}).values())
+
+def _ws_buffer_depth():
+    from .ws import get_broadcaster
+    broadcaster = get_broadcaster()
+    return broadcaster.depth() if broadcaster is not None else 0
+
+def _ingest_queue_depth():
+    from .ingest_queue import get_ingest_queue
+    return get_ingest_queue().depth()
+
+def _profiler_seconds():
+    from .profiler import get_sampler
+    return round(get_sampler().sample_seconds, 6)
+
+METRICS = [
+    http_requests, http_latency, http_queries, http_db_time, http_render_time, http_response_bytes,
+    ingest_events, ingest_rejected, ingest_cases,
+    Gauge("soc_ingest_events_per_second", f"Accepted events per second over the last {ingest_rate.window}s.",
+          lambda: round(ingest_rate.rate(), 3)),
+    Gauge("soc_ingest_queue_depth", "Events waiting in the async ingest queue.", _ingest_queue_depth),
+    ws_sent, ws_failed, ws_dropped,
+    Gauge("soc_ws_coalescer_buffer_depth", "Events waiting in the WebSocket coalescer.", _ws_buffer_depth),
+    Gauge("soc_channel_layer_queue_depth", "Messages queued in the channel layer.", _channel_layer_depth),
+    Gauge("soc_profiler_sample_seconds", "Time the sampling profiler has spent taking samples.",
+          _profiler_seconds),
+]
+
+def render() -> str:
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+# ---- request instrumentation ----
+
+def route_name(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"  # 404s from resolution, kept to one series
+    name = getattr(match.func, "view_class", match.func).__name__
+    return f"{match.namespace}:{name}" if match.namespace else name
+
+class _QueryTimer:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+class MetricsMiddleware:
+    """
+    Per-route latency, query count, DB time, render time and response size.
+
+    Queries are counted with connection.execute_wrapper on the request
+    thread, so writes handed to the serialized DB writer (SOC_DB_WRITER) are
+    not included. Disabled with SOC_METRICS_ENABLED=0.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SOC_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        request._metrics_view_done = None
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        finished = time.perf_counter()
+
+        labels = (route_name(request), request.method)
+        http_requests.inc(1, *labels, f"{response.status_code // 100}xx")
+        http_latency.observe(finished - started, *labels)
+        http_queries.observe(timer.queries, *labels)
+        http_db_time.observe(timer.seconds, *labels)
+        if request._metrics_view_done is not None:
+            http_render_time.observe(finished - request._metrics_view_done, *labels)
+        if not isinstance(response, StreamingHttpResponse):
+            http_response_bytes.observe(len(response.content), *labels)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF Responses and TemplateResponses render after this hook returns
+        request._metrics_view_done = time.perf_counter()
+        return response
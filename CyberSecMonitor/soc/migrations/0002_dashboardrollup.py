@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('soc', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('severity', models.CharField(choices=[('CRITICAL', 'Critical'), ('HIGH', 'High'), ('MEDIUM', 'Medium'), ('LOW', 'Low')], max_length=16)),
+                ('incident_type', models.CharField(choices=[('BRUTE_FORCE', 'Brute Force'), ('SQL_INJECTION', 'Sql Injection'), ('XSS', 'Xss'), ('PATH_TRAVERSAL', 'Path Traversal'), ('SUSPICIOUS_SERVICE', 'Suspicious Service'), ('DDOS_BOT', 'Ddos Bot'), ('DATA_THEFT', 'Data Theft'), ('PHISHING', 'Phishing'), ('INSIDER', 'Insider'), ('CRYPTOJACK', 'Cryptojack')], max_length=40)),
+                ('alerts', models.IntegerField(default=0)),
+                ('cases', models.IntegerField(default=0)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='core.client')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour', 'client'], name='soc_dashboa_hour_5c9930_idx')],
+                'constraints': [models.UniqueConstraint(fields=('client', 'hour', 'severity', 'incident_type'), name='uniq_rollup_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soc', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='first_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunSQL(
+            "UPDATE soc_alert SET first_seen = created_at, last_seen = created_at",
+            migrations.RunSQL.noop,
+        ),
+    ]
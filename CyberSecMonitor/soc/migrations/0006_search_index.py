@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# Full-text index for /api/search/: one FTS5 table per kind, rowid = the row's id.
+# Rows are written by soc.search (ingest, saves, rebuild_search_index); deletes
+# are mirrored by triggers so bulk/archive deletes never leave stale hits.
+COLUMNS = ("title, description, host, url, username, event, "
+           "client_id UNINDEXED, severity UNINDEXED, incident_type UNINDEXED, created_at UNINDEXED")
+
+def _forward(table: str, source: str) -> list[str]:
+    return [
+        f"CREATE VIRTUAL TABLE {table} USING fts5({COLUMNS}, tokenize='unicode61')",
+        f"CREATE TRIGGER {table}_delete AFTER DELETE ON {source} BEGIN "
+        f"DELETE FROM {table} WHERE rowid = old.id; END",
+    ]
+
+def _reverse(table: str) -> list[str]:
+    return [f"DROP TRIGGER IF EXISTS {table}_delete", f"DROP TABLE IF EXISTS {table}"]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soc', '0005_event_blobs'),
+    ]
+
+    operations = [
+        migrations.RunSQL(_forward("soc_search_alert", "soc_alert"), _reverse("soc_search_alert")),
+        migrations.RunSQL(_forward("soc_search_case", "soc_case"), _reverse("soc_search_case")),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soc', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='host_ip_num',
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='source_ip_num',
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='case',
+            name='host_ip_num',
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='case',
+            name='source_ip_num',
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+# Links have no FK to alerts/cases; these triggers drop them with the row on every delete path.
+def _delete_trigger(kind: str, source: str) -> tuple[str, str]:
+    name = f"soc_observablelink_{kind}_delete"
+    return (
+        f"CREATE TRIGGER {name} AFTER DELETE ON {source} BEGIN "
+        f"DELETE FROM soc_observablelink WHERE kind = '{kind}' AND object_id = old.id; END",
+        f"DROP TRIGGER IF EXISTS {name}",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soc', '0007_ip_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Observable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('source_ip', 'Source Ip'), ('host_ip', 'Host Ip'), ('hostname', 'Hostname'), ('username', 'Username'), ('url', 'Url'), ('service_name', 'Service Name')], max_length=20)),
+                ('value', models.CharField(max_length=512)),
+                ('sightings', models.PositiveIntegerField(default=0)),
+                ('first_seen', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('type', 'value'), name='uniq_observable')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ObservableLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=5)),
+                ('object_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('observable', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='links', to='soc.observable')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['observable', 'created_at', 'id'], name='soc_obslink_pivot_idx'), models.Index(fields=['kind', 'object_id'], name='soc_obslink_object_idx')],
+            },
+        ),
+        migrations.RunSQL(*_delete_trigger("alert", "soc_alert")),
+        migrations.RunSQL(*_delete_trigger("case", "soc_case")),
+    ]
@@ -0,0 +1,48 @@
+from datetime import timezone as dt_timezone
+from django.db import migrations
+from django.db.models import Count, Min
+from django.db.models.functions import TruncHour
+
+# DashboardRollup started empty (0002), so the dashboard showed zero for
+# everything ingested before it until rebuild_rollups was run. Fill the hours
+# before the first bucket written since; later hours are already counted.
+
+def backfill(apps, schema_editor):
+    Alert = apps.get_model("soc", "Alert")
+    Case = apps.get_model("soc", "Case")
+    DashboardRollup = apps.get_model("soc", "DashboardRollup")
+
+    first = DashboardRollup.objects.aggregate(h=Min("hour"))["h"]
+    buckets: dict[tuple, list[int]] = {}
+    for col, model in enumerate((Alert, Case)):
+        qs = model.objects.all()
+        if first is not None:
+            qs = qs.filter(created_at__lt=first)
+        grouped = (
+            qs.annotate(bucket=TruncHour("created_at", tzinfo=dt_timezone.utc))
+            .values_list("client_id", "bucket", "severity", "incident_type")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        for client, bucket, sev, itype, n in grouped:
+            buckets.setdefault((client, bucket, sev, itype), [0, 0])[col] += n
+
+    DashboardRollup.objects.bulk_create(
+        [
+            DashboardRollup(client_id=client, hour=bucket, severity=sev, incident_type=itype,
+                            alerts=n_alerts, cases=n_cases)
+            for (client, bucket, sev, itype), (n_alerts, n_cases) in buckets.items()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soc', '0008_observables'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
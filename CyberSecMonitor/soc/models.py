@@ -1,6 +1,13 @@
+import hashlib
+import json
+import zlib
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
+from .ipnet import ip_key
+
 class Severity(models.TextChoices):
     CRITICAL = "CRITICAL"
     HIGH = "HIGH"
@@ -45,18 +52,74 @@ class Rule(models.Model):
     def __str__(self) -> str:
         return self.name
 
+    def clean(self):
+        from .rules import RuleSyntaxError, compile_query
+        try:
+            compile_query(self.query_template)
+        except RuleSyntaxError as e:
+            raise ValidationError({"query_template": str(e)})
+
+class EventBlob(models.Model):
+    """An event payload stored once, keyed by the sha256 of its canonical JSON and zlib-compressed."""
+    digest = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    size = models.IntegerField(default=0)  # uncompressed bytes
+    created_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "EventBlob":
+        raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), cls=DjangoJSONEncoder).encode()
+        return cls(digest=hashlib.sha256(raw).hexdigest(), data=zlib.compress(raw), size=len(raw))
+
+    @staticmethod
+    def decode(data: bytes) -> dict:
+        return json.loads(zlib.decompress(data))
+
+    def load(self) -> dict:
+        return self.decode(self.data)
+
 class Alert(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     client = models.ForeignKey("core.Client", on_delete=models.CASCADE, related_name="alerts")
     severity = models.CharField(max_length=16, choices=Severity.choices)
     incident_type = models.CharField(max_length=40, choices=IncidentType.choices)
     title = models.CharField(max_length=200)
-    raw_event = models.JSONField(default=dict)
+    raw_event = models.JSONField(default=dict)  # inline payload of rows written before the blob store
+    blob = models.ForeignKey(EventBlob, null=True, blank=True, on_delete=models.PROTECT, related_name="+")
     is_false_positive = models.BooleanField(default=False)
 
+    # aggregation: repeats of the same fingerprint bump count/last_seen
+    count = models.PositiveIntegerField(default=1)
+    fingerprint = models.CharField(max_length=40, blank=True, default="", db_index=True)
+    first_seen = models.DateTimeField(null=True, blank=True)
+    last_seen = models.DateTimeField(null=True, blank=True)
+
+    # soc.ipnet.ip_key of the event's IPs for cidr= pivots, filled by save(); NULL = not backfilled yet
+    source_ip_num = models.CharField(max_length=32, null=True, blank=True, db_index=True)
+    host_ip_num = models.CharField(max_length=32, null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["created_at", "id"], name="soc_alert_created_id_idx")]
+
     def __str__(self) -> str:
         return f"[{self.severity}] {self.title}"
 
+    def save(self, *args, **kwargs):
+        # ingest sets the keys itself; anything else (background generator, admin) gets them from the payload
+        if self.source_ip_num is None and self.host_ip_num is None:
+            payload = self.payload
+            self.source_ip_num = ip_key(payload.get("source_ip"))
+            self.host_ip_num = ip_key(payload.get("host_ip"))
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "source_ip_num", "host_ip_num"}
+        super().save(*args, **kwargs)
+
+    @property
+    def payload(self) -> dict:
+        """The ingested event; loads the blob on first access unless select_related."""
+        return self.blob.load() if self.blob_id else self.raw_event
+
 class Case(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(default=timezone.now)
@@ -75,12 +138,32 @@ class Case(models.Model):
     source_ip = models.CharField(max_length=64, blank=True, default="")
     host_ip = models.CharField(max_length=64, blank=True, default="")
     hostname = models.CharField(max_length=120, blank=True, default="")
+    # soc.ipnet.ip_key of source_ip/host_ip, kept in step by save(); NULL = not backfilled yet
+    source_ip_num = models.CharField(max_length=32, null=True, blank=True, db_index=True)
+    host_ip_num = models.CharField(max_length=32, null=True, blank=True, db_index=True)
+
+    evidence = models.JSONField(default=dict)  # inline payload of rows written before the blob store
+    blob = models.ForeignKey(EventBlob, null=True, blank=True, on_delete=models.PROTECT, related_name="+")
 
-    evidence = models.JSONField(default=dict)
+    class Meta:
+        indexes = [models.Index(fields=["created_at", "id"], name="soc_case_created_id_idx")]
 
     def __str__(self) -> str:
         return f"CASE-{self.id} {self.title}"
 
+    def save(self, *args, **kwargs):
+        self.source_ip_num = ip_key(self.source_ip)
+        self.host_ip_num = ip_key(self.host_ip)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"source_ip", "host_ip"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "source_ip_num", "host_ip_num"}
+        super().save(*args, **kwargs)
+
+    @property
+    def payload(self) -> dict:
+        """Evidence: the ingested event, shared with the alert through the blob store."""
+        return self.blob.load() if self.blob_id else self.evidence
+
 class Task(models.Model):
     case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name="tasks")
     title = models.CharField(max_length=240)
@@ -102,3 +185,59 @@ class AuditLog(models.Model):
     object_type = models.CharField(max_length=80)
     object_id = models.IntegerField(null=True, blank=True)
     details = models.JSONField(default=dict)
+
+class DashboardRollup(models.Model):
+    """Hourly alert/case counters per client, maintained at ingest time for the dashboard."""
+    client = models.ForeignKey("core.Client", on_delete=models.CASCADE, related_name="rollups")
+    hour = models.DateTimeField()  # UTC, truncated to the hour
+    severity = models.CharField(max_length=16, choices=Severity.choices)
+    incident_type = models.CharField(max_length=40, choices=IncidentType.choices)
+    alerts = models.IntegerField(default=0)
+    cases = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["client", "hour", "severity", "incident_type"],
+                name="uniq_rollup_bucket",
+            ),
+        ]
+        indexes = [models.Index(fields=["hour", "client"])]
+
+class ObservableType(models.TextChoices):
+    SOURCE_IP = "source_ip"
+    HOST_IP = "host_ip"
+    HOSTNAME = "hostname"
+    USERNAME = "username"
+    URL = "url"
+    SERVICE_NAME = "service_name"
+
+class Observable(models.Model):
+    """An indicator seen in events (normalized by soc.observables), with how often it was seen."""
+    type = models.CharField(max_length=20, choices=ObservableType.choices)
+    value = models.CharField(max_length=512)
+    sightings = models.PositiveIntegerField(default=0)
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["type", "value"], name="uniq_observable")]
+
+    def __str__(self) -> str:
+        return f"{self.type}:{self.value}"
+
+class ObservableLink(models.Model):
+    """Inverted index row: observable -> alert or case (no FK, so links never slow down deletes)."""
+    KIND_ALERT, KIND_CASE = "alert", "case"
+
+    # indexed through soc_obslink_pivot_idx
+    observable = models.ForeignKey(Observable, on_delete=models.CASCADE, related_name="links", db_index=False)
+    kind = models.CharField(max_length=5)
+    object_id = models.BigIntegerField()
+    created_at = models.DateTimeField()  # the alert's/case's, for newest-first paging
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["observable", "created_at", "id"], name="soc_obslink_pivot_idx"),
+            models.Index(fields=["kind", "object_id"], name="soc_obslink_object_idx"),
+        ]
@@ -0,0 +1,143 @@
+import ipaddress
+from django.conf import settings
+from django.db import connection
+
+from .models import Alert, Case, Observable, ObservableLink, ObservableType
+
+MAX_VALUE_LENGTH = 512
+
+def _ip(value: str) -> str:
+    try:
+        return str(ipaddress.ip_address(value))
+    except ValueError:
+        return ""
+
+# type -> normalizer; "" drops the value
+NORMALIZERS = {
+    ObservableType.SOURCE_IP: _ip,
+    ObservableType.HOST_IP: _ip,
+    ObservableType.HOSTNAME: lambda v: v.lower().rstrip("."),
+    ObservableType.USERNAME: str.lower,
+    ObservableType.URL: str,
+    ObservableType.SERVICE_NAME: str.lower,
+}
+# event keys read for each type, first non-empty wins
+EVENT_KEYS = {ObservableType.USERNAME: ("username", "user")}
+
+def normalize(type_: str, value) -> str:
+    if type_ not in NORMALIZERS or not isinstance(value, str) or not value.strip():
+        return ""
+    return NORMALIZERS[type_](value.strip())[:MAX_VALUE_LENGTH]
+
+def extract(event: dict) -> list[tuple[str, str]]:
+    """(type, normalized value) pairs carried by an event."""
+    found = []
+    for type_ in NORMALIZERS:
+        raw = next((event[k] for k in EVENT_KEYS.get(type_, (type_,)) if event.get(k)), None)
+        value = normalize(type_, raw)
+        if value:
+            found.append((type_, value))
+    return found
+
+def _upsert(pairs: dict[tuple[str, str], tuple[int, object, object]]) -> dict[tuple[str, str], int]:
+    """Insert/bump observables in one statement per chunk; returns (type, value) -> id."""
+    ids = {}
+    items = list(pairs.items())
+    for start in range(0, len(items), 500):
+        chunk = items[start:start + 500]
+        to_db = connection.ops.adapt_datetimefield_value
+        values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(chunk))
+        params = []
+        for (type_, value), (n, first, last) in chunk:
+            params += [type_, value, n, to_db(first), to_db(last)]
+        with connection.cursor() as cur:
+            cur.execute(
+                f"INSERT INTO {Observable._meta.db_table} (type, value, sightings, first_seen, last_seen) "
+                f"VALUES {values} ON CONFLICT (type, value) DO UPDATE SET "
+                f"sightings = sightings + excluded.sightings, first_seen = MIN(first_seen, excluded.first_seen), "
+                f"last_seen = MAX(last_seen, excluded.last_seen) "
+                f"RETURNING id, type, value",
+                params,
+            )
+            ids.update({(type_, value): pk for pk, type_, value in cur.fetchall()})
+    return ids
+
+def record(alerts: list[Alert], alert_events: list[dict], cases: list[Case] = (), case_events: list[dict] = ()):
+    """
+    Index the observables of freshly written alerts and cases (each paired
+    with its event): one upsert for the distinct observables, one
+    bulk insert for the links. Sightings count alerts only, so a case does
+    not double-count the alert it was opened from.
+    """
+    if not settings.SOC_OBSERVABLES_ENABLED:
+        return
+    rows = [(ObservableLink.KIND_ALERT, a, e) for a, e in zip(alerts, alert_events)]
+    rows += [(ObservableLink.KIND_CASE, c, e) for c, e in zip(cases, case_events)]
+    pairs: dict[tuple[str, str], tuple[int, object, object]] = {}
+    extracted = []
+    for kind, obj, event in rows:
+        found = extract(event)
+        extracted.append((kind, obj, found))
+        for pair in found:
+            n, first, last = pairs.get(pair, (0, obj.created_at, obj.created_at))
+            pairs[pair] = (n + (kind == ObservableLink.KIND_ALERT),
+                           min(first, obj.created_at), max(last, obj.created_at))
+    if not pairs:
+        return
+    ids = _upsert(pairs)
+    ObservableLink.objects.bulk_create(
+        [
+            ObservableLink(observable_id=ids[pair], kind=kind, object_id=obj.id, created_at=obj.created_at)
+            for kind, obj, found in extracted
+            for pair in found
+        ],
+        batch_size=2000,
+    )
+
+def related_cases(case: Case, limit: int = 10) -> list[dict]:
+    """
+    Other cases sharing observables with ``case``, most shared first, from
+    one query over the link indexes. Observables seen more than
+    SOC_OBSERVABLE_MAX_FANOUT times (a busy web server's hostname, "admin")
+    link half the table and say nothing, so they are skipped.
+    """
+    links = ObservableLink._meta.db_table
+    observables = Observable._meta.db_table
+    # +other.kind keeps the planner on the pivot index per shared observable
+    # instead of walking every case link through the (kind, object_id) index
+    with connection.cursor() as cur:
+        cur.execute(
+            f"SELECT other.object_id, COUNT(*) AS shared, GROUP_CONCAT(o.type || ':' || o.value, '\n') "
+            f"FROM {links} mine "
+            f"JOIN {observables} o ON o.id = mine.observable_id AND o.sightings <= %s "
+            f"JOIN {links} other ON other.observable_id = mine.observable_id AND +other.kind = %s "
+            f"WHERE mine.kind = %s AND mine.object_id = %s AND other.object_id != %s "
+            f"GROUP BY other.object_id ORDER BY shared DESC, MAX(other.created_at) DESC LIMIT %s",
+            [settings.SOC_OBSERVABLE_MAX_FANOUT, ObservableLink.KIND_CASE, ObservableLink.KIND_CASE,
+             case.id, case.id, limit],
+        )
+        rows = cur.fetchall()
+    cases = Case.objects.only("id", "created_at", "severity", "status", "title").in_bulk([r[0] for r in rows])
+    return [
+        {"case": cases[pk], "shared": shared, "observables": sorted(set(via.split("\n")))}
+        for pk, shared, via in rows
+        if pk in cases
+    ]
+
+# columns returned for each linked record
+LINKED_FIELDS = {
+    ObservableLink.KIND_ALERT: (Alert, ["id", "created_at", "client_id", "severity", "incident_type", "title",
+                                        "count"]),
+    ObservableLink.KIND_CASE: (Case, ["id", "created_at", "client_id", "severity", "incident_type", "title",
+                                      "status", "verdict"]),
+}
+
+def hydrate(links: list[ObservableLink]) -> list[dict]:
+    """The alerts/cases behind a page of links, in link order (one query per kind)."""
+    records = {}
+    for kind, (model, fields) in LINKED_FIELDS.items():
+        ids = [link.object_id for link in links if link.kind == kind]
+        if ids:
+            records |= {(kind, row["id"]): row for row in model.objects.filter(id__in=ids).values(*fields)}
+    return [{"kind": link.kind, **records[link.kind, link.object_id]}
+            for link in links if (link.kind, link.object_id) in records]
@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import datetime
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    The cursor is an opaque token holding the boundary row's (created_at, id)
+    and a direction, so every page is an index range scan of ``page_size + 1``
+    rows regardless of depth and no COUNT(*) is ever issued.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, settings.SOC_API_PAGE_SIZE))
+        except ValueError:
+            size = settings.SOC_API_PAGE_SIZE
+        return max(1, min(size, settings.SOC_API_MAX_PAGE_SIZE))
+
+    def encode_cursor(self, obj, reverse: bool) -> str:
+        raw = json.dumps({"t": obj.created_at.isoformat(), "i": obj.pk, "r": reverse})
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            data = json.loads(raw)
+            return datetime.fromisoformat(data["t"]), int(data["i"]), bool(data["r"])
+        except (ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            reverse = False
+            qs = queryset.order_by("-created_at", "-id")
+        else:
+            ts, pk, reverse = cursor
+            if reverse:
+                # rows newer than the boundary, walked oldest-first then flipped
+                qs = queryset.filter(created_at__gte=ts).exclude(created_at=ts, id__lte=pk)
+                qs = qs.order_by("created_at", "id")
+            else:
+                qs = queryset.filter(created_at__lte=ts).exclude(created_at=ts, id__gte=pk)
+                qs = qs.order_by("-created_at", "-id")
+
+        rows = list(qs[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def _link(self, obj, reverse: bool):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(obj, reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,208 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path
+from django.conf import settings
+
+from .metrics import route_name
+
+# Sampling profiler for live requests. Switched on for a route pattern and a
+# share of requests by a control file in SOC_PROFILE_DIR (written by
+# ``manage.py profile_requests``), so every worker picks it up without a
+# restart. Samples are folded stacks ("a;b;c <count>"), the input format of
+# flamegraph.pl / speedscope / inferno.
+
+CONTROL_FILE = "control.json"
+MAX_DEPTH = 128
+
+@dataclass(frozen=True)
+class ProfileControl:
+    route: str
+    percent: float
+    until: float
+
+    def wants(self, route: str) -> bool:
+        return fnmatchcase(route, self.route) and (self.percent >= 100 or random.random() * 100 < self.percent)
+
+def profile_dir() -> Path:
+    return Path(settings.SOC_PROFILE_DIR)
+
+def write_control(control: ProfileControl | None):
+    """Switch profiling on (or off with None) for every process sharing the directory."""
+    path = profile_dir() / CONTROL_FILE
+    if control is None:
+        path.unlink(missing_ok=True)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"route": control.route, "percent": control.percent, "until": control.until}))
+    os.replace(tmp, path)
+
+def read_control() -> ProfileControl | None:
+    try:
+        data = json.loads((profile_dir() / CONTROL_FILE).read_text())
+        control = ProfileControl(str(data["route"]), float(data["percent"]), float(data["until"]))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return control if control.until > time.time() else None
+
+def _frame_label(frame) -> str:
+    # per function, not per line: keeps the number of distinct stacks (and files) small
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{frame.f_code.co_qualname}".replace(";", ",").replace(" ", "_")
+
+def collapse(frame) -> str:
+    """Root-first "a;b;c" stack of ``frame``, cut to MAX_DEPTH frames nearest the root."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels[-MAX_DEPTH:]))
+
+class Sampler:
+    """
+    Samples the stacks of threads registered with ``begin`` every
+    ``interval`` seconds from one daemon thread, which sleeps while nothing is
+    being profiled. Folded counts go to ``<route>.<hour>.<pid>.folded`` every
+    ``flush_every`` seconds; oldest files are deleted past ``max_bytes``.
+    """
+
+    def __init__(self, directory: Path, interval: float, max_bytes: int, flush_every: float = 10.0):
+        self.directory = directory
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self._active: dict[int, str] = {}
+        self._stacks: dict[str, Counter] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        self.samples = 0
+        self.sample_seconds = 0.0
+
+    def begin(self, route: str):
+        with self._lock:
+            self._active[threading.get_ident()] = route
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="soc-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def end(self):
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+
+    def _sample(self):
+        with self._lock:
+            active = list(self._active.items())
+        if not active:
+            return
+        started = time.perf_counter()
+        frames = sys._current_frames()
+        for ident, route in active:
+            frame = frames.get(ident)
+            if frame is not None:
+                self._stacks.setdefault(route, Counter())[collapse(frame)] += 1
+        del frames
+        self.samples += 1
+        self.sample_seconds += time.perf_counter() - started
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            if not self._active:
+                self.flush()
+                self._wake.clear()
+                # re-check after clear so a begin() racing with it is not missed
+                if not self._active:
+                    self._wake.wait()
+                last_flush = time.monotonic()
+            time.sleep(self.interval)
+            self._sample()
+            if time.monotonic() - last_flush >= self.flush_every:
+                self.flush()
+                last_flush = time.monotonic()
+
+    def flush(self):
+        stacks, self._stacks = self._stacks, {}
+        if not stacks:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            hour = time.strftime("%Y%m%dT%H")
+            for route, counts in stacks.items():
+                name = "".join(c if c.isalnum() or c in "-_" else "_" for c in route)
+                with open(self.directory / f"{name}.{hour}.{os.getpid()}.folded", "a") as f:
+                    f.write("".join(f"{stack} {n}\n" for stack, n in counts.items()))
+            self._prune()
+        except OSError as e:
+            print("Profiler flush error:", e)
+
+    def _prune(self):
+        files = sorted(self.directory.glob("*.folded"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        while files and total > self.max_bytes:
+            oldest = files.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink(missing_ok=True)
+
+_sampler: Sampler | None = None
+_sampler_lock = threading.Lock()
+
+def get_sampler() -> Sampler:
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = Sampler(
+                    directory=profile_dir(),
+                    interval=settings.SOC_PROFILE_INTERVAL_MS / 1000.0,
+                    max_bytes=settings.SOC_PROFILE_MAX_MB * 1024 * 1024,
+                )
+    return _sampler
+
+class ProfilerMiddleware:
+    """
+    Profiles requests whose route (as in /metrics) matches the control file.
+    While profiling is off this is one cached lookup per request; the
+    control file is re-read at most once a second.
+    """
+
+    recheck_seconds = 1.0
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._control: ProfileControl | None = None
+        self._checked_at = 0.0
+
+    def _current(self) -> ProfileControl | None:
+        now = time.monotonic()
+        if now - self._checked_at >= self.recheck_seconds:
+            self._checked_at = now
+            self._control = read_control()
+        control = self._control
+        return control if control is not None and control.until > time.time() else None
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            if getattr(request, "_profiled", False):
+                get_sampler().end()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        control = self._current()
+        if control is None:
+            return None
+        route = route_name(request)
+        if control.wants(route):
+            request._profiled = True
+            get_sampler().begin(route)
+        return None
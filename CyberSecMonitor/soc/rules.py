@@ -0,0 +1,400 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable
+from urllib.parse import unquote
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Rule, Severity
+
+# Events don't always say where they came from; fall back on the incident type
+INCIDENT_SOURCES = {
+    "BRUTE_FORCE": "auth.failed",
+    "SQL_INJECTION": "web.access",
+    "XSS": "web.access",
+    "PATH_TRAVERSAL": "web.access",
+    "SUSPICIOUS_SERVICE": "windows.service_install",
+}
+
+# DSL field names -> ingested event keys
+FIELD_ALIASES = {
+    "src_ip": "source_ip",
+    "dst_ip": "host_ip",
+    "host": "hostname",
+    "user": "username",
+}
+
+SEVERITY_RANK = {s: i for i, s in enumerate([Severity.LOW, Severity.MEDIUM, Severity.HIGH, Severity.CRITICAL])}
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+      (?P<dur>\d+[smhd])\b
+    | (?P<num>-?\d+(?:\.\d+)?)(?![\w.])
+    | (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    | (?P<placeholder><[A-Za-z_][\w]*>)
+    | (?P<op>==|!=|>=|<=|>|<|\(|\)|\|)
+    | (?P<word>\*|[A-Za-z_][\w.]*)
+    )""", re.X)
+
+WORD_OPS = {"contains", "startswith", "endswith", "matches"}
+
+class RuleSyntaxError(ValueError):
+    pass
+
+Predicate = Callable[[dict], bool]
+
+def tokenize(query: str) -> list[tuple[str, str]]:
+    tokens, pos, query = [], 0, query.strip()
+    while pos < len(query):
+        m = TOKEN_RE.match(query, pos)
+        if not m or m.end() == pos:
+            raise RuleSyntaxError(f"unexpected input at {pos}: {query[pos:pos + 20]!r}")
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "str":
+            # only quotes and backslashes are escapes, so regexes keep \d, \s, ...
+            value = re.sub(r"\\([\\\"'])", r"\1", value[1:-1])
+        tokens.append((kind, value))
+        pos = m.end()
+    return tokens
+
+def _getter(name: str) -> Callable[[dict], object]:
+    key = FIELD_ALIASES.get(name, name)
+    if "." not in key:
+        return lambda event: event.get(key)
+    parts = key.split(".")
+
+    def get(event):
+        value = event
+        for part in parts:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+    return get
+
+def _as_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+@lru_cache(maxsize=4096)
+def _lowered_forms(text: str) -> tuple[str, ...]:
+    # URLs arrive percent-encoded; match the decoded form as well
+    text = text.lower()
+    decoded = unquote(text)
+    return (text,) if decoded == text else (text, decoded)
+
+def _text_forms(value) -> tuple[str, ...]:
+    return _lowered_forms(value if isinstance(value, str) else str(value))
+
+def _comparison(name: str, op: str, kind: str, value: str) -> Predicate:
+    get = _getter(name)
+
+    if kind == "placeholder":
+        if op == "==":
+            return lambda event: get(event) not in (None, "")
+        if op == "!=":
+            return lambda event: get(event) in (None, "")
+        raise RuleSyntaxError(f"placeholder {value} only works with == or !=")
+
+    if op in ("==", "!="):
+        if kind == "num":
+            number = float(value)
+            equal = lambda event: _as_number(get(event)) == number
+        else:
+            equal = lambda event: get(event) is not None and str(get(event)) == value
+        return equal if op == "==" else (lambda event: not equal(event))
+
+    if op in (">", ">=", "<", "<="):
+        if kind != "num":
+            raise RuleSyntaxError(f"{name} {op} needs a number, got {value!r}")
+        number = float(value)
+        compare = {
+            ">": lambda a: a > number, ">=": lambda a: a >= number,
+            "<": lambda a: a < number, "<=": lambda a: a <= number,
+        }[op]
+
+        def numeric(event):
+            actual = _as_number(get(event))
+            return actual is not None and compare(actual)
+        return numeric
+
+    needle = value.lower()
+    if op == "matches":
+        try:
+            pattern = re.compile(value, re.I)
+        except re.error as e:
+            raise RuleSyntaxError(f"bad regex {value!r}: {e}") from None
+        return lambda event: get(event) is not None and any(pattern.search(t) for t in _text_forms(get(event)))
+    test = {
+        "contains": lambda t: needle in t,
+        "startswith": lambda t: t.startswith(needle),
+        "endswith": lambda t: t.endswith(needle),
+    }[op]
+    return lambda event: get(event) is not None and any(test(t) for t in _text_forms(get(event)))
+
+class _Parser:
+    def __init__(self, tokens: list[tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+        self.key_fields: list[str] = []  # fields compared with ``== <PLACEHOLDER>``
+
+    def peek(self) -> tuple[str, str] | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self) -> tuple[str, str]:
+        tok = self.peek()
+        if tok is None:
+            raise RuleSyntaxError("unexpected end of query")
+        self.pos += 1
+        return tok
+
+    def at(self, kind: str, value: str | None = None) -> bool:
+        tok = self.peek()
+        if tok is None or tok[0] != kind:
+            return False
+        return value is None or tok[1].lower() == value
+
+    def expect(self, kind: str, value: str | None = None) -> str:
+        if not self.at(kind, value):
+            raise RuleSyntaxError(f"expected {value or kind}, got {self.peek()[1] if self.peek() else 'end'!r}")
+        return self.take()[1]
+
+    def condition(self) -> Predicate:
+        left = self.conjunction()
+        while self.at("word", "or"):
+            self.take()
+            a, b = left, self.conjunction()
+            left = lambda event, a=a, b=b: a(event) or b(event)
+        return left
+
+    def conjunction(self) -> Predicate:
+        left = self.negation()
+        while self.at("word", "and"):
+            self.take()
+            a, b = left, self.negation()
+            left = lambda event, a=a, b=b: a(event) and b(event)
+        return left
+
+    def negation(self) -> Predicate:
+        if self.at("word", "not"):
+            self.take()
+            inner = self.negation()
+            return lambda event: not inner(event)
+        if self.at("op", "("):
+            self.take()
+            inner = self.condition()
+            self.expect("op", ")")
+            return inner
+        return self.comparison()
+
+    def comparison(self) -> Predicate:
+        name = self.expect("word")
+        if self.at("word", "exists"):
+            self.take()
+            get = _getter(name)
+            return lambda event: get(event) is not None
+        kind, op = self.take()
+        if not (kind == "op" and op in ("==", "!=", ">", ">=", "<", "<=")) and not (kind == "word" and op.lower() in WORD_OPS):
+            raise RuleSyntaxError(f"unknown operator {op!r} after {name}")
+        kind, value = self.take()
+        if kind not in ("num", "str", "placeholder", "word"):
+            raise RuleSyntaxError(f"expected a value after {name} {op}, got {value!r}")
+        if kind == "placeholder" and op == "==" and name not in self.key_fields:
+            self.key_fields.append(name)
+        return _comparison(name, op.lower(), kind, value)
+
+@dataclass
+class CompiledRule:
+    id: int | None
+    name: str
+    source: str
+    severity: str
+    incident_type: str
+    predicate: Predicate
+    window_seconds: int | None = None
+    key_fields: tuple[str, ...] = ()
+
+def compile_query(query: str) -> tuple[str, Predicate, int | None, tuple[str, ...]]:
+    """
+    Compile one query_template into (source, predicate, window_seconds, key_fields):
+
+        <source> | where <condition> | last <duration>
+
+    ``source`` is a dotted event source (``auth.failed``, ``web.access``, ``*``).
+    Conditions combine ``field op value`` with and/or/not and parentheses;
+    ops are == != > >= < <= contains startswith endswith matches, plus
+    ``field exists``. Values are numbers, quoted strings, barewords or
+    placeholders such as ``<IP>`` (``== <IP>`` means "field is set").
+
+    ``last <duration>`` is the rule's case window. Every match is escalated;
+    when the rule has placeholder fields (``key_fields``), repeat matches
+    for the same client and values within the window (e.g. the same source
+    IP within the hour) join the case already opened instead of opening
+    another. Rules without placeholders open a case on every match.
+    """
+    parser = _Parser(tokenize(query))
+    source = parser.expect("word").lower()
+    predicate: Predicate = lambda event: True
+    window = None
+    while parser.peek() is not None:
+        parser.expect("op", "|")
+        if parser.at("word", "where"):
+            parser.take()
+            predicate = parser.condition()
+        elif parser.at("word", "last"):
+            parser.take()
+            duration = parser.expect("dur")
+            window = int(duration[:-1]) * DURATION_UNITS[duration[-1]]
+        else:
+            raise RuleSyntaxError(f"unknown stage {parser.peek()[1]!r}")
+        if parser.peek() is not None and not parser.at("op", "|"):
+            raise RuleSyntaxError(f"unexpected {parser.peek()[1]!r}")
+    return source, predicate, window, tuple(parser.key_fields)
+
+def compile_rule(rule: Rule) -> CompiledRule:
+    source, predicate, window, key_fields = compile_query(rule.query_template)
+    return CompiledRule(
+        id=rule.id,
+        name=rule.name,
+        source=source,
+        severity=rule.severity,
+        incident_type=rule.incident_type,
+        predicate=predicate,
+        window_seconds=window,
+        key_fields=key_fields,
+    )
+
+def event_source(event: dict) -> str:
+    return str(event.get("source") or INCIDENT_SOURCES.get(event.get("incident_type"), "")).lower()
+
+@dataclass
+class RuleSet:
+    """Compiled rules bucketed by source; ``*`` rules are checked for every event."""
+    by_source: dict[str, list[CompiledRule]] = field(default_factory=dict)
+    wildcard: list[CompiledRule] = field(default_factory=list)
+    errors: dict[int, str] = field(default_factory=dict)
+    # (rule, client, key values) -> when a keyed windowed rule last opened a case; oldest dropped past max_fired
+    fired: OrderedDict = field(default_factory=OrderedDict)
+    max_fired: int = 100_000
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @classmethod
+    def build(cls, rules) -> "RuleSet":
+        ruleset = cls()
+        for rule in rules:
+            try:
+                compiled = rule if isinstance(rule, CompiledRule) else compile_rule(rule)
+            except RuleSyntaxError as e:
+                ruleset.errors[rule.id] = str(e)
+                continue
+            if compiled.source == "*":
+                ruleset.wildcard.append(compiled)
+            else:
+                ruleset.by_source.setdefault(compiled.source, []).append(compiled)
+        return ruleset
+
+    def __len__(self) -> int:
+        return len(self.wildcard) + sum(len(rules) for rules in self.by_source.values())
+
+    def match(self, event: dict) -> list[CompiledRule]:
+        candidates = self.by_source.get(event_source(event), ())
+        matched = [r for r in candidates if r.predicate(event)]
+        if self.wildcard:
+            matched += [r for r in self.wildcard if r.predicate(event)]
+        return matched
+
+    def _recently_fired(self, rule: CompiledRule, event: dict, now: float) -> bool:
+        if not (rule.window_seconds and rule.key_fields):
+            return False
+        ident = (rule.id, event.get("client_id"), *(str(_getter(f)(event)) for f in rule.key_fields))
+        with self._lock:
+            fired_at = self.fired.get(ident)
+            if fired_at is not None and now - fired_at < rule.window_seconds:
+                return True
+            self.fired[ident] = now
+            self.fired.move_to_end(ident)
+            while len(self.fired) > self.max_fired:
+                self.fired.popitem(last=False)
+        return False
+
+    def apply(self, event: dict, now: float | None = None) -> dict:
+        """
+        Return the event with matching rules applied: severity raised to the
+        highest matching rule's, a case forced, and the rule ids recorded.
+        A repeat of keyed windowed rules within their window is escalated the
+        same way but marked ``rule_repeat`` rather than opening another case.
+        The input is left untouched.
+        """
+        matched = self.match(event)
+        if not matched:
+            return event
+        severity = max(
+            [r.severity for r in matched] + ([event["severity"]] if event.get("severity") in SEVERITY_RANK else []),
+            key=SEVERITY_RANK.__getitem__,
+        )
+        applied = {**event, "severity": severity, "matched_rules": [r.id for r in matched]}
+        now = time.time() if now is None else now
+        # evaluate every rule so each keyed window is stamped, not just the first
+        repeats = [self._recently_fired(r, event, now) for r in matched]
+        own_case = (event.get("force_case")
+                    or SEVERITY_RANK.get(event.get("severity"), 0) >= SEVERITY_RANK[Severity.HIGH])
+        if all(repeats) and not own_case:
+            applied["rule_repeat"] = True
+        else:
+            applied["force_case"] = True
+        return applied
+
+_ruleset: RuleSet | None = None
+_signature: int | None = None
+_checked_at = 0.0
+_ruleset_lock = threading.Lock()
+
+def _rules_signature() -> int:
+    rows = Rule.objects.filter(enabled=True).order_by("id").values_list(
+        "id", "severity", "incident_type", "query_template"
+    )
+    return hash(tuple(rows))
+
+def get_ruleset() -> RuleSet:
+    """
+    The compiled enabled rules. Saves/deletes in this process invalidate it
+    at once; other processes notice within SOC_RULES_RECHECK_SECONDS by
+    comparing a signature of the rule rows, and only recompile on change.
+    """
+    from django.conf import settings
+    global _ruleset, _signature, _checked_at
+    with _ruleset_lock:
+        if _ruleset is not None and time.monotonic() - _checked_at < settings.SOC_RULES_RECHECK_SECONDS:
+            return _ruleset
+        signature = _rules_signature()
+        _checked_at = time.monotonic()
+        if _ruleset is None or signature != _signature:
+            _ruleset = RuleSet.build(Rule.objects.filter(enabled=True).order_by("id"))
+            _signature = signature
+            for rule_id, error in _ruleset.errors.items():
+                print(f"Rule {rule_id} skipped: {error}")
+        return _ruleset
+
+def invalidate_ruleset():
+    global _ruleset
+    with _ruleset_lock:
+        _ruleset = None
+
+@receiver([post_save, post_delete], sender=Rule)
+def _rule_changed(sender, **kwargs):
+    invalidate_ruleset()
+
+def apply_rules(event: dict) -> dict:
+    from django.conf import settings
+    if not settings.SOC_RULES_ENABLED:
+        return event
+    return get_ruleset().apply(event)
@@ -0,0 +1,207 @@
+import base64
+import html
+import json
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Alert, Case
+
+# kind -> (model, FTS5 table); created by migration 0006
+INDEXES = {
+    "cases": (Case, "soc_search_case"),
+    "alerts": (Alert, "soc_search_alert"),
+}
+TEXT_COLUMNS = ["title", "description", "host", "url", "username", "event"]
+# bm25 weights, in TEXT_COLUMNS order: a hit in the title outranks one deep in the payload
+WEIGHTS = "10.0, 4.0, 4.0, 4.0, 4.0, 1.0"
+
+# event keys that already have a column (or carry no searchable text)
+_NOT_EVENT_TEXT = {"client_id", "severity", "incident_type", "created_at", "title", "hostname", "source_ip",
+                   "host_ip", "url", "username", "user", "force_case", "correlated", "matched_rules",
+                   "rule_repeat"}
+_MARK_START, _MARK_END = "\x02", "\x03"
+_TOKEN = re.compile(r'(?:(\w+):)?("[^"]*"|\S+)')
+
+class SearchSyntaxError(ValueError):
+    pass
+
+def _event_text(event: dict) -> str:
+    parts = []
+    for key, value in event.items():
+        if key in _NOT_EVENT_TEXT:
+            continue
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, list):
+            parts.extend(v for v in value if isinstance(v, str))
+    return " ".join(parts)
+
+def index_row(obj, event: dict, description: str = "") -> tuple:
+    """FTS row (rowid first) for an alert or case and the event it was created from."""
+    host = " ".join(filter(None, [event.get("hostname") or getattr(obj, "hostname", ""),
+                                  event.get("source_ip", ""), event.get("host_ip", "")]))
+    return (
+        obj.id, obj.title, description, host, event.get("url") or "",
+        event.get("username") or event.get("user") or "", _event_text(event),
+        obj.client_id, obj.severity, obj.incident_type, connection.ops.adapt_datetimefield_value(obj.created_at),
+    )
+
+def write_rows(kind: str, rows: list[tuple]):
+    """Insert or replace index rows produced by ``index_row``."""
+    if not rows or connection.vendor != "sqlite":
+        return
+    table = INDEXES[kind][1]
+    columns = ", ".join(["rowid", *TEXT_COLUMNS, "client_id", "severity", "incident_type", "created_at"])
+    with connection.cursor() as cur:
+        # FTS5 has no upsert; replacing an existing rowid means deleting it first
+        cur.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(r[0],) for r in rows])
+        cur.executemany(f"INSERT INTO {table} ({columns}) VALUES ({', '.join(['%s'] * len(rows[0]))})", rows)
+
+def index_alerts(alerts: list[Alert], events: list[dict]):
+    if settings.SOC_SEARCH_SYNC:
+        write_rows("alerts", [index_row(a, e) for a, e in zip(alerts, events)])
+
+def index_cases(cases: list[Case], events: list[dict]):
+    if settings.SOC_SEARCH_SYNC:
+        write_rows("cases", [index_row(c, e, c.description) for c, e in zip(cases, events)])
+
+@receiver(post_save, sender=Alert)
+def _alert_saved(sender, instance: Alert, raw=False, **kwargs):
+    if settings.SOC_SEARCH_SYNC and not raw:
+        index_alerts([instance], [instance.payload])
+
+@receiver(post_save, sender=Case)
+def _case_saved(sender, instance: Case, raw=False, **kwargs):
+    if settings.SOC_SEARCH_SYNC and not raw:
+        index_cases([instance], [instance.payload])
+
+def fts_query(q: str) -> str:
+    """
+    Analyst query -> FTS5 MATCH expression. Every term is quoted (so
+    punctuation in IPs, URLs and hostnames is a phrase, never syntax);
+    ``term*`` is a prefix search, ``column:term`` limits a term to one of
+    TEXT_COLUMNS, and a bare ``OR`` between terms is kept. Terms are ANDed.
+    """
+    parts = []
+    for column, term in _TOKEN.findall(q):
+        if column and column not in TEXT_COLUMNS:
+            column, term = "", f"{column}:{term}"  # e.g. a URL scheme, not a field
+        if term == "OR" and not column:
+            if parts and parts[-1] != "OR":
+                parts.append("OR")
+            continue
+        prefix = term.endswith("*") and not term.startswith('"')
+        text = term.strip('"').rstrip("*") if prefix else term.strip('"')
+        if not text.strip():
+            continue
+        phrase = '"' + text.replace('"', '""') + '"' + ("*" if prefix else "")
+        parts.append(f"{column} : {phrase}" if column else phrase)
+    while parts and parts[-1] == "OR":
+        parts.pop()
+    if not parts:
+        raise SearchSyntaxError("empty query")
+    return " ".join(parts)
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+def decode_cursor(token: str) -> tuple[float, int, int]:
+    try:
+        score, kind_order, rowid = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return float(score), int(kind_order), int(rowid)
+    except (ValueError, TypeError):
+        raise SearchSyntaxError("invalid cursor")
+
+def _marked(text: str) -> str:
+    """Escape indexed text for HTML, then turn the FTS markers into <mark> tags."""
+    return html.escape(text or "", quote=False).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+def search(q: str, kinds: list[str], filters: dict, cursor: str = "", limit: int = 25) -> tuple[list[dict], str | None]:
+    """
+    Best matches first (bm25, then kind, then id) among the newest
+    SOC_SEARCH_MAX_CANDIDATES matches of each kind, ``limit`` per page.
+
+    ``filters`` may hold client_id, severity, incident_type and start/end
+    datetimes. The cursor is the (score, kind, id) of the last hit, so the
+    next page is a range scan over the same ordering; as scores depend on
+    corpus statistics, rows indexed between pages can shift hits slightly.
+    """
+    match = fts_query(q)
+    after = decode_cursor(cursor) if cursor else None
+    hits = []
+    for kind_order, kind in enumerate(INDEXES):
+        if kind not in kinds:
+            continue
+        table = INDEXES[kind][1]
+        where, params = [f"{table} MATCH %s"], [match]
+        for field in ("client_id", "severity", "incident_type"):
+            if filters.get(field):
+                where.append(f"{field} = %s")
+                params.append(str(filters[field]) if field != "client_id" else int(filters[field]))
+        if filters.get("start"):
+            where.append("created_at >= %s")
+            params.append(connection.ops.adapt_datetimefield_value(filters["start"]))
+        if filters.get("end"):
+            where.append("created_at < %s")
+            params.append(connection.ops.adapt_datetimefield_value(filters["end"]))
+        outer, outer_params = "", []
+        if after is not None:
+            score, after_kind, rowid = after
+            if kind_order > after_kind:
+                outer, outer_params = "WHERE score >= %s", [score]
+            elif kind_order == after_kind:
+                outer, outer_params = "WHERE score > %s OR (score = %s AND id > %s)", [score, score, rowid]
+            else:
+                outer, outer_params = "WHERE score > %s", [score]
+        # bm25 is computed per match, so only the newest SOC_SEARCH_MAX_CANDIDATES are ranked:
+        # FTS5 walks a term's doclist in rowid order, which keeps common terms cheap on huge tables
+        sql = (f"SELECT id, score FROM (SELECT rowid AS id, bm25({table}, {WEIGHTS}) AS score FROM {table} "
+               f"WHERE {' AND '.join(where)} ORDER BY rowid DESC LIMIT %s) {outer} ORDER BY score, id LIMIT %s")
+        with connection.cursor() as cur:
+            cur.execute(sql, [*params, settings.SOC_SEARCH_MAX_CANDIDATES, *outer_params, limit + 1])
+            hits += [(score, kind_order, rowid, kind) for rowid, score in cur.fetchall()]
+
+    hits.sort()
+    page, more = hits[:limit], len(hits) > limit
+    results = _hydrate(page, match)
+    return results, encode_cursor(page[-1][:3]) if more and page else None
+
+def _hydrate(page: list[tuple], match: str) -> list[dict]:
+    by_kind: dict[str, list[int]] = {}
+    for _, _, rowid, kind in page:
+        by_kind.setdefault(kind, []).append(rowid)
+    marks: dict[tuple[str, int], tuple[str, str]] = {}
+    records: dict[tuple[str, int], dict] = {}
+    for kind, ids in by_kind.items():
+        model, table = INDEXES[kind]
+        with connection.cursor() as cur:
+            cur.execute(
+                f"SELECT rowid, highlight({table}, 0, %s, %s), snippet({table}, -1, %s, %s, '…', 12) "
+                f"FROM {table} WHERE {table} MATCH %s AND rowid IN ({', '.join(['%s'] * len(ids))})",
+                [_MARK_START, _MARK_END, _MARK_START, _MARK_END, match, *ids],
+            )
+            for rowid, title, snippet in cur.fetchall():
+                marks[kind, rowid] = (title, snippet)
+        fields = ["id", "created_at", "client_id", "severity", "incident_type", "title"]
+        if model is Case:
+            fields += ["status", "verdict"]
+        for row in model.objects.filter(id__in=ids).values(*fields):
+            records[kind, row["id"]] = row
+
+    results = []
+    for score, _, rowid, kind in page:
+        record = records.get((kind, rowid))
+        if record is None:
+            continue  # deleted since the index was read
+        title, snippet = marks.get((kind, rowid), (record["title"], ""))
+        results.append({
+            "kind": kind[:-1],
+            **record,
+            "score": round(-score, 4),
+            "title_highlight": _marked(title),
+            "snippet": _marked(snippet),
+        })
+    return results
@@ -9,6 +9,7 @@ class TaskSerializer(serializers.ModelSerializer):
 
 class CaseSerializer(serializers.ModelSerializer):
     tasks = TaskSerializer(many=True, read_only=True)
+    evidence = serializers.JSONField(source="payload", read_only=True)
 
     class Meta:
         model = Case
@@ -19,9 +20,45 @@ class CaseSerializer(serializers.ModelSerializer):
         ]
 
 class AlertSerializer(serializers.ModelSerializer):
+    raw_event = serializers.JSONField(source="payload", read_only=True)
+
     class Meta:
         model = Alert
-        fields = ["id","created_at","client","severity","incident_type","title","raw_event","is_false_positive"]
+        fields = ["id","created_at","client","severity","incident_type","title","raw_event","is_false_positive",
+                  "count","first_seen","last_seen"]
+
+class SparseFieldsMixin:
+    """
+    List serializers honour ?fields=a,b (whitelist) and ?omit=c (blacklist).
+
+    Fields in ``heavy_fields`` are left out unless explicitly asked for with
+    ?fields=, so list views can defer the JSON columns they do not need.
+    """
+    heavy_fields: tuple[str, ...] = ()
+
+    @classmethod
+    def resolve_fields(cls, query_params) -> set[str]:
+        available = set(cls.Meta.fields)
+        wanted = {f.strip() for f in query_params.get("fields", "").split(",") if f.strip()}
+        omit = {f.strip() for f in query_params.get("omit", "").split(",") if f.strip()}
+        selected = (wanted & available) if wanted else available - set(cls.heavy_fields)
+        return selected - omit
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None:
+            return
+        keep = self.resolve_fields(request.query_params)
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+class CaseListSerializer(SparseFieldsMixin, CaseSerializer):
+    heavy_fields = ("evidence", "tasks")
+
+class AlertListSerializer(SparseFieldsMixin, AlertSerializer):
+    heavy_fields = ("raw_event",)
 
 class RuleSerializer(serializers.ModelSerializer):
     class Meta:
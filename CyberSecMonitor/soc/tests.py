@@ -1,3 +1,960 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+from datetime import datetime, timedelta, timezone as dt_timezone
+from channels.exceptions import ChannelFull
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 
-# Create your tests here.
+from core.models import Client
+from .archive import iter_day
+from .blobs import inline_payloads, prune_blobs, store_blobs
+from .channel_layer import SQLiteChannelLayer
+from . import analytics, filters, observables
+from .aggregation import AlertAggregator, get_aggregator
+from .correlation import CorrelationEngine, Detection, SketchCounter, WindowCounter
+from .db_writer import WriteExecutor, run_write
+from .ingest_queue import IngestQueue
+from .ipnet import cidr_range, ip_key
+from .models import Alert, Case, DashboardRollup, EventBlob, Observable, Rule, Task
+from .rules import CompiledRule, RuleSet, RuleSyntaxError, compile_query
+from .search import SearchSyntaxError, fts_query
+from .services import ingest_events
+from .ws import CoalescingBroadcaster
+
+def make_event(client_id: int, **fields) -> dict:
+    return {
+        "client_id": client_id,
+        "severity": "LOW",
+        "incident_type": "XSS",
+        "title": "Reflected XSS",
+        "source_ip": "185.10.1.20",
+        "host_ip": "10.0.0.5",
+        "hostname": "WEB-01",
+        **fields,
+    }
+
+class BatchIngestTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Acme")
+
+    def test_partial_rejects_keep_input_order(self):
+        events = [
+            make_event(self.client_obj.id),
+            make_event(self.client_obj.id, severity="SEVERE"),
+            make_event(self.client_obj.id, title=""),
+            make_event(999),
+            make_event(self.client_obj.id, severity="CRITICAL", tasks=["Isolate host", "Reset creds"]),
+            "not an event",
+        ]
+        results = ingest_events(events)
+
+        self.assertEqual([r["index"] for r in results], list(range(len(events))))
+        self.assertEqual([r["ok"] for r in results], [True, False, False, False, True, False])
+        self.assertEqual(results[1]["error"], "invalid severity: SEVERE")
+        self.assertEqual(results[2]["error"], "missing fields: title")
+        self.assertEqual(results[3]["error"], "unknown client: 999")
+        self.assertIsNone(results[0]["case_id"])
+        self.assertIsNotNone(results[4]["case_id"])
+
+        self.assertEqual(Alert.objects.count(), 2)
+        case = Case.objects.get()
+        self.assertEqual(case.id, results[4]["case_id"])
+        self.assertEqual(sorted(Task.objects.filter(case=case).values_list("title", flat=True)),
+                         ["Isolate host", "Reset creds"])
+        alert = Alert.objects.get(id=results[0]["alert_id"])
+        self.assertEqual(alert.payload["hostname"], "WEB-01")
+        self.assertEqual(sum(DashboardRollup.objects.values_list("alerts", flat=True)), 2)
+
+    def test_batch_endpoint_reports_counts(self):
+        events = [make_event(self.client_obj.id), make_event(self.client_obj.id, incident_type="NOPE")]
+        body = "\n".join(json.dumps(e) for e in events)
+        resp = self.client.post("/api/ingest/batch/", body, content_type="application/x-ndjson")
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual((data["ok"], data["accepted"], data["rejected"]), (False, 1, 1))
+        self.assertEqual(data["results"][1]["error"], "invalid incident_type: NOPE")
+
+    def test_batch_endpoint_rejects_bad_bodies(self):
+        resp = self.client.post("/api/ingest/batch/", "[{", content_type="application/json")
+        self.assertEqual(resp.status_code, 400)
+        with override_settings(SOC_INGEST_BATCH_MAX=2):
+            resp = self.client.post("/api/ingest/batch/", json.dumps([make_event(self.client_obj.id)] * 3),
+                                    content_type="application/json")
+        self.assertEqual(resp.status_code, 413)
+        self.assertFalse(Alert.objects.exists())
+
+class IngestQueueTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Acme")
+        self.queue = IngestQueue(high_water=10, batch_size=5, max_wait=0.01, retries=2, retry_backoff=0)
+        self.enterContext(mock.patch("soc.ingest_queue.close_old_connections"))
+        self.enterContext(mock.patch("builtins.print"))
+
+    def _batch(self, n: int) -> list:
+        return [(0.0, make_event(self.client_obj.id, title=f"t{i}")) for i in range(n)]
+
+    def test_transient_failure_is_retried(self):
+        attempts = []
+
+        def flaky(events, batch_size):
+            attempts.append(len(events))
+            if len(attempts) == 1:
+                raise OperationalError("database is locked")
+            return ingest_events(events, batch_size)
+
+        with mock.patch("soc.ingest_queue.ingest_events", side_effect=flaky):
+            self.queue._drain(self._batch(3))
+        self.assertEqual(attempts, [3, 3])
+        self.assertEqual(Alert.objects.count(), 3)
+        metrics = self.queue.metrics()
+        self.assertEqual((metrics["written"], metrics["failed"], metrics["retried"]), (3, 0, 1))
+
+    def test_events_fail_only_after_retries_run_out(self):
+        with mock.patch("soc.ingest_queue.ingest_events", side_effect=OperationalError("database is locked")) as write:
+            self.queue._drain(self._batch(3))
+        self.assertEqual(write.call_count, 3)
+        metrics = self.queue.metrics()
+        self.assertEqual((metrics["written"], metrics["failed"], metrics["retried"]), (0, 3, 2))
+
+    def test_offer_is_all_or_nothing(self):
+        with mock.patch.object(self.queue, "start"):
+            self.assertTrue(self.queue.offer([{}] * 8))
+            self.assertFalse(self.queue.offer([{}] * 3))
+        self.assertEqual((self.queue.depth(), self.queue.throttled), (8, 3))
+
+@override_settings(SOC_AGGREGATION_WINDOW_SECONDS=60)
+class AggregationTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Acme")
+        self.enterContext(mock.patch("soc.aggregation._aggregator", None))
+        self.enterContext(mock.patch.object(AlertAggregator, "_ensure_flusher"))
+
+    def _ingest(self, events: list) -> list:
+        with self.captureOnCommitCallbacks(execute=True):
+            return ingest_events(events)
+
+    def test_repeats_fold_into_one_alert(self):
+        results = self._ingest([make_event(self.client_obj.id)] * 3 + [make_event(self.client_obj.id, severity="HIGH")])
+        self.assertEqual([r.get("deduplicated", False) for r in results], [False, True, True, False])
+        self.assertEqual(sorted(Alert.objects.values_list("severity", "count")), [("HIGH", 1), ("LOW", 3)])
+
+        results = self._ingest([make_event(self.client_obj.id)] * 2)
+        self.assertEqual({r["alert_id"] for r in results}, {results[0]["alert_id"]})
+        self.assertEqual(Alert.objects.count(), 2)
+        self.assertEqual(get_aggregator().flush(), 1)
+        alert = Alert.objects.get(id=results[0]["alert_id"])
+        self.assertEqual(alert.count, 5)
+        self.assertGreaterEqual(alert.last_seen, alert.first_seen)
+        self.assertEqual(get_aggregator().flush(), 0)
+
+    def test_lru_evicts_oldest_fingerprints(self):
+        aggregator = AlertAggregator(window=60, max_entries=2, flush_interval=1)
+        alerts = [Alert(id=i) for i in range(3)]
+        aggregator.register(["a", "b", "c"], alerts)
+        self.assertEqual(list(aggregator._lru), ["b", "c"])
+        self.assertEqual(aggregator.stats()["evictions"], 1)
+
+    def test_failed_flush_keeps_pending_bumps(self):
+        alert_id = self._ingest([make_event(self.client_obj.id)])[0]["alert_id"]
+        aggregator = get_aggregator()
+        self._ingest([make_event(self.client_obj.id)] * 2)
+        first_last = aggregator._pending[alert_id][1]
+        with mock.patch("soc.aggregation.transaction.atomic", side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                aggregator.flush()
+        self.assertEqual(aggregator._pending[alert_id], [2, first_last])
+        self._ingest([make_event(self.client_obj.id)])
+        self.assertEqual(aggregator._pending[alert_id][0], 3)
+        self.assertGreaterEqual(aggregator._pending[alert_id][1], first_last)
+        aggregator.flush()
+        self.assertEqual(Alert.objects.get(id=alert_id).count, 4)
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        client = Client.objects.create(name="Acme")
+        base = datetime(2026, 10, 1, 12, tzinfo=dt_timezone.utc)
+        # several rows share a timestamp: the id must break the tie
+        offsets = [0, 0, 0, 1, 1, 2, 3]
+        for n, minutes in enumerate(offsets):
+            Alert.objects.create(client=client, severity="LOW", incident_type="XSS", title=f"a{n}",
+                                 created_at=base + timedelta(minutes=minutes))
+        self.expected = list(Alert.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def _page(self, url):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        return [r["id"] for r in data["results"]], data["next"], data["previous"]
+
+    def test_next_then_previous_walks_every_row_once(self):
+        pages = []
+        ids, next_url, previous = self._page("/api/alerts/?page_size=3")
+        self.assertIsNone(previous)
+        pages.append(ids)
+        while next_url:
+            ids, next_url, previous = self._page(next_url)
+            pages.append(ids)
+        self.assertEqual([i for page in pages for i in page], self.expected)
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+
+        back = []
+        while previous:
+            ids, _, previous = self._page(previous)
+            back.insert(0, ids)
+        self.assertEqual(back, pages[:-1])
+
+    def test_rows_added_ahead_of_the_cursor_do_not_shift_pages(self):
+        _, next_url, _ = self._page("/api/alerts/?page_size=3")
+        newest = Alert.objects.create(client_id=Client.objects.get().id, severity="LOW", incident_type="XSS",
+                                      title="late", created_at=datetime(2026, 10, 2, tzinfo=dt_timezone.utc))
+        ids, _, previous = self._page(next_url)
+        self.assertEqual(ids, self.expected[3:6])
+        ids, _, _ = self._page(previous)
+        self.assertEqual(ids, self.expected[:3])
+        self.assertNotIn(newest.id, ids)
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get("/api/alerts/?cursor=garbage").status_code, 404)
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        client = Client.objects.create(name="Acme")
+        results = ingest_events([make_event(client.id, severity="HIGH", tasks=["Triage"])])
+        self.case_id = results[0]["case_id"]
+
+    def _keys(self, url) -> set[str]:
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return set(resp.json()["results"][0])
+
+    def test_heavy_fields_left_out_by_default(self):
+        keys = self._keys("/api/cases/")
+        self.assertNotIn("evidence", keys)
+        self.assertNotIn("tasks", keys)
+        self.assertIn("title", keys)
+        self.assertNotIn("raw_event", self._keys("/api/alerts/"))
+
+    def test_fields_whitelist_includes_heavy_fields(self):
+        resp = self.client.get("/api/cases/?fields=id,evidence,tasks,bogus")
+        row = resp.json()["results"][0]
+        self.assertEqual(set(row), {"id", "evidence", "tasks"})
+        self.assertEqual(row["evidence"]["hostname"], "WEB-01")
+        self.assertEqual([t["title"] for t in row["tasks"]], ["Triage"])
+        self.assertEqual(self._keys("/api/alerts/?fields=id,raw_event"), {"id", "raw_event"})
+
+    def test_omit_removes_fields(self):
+        keys = self._keys("/api/cases/?omit=description,analyst_group")
+        self.assertNotIn("description", keys)
+        self.assertNotIn("analyst_group", keys)
+        self.assertIn("status", keys)
+        self.assertEqual(self._keys("/api/cases/?fields=id,title&omit=title"), {"id"})
+
+    def test_detail_view_is_not_sparse(self):
+        data = self.client.get(f"/api/cases/{self.case_id}/?fields=id").json()
+        self.assertIn("evidence", data)
+        self.assertIn("tasks", data)
+
+class ExportTests(TestCase):
+    def setUp(self):
+        client = Client.objects.create(name="Acme")
+        ingest_events([
+            make_event(client.id, severity=sev, title=f"{sev} {day}")
+            for day in (1, 2, 3) for sev in ("LOW", "HIGH")
+        ])
+        # spread over three local days, noon so the date bounds are unambiguous
+        for alert in Alert.objects.all():
+            day = int(alert.title.split()[1])
+            Alert.objects.filter(id=alert.id).update(
+                created_at=timezone.make_aware(datetime(2026, 10, day, 12)))
+
+    def _csv(self, url) -> list[list[str]]:
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        return [line.split(",") for line in lines]
+
+    def test_date_range_is_inclusive_of_the_to_day(self):
+        rows = self._csv("/api/export/alerts.csv?from=2026-10-02&to=2026-10-03")
+        self.assertEqual(rows[0][:2], ["alert_id", "created_at"])
+        self.assertEqual(sorted(r[5] for r in rows[1:]), ["HIGH 2", "HIGH 3", "LOW 2", "LOW 3"])
+        # newest first
+        self.assertEqual([r[5].split()[1] for r in rows[1:]], ["3", "3", "2", "2"])
+
+    def test_list_filters_apply(self):
+        rows = self._csv("/api/export/alerts.csv?severity=HIGH&from=2026-10-02")
+        self.assertEqual(sorted(r[5] for r in rows[1:]), ["HIGH 2", "HIGH 3"])
+        rows = self._csv("/api/export/cases.csv?cidr=185.10.0.0/16")
+        self.assertEqual(len(rows), 4)
+        rows = self._csv("/api/export/cases.csv?cidr=10.99.0.0/16")
+        self.assertEqual(len(rows), 1)
+
+    def test_ndjson_carries_the_payload(self):
+        resp = self.client.get("/api/export/alerts.ndjson?to=2026-10-01")
+        records = [json.loads(line) for line in b"".join(resp.streaming_content).decode().splitlines()]
+        self.assertEqual(len(records), 2)
+        self.assertEqual({r["raw_event"]["hostname"] for r in records}, {"WEB-01"})
+        self.assertEqual(records[0]["client"], "Acme")
+
+    def test_csv_and_ndjson_timestamps_match(self):
+        stamp = timezone.make_aware(datetime(2026, 10, 1, 12, 0, 0, 123456))
+        Alert.objects.filter(title="LOW 1").update(created_at=stamp)
+        rows = self._csv("/api/export/alerts.csv?to=2026-10-01&severity=LOW")
+        resp = self.client.get("/api/export/alerts.ndjson?to=2026-10-01&severity=LOW")
+        [record] = [json.loads(line) for line in b"".join(resp.streaming_content).decode().splitlines()]
+        self.assertEqual(rows[1][1], "2026-10-01T07:00:00.123456+00:00")
+        self.assertEqual(record["created_at"], rows[1][1])
+
+    def test_bad_parameters_are_rejected(self):
+        resp = self.client.get("/api/export/alerts.csv?cidr=garbage")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("cidr", resp.json())
+        self.assertEqual(self.client.get("/api/export/alerts.csv?from=yesterday").status_code, 400)
+        self.assertEqual(self.client.get("/api/export/tasks.csv").status_code, 404)
+
+class RuleDSLTests(TestCase):
+    def _matches(self, query: str, event: dict) -> bool:
+        _, predicate, _, _ = compile_query(query)
+        return predicate(event)
+
+    def test_stages(self):
+        source, predicate, window, keys = compile_query(
+            'auth.failed | where src_ip == <IP> and attempts > 20 | last 1h')
+        self.assertEqual((source, window, keys), ("auth.failed", 3600, ("src_ip",)))
+        self.assertTrue(predicate({"source_ip": "1.2.3.4", "attempts": "21"}))
+        self.assertFalse(predicate({"source_ip": "1.2.3.4", "attempts": 20}))
+        self.assertFalse(predicate({"attempts": 50}))
+        self.assertEqual(compile_query("*")[2:], (None, ()))
+
+    def test_operators(self):
+        event = {"url": "/a?q=%27%20UNION%20select", "username": "Bob", "n": 5, "geo": {"cc": "KZ"}}
+        for query, expected in [
+            ('x | where url contains "union"', True),           # case-insensitive, percent-decoded
+            ('x | where url startswith "/A"', True),
+            ('x | where url endswith "SELECT"', True),
+            ('x | where url matches "q=.\\s*union"', True),
+            ("x | where n >= 5 and not n > 5", True),
+            ("x | where n != 5 or user == Bob", True),
+            ("x | where user == bob", False),
+            ('x | where geo.cc == "KZ" and missing exists', False),
+            ("x | where (n < 1 or geo.cc == KZ) and user exists", True),
+            ("x | where host == <HOST>", False),
+            ("x | where host != <HOST>", True),
+        ]:
+            with self.subTest(query=query):
+                self.assertEqual(self._matches(query, event), expected)
+
+    def test_syntax_errors(self):
+        for query in [
+            "",
+            "x | where",
+            "x | where a ~ 1",
+            "x | where a > foo",
+            "x | where a == 1 b",
+            'x | where a matches "("',
+            "x | where a > <IP>",
+            "x | last forever",
+            "x | sort a",
+            "x | where (a == 1",
+        ]:
+            with self.subTest(query=query), self.assertRaises(RuleSyntaxError):
+                compile_query(query)
+
+    def test_rule_clean_reports_the_error(self):
+        rule = Rule(name="bad", incident_type="XSS", severity="HIGH", query_template="x | where")
+        with self.assertRaises(ValidationError) as ctx:
+            rule.clean()
+        self.assertIn("query_template", ctx.exception.message_dict)
+
+    def _ruleset(self, query: str, severity="HIGH", rule_id=1) -> RuleSet:
+        source, predicate, window, keys = compile_query(query)
+        return RuleSet.build([CompiledRule(rule_id, "r", source, severity, "BRUTE_FORCE", predicate, window, keys)])
+
+    def test_apply_raises_severity_and_forces_a_case(self):
+        ruleset = self._ruleset('web.access | where url contains "<script"', severity="HIGH")
+        event = {"source": "web.access", "url": "/?q=<script>", "severity": "LOW"}
+        applied = ruleset.apply(event)
+        self.assertEqual((applied["severity"], applied["force_case"], applied["matched_rules"]), ("HIGH", True, [1]))
+        self.assertEqual(event["severity"], "LOW")
+        other = {**event, "source": "auth.failed"}
+        self.assertIs(ruleset.apply(other), other)
+        self.assertEqual(ruleset.apply({**event, "severity": "CRITICAL"})["severity"], "CRITICAL")
+        # source falls back on the incident type
+        self.assertTrue(ruleset.match({"incident_type": "XSS", "url": "<script"}))
+
+    def test_window_escalates_every_match_and_dedupes_cases_per_key(self):
+        ruleset = self._ruleset("auth.failed | where src_ip == <IP> | last 1h")
+        event = {"source": "auth.failed", "source_ip": "1.2.3.4", "client_id": 1, "severity": "LOW"}
+        self.assertTrue(ruleset.apply(event, now=0)["force_case"])
+        repeat = ruleset.apply(event, now=3599)
+        self.assertEqual((repeat["severity"], repeat["matched_rules"], repeat.get("rule_repeat")), ("HIGH", [1], True))
+        self.assertNotIn("force_case", repeat)
+        self.assertTrue(ruleset.apply({**event, "source_ip": "5.6.7.8"}, now=10)["force_case"])
+        self.assertTrue(ruleset.apply({**event, "client_id": 2}, now=10)["force_case"])
+        self.assertTrue(ruleset.apply(event, now=3600)["force_case"])
+        # an event that needs a case of its own is never folded into the rule's
+        self.assertTrue(ruleset.apply({**event, "severity": "HIGH"}, now=3601)["force_case"])
+
+    def test_window_without_placeholders_never_dedupes(self):
+        ruleset = self._ruleset('web.access | where url contains "<script" | last 24h')
+        event = {"source": "web.access", "url": "/?q=<script>", "client_id": 1, "severity": "LOW"}
+        for now in (0, 1, 2):
+            applied = ruleset.apply(event, now=now)
+            self.assertEqual((applied["severity"], applied.get("force_case")), ("HIGH", True))
+            self.assertNotIn("rule_repeat", applied)
+
+    def test_repeat_match_is_stored_without_a_new_case(self):
+        Rule.objects.update(enabled=False)
+        Rule.objects.create(name="bf", query_template="auth.failed | where src_ip == <IP> | last 1h",
+                            severity="HIGH", incident_type="BRUTE_FORCE", response_steps="")
+        client = Client.objects.create(name="Acme")
+        event = make_event(client.id, source="auth.failed", source_ip="1.2.3.4")
+        with override_settings(SOC_RULES_ENABLED=True), mock.patch("soc.rules._ruleset", None):
+            ingest_events([event])
+            ingest_events([dict(event)])
+        self.assertEqual(list(Alert.objects.values_list("severity", flat=True)), ["HIGH", "HIGH"])
+        self.assertEqual(Case.objects.count(), 1)
+
+class CorrelationTests(TestCase):
+    detection = Detection("bf", "BRUTE_FORCE", "source_ip", 3, 60, 6, "HIGH", "{count} from {key} in {window}")
+
+    def _engine(self, mode="exact") -> CorrelationEngine:
+        return CorrelationEngine([self.detection], mode=mode, max_keys=100, sketch_width=256, sketch_depth=4)
+
+    def _observe(self, engine, now, ip="1.2.3.4", client_id=1, **fields):
+        event = {"incident_type": "BRUTE_FORCE", "source_ip": ip, **fields}
+        with mock.patch("soc.correlation.time.time", return_value=now):
+            return engine.observe([(0, event, client_id)])
+
+    def test_fires_once_when_the_threshold_is_crossed(self):
+        for mode in ("exact", "sketch"):
+            with self.subTest(mode=mode):
+                engine = self._engine(mode)
+                self.assertEqual(self._observe(engine, 1000), [])
+                self.assertEqual(self._observe(engine, 1001), [])
+                fired = self._observe(engine, 1002)
+                self.assertEqual(len(fired), 1)
+                event = fired[0]
+                self.assertEqual((event["client_id"], event["source_ip"], event["severity"]), (1, "1.2.3.4", "HIGH"))
+                self.assertEqual(event["title"], "3 from 1.2.3.4 in 1m")
+                self.assertTrue(event["force_case"] and event["correlated"])
+                # still above the threshold, but a key fires at most once per window
+                self.assertEqual(self._observe(engine, 1003), [])
+                self.assertEqual(engine.fired, 1)
+
+    def test_keys_are_per_client_and_value(self):
+        engine = self._engine()
+        for ip, client_id in [("1.1.1.1", 1), ("1.1.1.1", 2), ("2.2.2.2", 1)] * 2:
+            self.assertEqual(self._observe(engine, 1000, ip, client_id), [])
+
+    def test_counts_leave_the_window(self):
+        engine = self._engine()
+        self._observe(engine, 1000)
+        self._observe(engine, 1001)
+        # 10s buckets: the first two have expired by 1070
+        self.assertEqual(self._observe(engine, 1070), [])
+        self.assertEqual(self._observe(engine, 1071), [])
+        self.assertEqual(len(self._observe(engine, 1072)), 1)
+
+    def test_ignores_other_types_missing_keys_and_correlated_events(self):
+        engine = self._engine()
+        for _ in range(5):
+            self._observe(engine, 1000, incident_type="XSS")
+            self._observe(engine, 1000, ip="")
+            self._observe(engine, 1000, correlated=True)
+        self.assertEqual(engine.fired, 0)
+
+    def test_window_counter_evicts_least_recent_key(self):
+        counter = WindowCounter(60, 6, max_keys=2)
+        counter.add("a", 0)
+        counter.add("b", 0)
+        counter.add("a", 1)
+        counter.add("c", 2)
+        self.assertEqual((len(counter), counter.evictions), (2, 1))
+        self.assertEqual(counter.add("a", 3), 3)
+        self.assertEqual(counter.add("b", 3), 1)
+
+    def test_sketch_never_undercounts(self):
+        sketch = SketchCounter(60, 6, width=16, depth=2)
+        exact: dict[int, int] = {}
+        for i in range(500):
+            key = i % 40
+            exact[key] = exact.get(key, 0) + 1
+            self.assertGreaterEqual(sketch.add(key, 10), exact[key])
+
+    @override_settings(SOC_CORRELATION_ENABLED=True)
+    def test_ingest_opens_a_correlated_case(self):
+        client = Client.objects.create(name="Acme")
+        events = [make_event(client.id, incident_type="BRUTE_FORCE", source_ip="9.9.9.9") for _ in range(20)]
+        with mock.patch("soc.correlation._engine", None), self.captureOnCommitCallbacks(execute=True):
+            ingest_events(events)
+        case = Case.objects.get()
+        self.assertEqual((case.severity, case.source_ip), ("HIGH", "9.9.9.9"))
+        self.assertTrue(case.title.startswith("Brute-force: 20 attempts from 9.9.9.9"))
+        self.assertEqual(Alert.objects.count(), 21)
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(override_settings(SOC_ARCHIVE_DIR=tmp.name))
+
+        client = Client.objects.create(name="Acme")
+        results = ingest_events([
+            make_event(client.id, severity="HIGH", title="old resolved", tasks=["Contain"]),
+            make_event(client.id, severity="HIGH", title="old open"),
+            make_event(client.id, title="new"),
+        ])
+        self.old_alert, self.open_alert, self.new_alert = (r["alert_id"] for r in results)
+        self.resolved_case, self.open_case = results[0]["case_id"], results[1]["case_id"]
+        Case.objects.filter(id=self.resolved_case).update(status="RESOLVED")
+        self.old_day = timezone.make_aware(datetime(2026, 1, 10, 12))
+        Alert.objects.exclude(id=self.new_alert).update(created_at=self.old_day)
+        Case.objects.update(created_at=self.old_day)
+
+        call_command("archive_old_records", days=90, chunk_size=1, stdout=StringIO())
+
+    def test_old_rows_leave_the_hot_tables(self):
+        self.assertEqual(list(Alert.objects.values_list("id", flat=True)), [self.new_alert])
+        # unresolved cases stay however old they are
+        self.assertEqual(list(Case.objects.values_list("id", flat=True)), [self.open_case])
+        self.assertFalse(Task.objects.filter(case_id=self.resolved_case).exists())
+        # the open case still references its blob; the archived alerts' blobs were pruned
+        self.assertEqual(EventBlob.objects.count(), 2)
+
+    def test_day_archive_round_trip(self):
+        records = list(iter_day("alerts", self.old_day.date()))
+        self.assertEqual(sorted(r["id"] for r in records), sorted([self.old_alert, self.open_alert]))
+        # same timestamp text as the CSV/NDJSON exports
+        self.assertEqual({r["created_at"] for r in records}, {self.old_day.astimezone(dt_timezone.utc).isoformat()})
+        self.assertEqual({r["raw_event"]["hostname"] for r in records}, {"WEB-01"})
+        [case] = iter_day("cases", self.old_day.date())
+        self.assertEqual([t["title"] for t in case["tasks"]], ["Contain"])
+
+    def test_detail_views_fall_back_on_the_archive(self):
+        resp = self.client.get(f"/api/alerts/{self.old_alert}/")
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual((data["title"], data["raw_event"]["source_ip"]), ("old resolved", "185.10.1.20"))
+
+        data = self.client.get(f"/api/cases/{self.resolved_case}/").json()
+        self.assertEqual((data["status"], data["evidence"]["hostname"]), ("RESOLVED", "WEB-01"))
+        self.assertEqual([t["title"] for t in data["tasks"]], ["Contain"])
+
+        self.assertEqual(self.client.get("/api/alerts/999999/").status_code, 404)
+        resp = self.client.patch(f"/api/cases/{self.resolved_case}/", {"status": "OPEN"},
+                                 content_type="application/json")
+        self.assertEqual(resp.status_code, 404)
+
+    def test_rebuild_rollups_keeps_archived_hours(self):
+        old_hour = self.old_day.astimezone(dt_timezone.utc)
+        DashboardRollup.objects.create(client_id=Case.objects.get().client_id, hour=old_hour, severity="HIGH",
+                                       incident_type="XSS", alerts=2, cases=2)
+        call_command("rebuild_rollups", stdout=StringIO())
+        call_command("rebuild_rollups", since="2026-01-01", stdout=StringIO())
+        self.assertEqual(DashboardRollup.objects.get(hour=old_hour).alerts, 2)
+        self.assertEqual(sum(DashboardRollup.objects.filter(hour__gt=old_hour).values_list("alerts", flat=True)), 1)
+
+class BlobStoreTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Acme")
+
+    def test_identical_payloads_are_stored_once(self):
+        blobs = store_blobs([{"a": 1, "b": [1, 2]}, {"b": [1, 2], "a": 1}, {"a": 2}])
+        self.assertEqual(blobs[0].digest, blobs[1].digest)
+        self.assertEqual(EventBlob.objects.count(), 2)
+        store_blobs([{"a": 1, "b": [1, 2]}])
+        self.assertEqual(EventBlob.objects.count(), 2)
+        self.assertEqual(EventBlob.objects.get(digest=blobs[2].digest).load(), {"a": 2})
+
+    def test_alert_and_case_share_the_payload(self):
+        event = make_event(self.client_obj.id, severity="CRITICAL")
+        ingest_events([event, dict(event)])
+        self.assertEqual(EventBlob.objects.count(), 1)
+        alert = Alert.objects.select_related("blob").first()
+        case = Case.objects.first()
+        self.assertEqual(alert.blob_id, case.blob_id)
+        self.assertEqual(case.payload, alert.payload)
+        self.assertEqual(alert.payload["source_ip"], "185.10.1.20")
+
+    def test_rows_without_a_blob_read_the_inline_payload(self):
+        alert = Alert.objects.create(client=self.client_obj, severity="LOW", incident_type="XSS", title="legacy",
+                                     raw_event={"source_ip": "10.0.0.1"})
+        self.assertEqual(alert.payload, {"source_ip": "10.0.0.1"})
+
+    def test_inline_payloads(self):
+        [blob] = store_blobs([{"x": 1}])
+        rows = [{"id": 1, "blob_id": blob.digest, "raw_event": {}}, {"id": 2, "blob_id": None, "raw_event": {"y": 2}}]
+        inline_payloads(rows, "raw_event")
+        self.assertEqual(rows, [{"id": 1, "raw_event": {"x": 1}}, {"id": 2, "raw_event": {"y": 2}}])
+
+    def test_prune_keeps_referenced_blobs(self):
+        ingest_events([make_event(self.client_obj.id, title=f"t{i}") for i in range(3)])
+        store_blobs([{"orphan": i} for i in range(7)])
+        kept = set(Alert.objects.values_list("blob_id", flat=True))
+        self.assertEqual(prune_blobs(chunk_size=2), 7)
+        self.assertEqual(set(EventBlob.objects.values_list("digest", flat=True)), kept)
+        self.assertEqual(prune_blobs(), 0)
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Acme")
+        ingest_events([
+            make_event(self.client_obj.id, title="Mimikatz on <b>DC-01</b>", severity="CRITICAL"),
+            make_event(self.client_obj.id, title="Suspicious process", process="mimikatz.exe"),
+            make_event(self.client_obj.id, title="Login burst", url="https://portal.example.com/login"),
+        ] + [make_event(self.client_obj.id, title=f"Beacon {i}", note="cobalt beacon") for i in range(5)])
+
+    def _search(self, query: str) -> dict:
+        resp = self.client.get(f"/api/search/?{query}")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()
+
+    def test_fts_query_quotes_terms(self):
+        self.assertEqual(fts_query("10.0.0.5 mimi*"), '"10.0.0.5" "mimi"*')
+        self.assertEqual(fts_query("title:beacon OR host:web-01"), 'title : "beacon" OR host : "web-01"')
+        self.assertEqual(fts_query('https://x.io/a "two words"'), '"https://x.io/a" "two words"')
+        self.assertEqual(fts_query("OR a OR OR"), '"a"')
+        with self.assertRaises(SearchSyntaxError):
+            fts_query('  "" ')
+
+    def test_title_hits_rank_above_payload_hits(self):
+        results = self._search("q=mimikatz&kind=alerts")["results"]
+        self.assertEqual([r["title"] for r in results], ["Mimikatz on <b>DC-01</b>", "Suspicious process"])
+        self.assertGreater(results[0]["score"], results[1]["score"])
+        # indexed text is escaped before the match markers become tags
+        self.assertEqual(results[0]["title_highlight"], "<mark>Mimikatz</mark> on &lt;b&gt;DC-01&lt;/b&gt;")
+
+    def test_cases_and_filters(self):
+        results = self._search("q=mimikatz")["results"]
+        self.assertEqual(sorted(r["kind"] for r in results), ["alert", "alert", "case"])
+        results = self._search("q=mimikatz&severity=CRITICAL")["results"]
+        self.assertEqual({r["severity"] for r in results}, {"CRITICAL"})
+        self.assertEqual(self._search("q=portal.example.com&kind=alerts")["results"][0]["title"], "Login burst")
+
+    def test_cursor_pages_through_every_hit_once(self):
+        expected = set(Alert.objects.filter(title__startswith="Beacon").values_list("id", flat=True))
+        seen, scores = [], []
+        data = self._search("q=beacon&kind=alerts&page_size=2")
+        while True:
+            seen += [r["id"] for r in data["results"]]
+            scores += [r["score"] for r in data["results"]]
+            if not data["next"]:
+                break
+            data = self.client.get(data["next"]).json()
+        self.assertEqual(len(seen), len(expected))
+        self.assertEqual(set(seen), expected)
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_rebuild_indexes_history_older_than_live_rows(self):
+        with override_settings(SOC_SEARCH_SYNC=False):
+            ingest_events([make_event(self.client_obj.id, title="Old dropper")])
+        ingest_events([make_event(self.client_obj.id, title="New dropper")])
+        self.assertEqual(len(self._search("q=dropper&kind=alerts")["results"]), 1)
+        call_command("rebuild_search_index", "--kind", "alerts", "--chunk-size", "2", stdout=StringIO())
+        titles = {r["title"] for r in self._search("q=dropper&kind=alerts")["results"]}
+        self.assertEqual(titles, {"Old dropper", "New dropper"})
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get("/api/search/?q=").status_code, 400)
+        self.assertEqual(self.client.get("/api/search/?q=x&kind=tasks").status_code, 400)
+        self.assertEqual(self.client.get("/api/search/?q=x&cursor=zzz").status_code, 400)
+        self.assertEqual(self.client.get("/api/search/?q=x&client=acme").status_code, 400)
+
+class CIDRTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Acme")
+        ingest_events([
+            make_event(self.client_obj.id, title="a", source_ip="185.10.1.20", host_ip="10.0.0.5", severity="HIGH"),
+            make_event(self.client_obj.id, title="b", source_ip="185.11.0.1", host_ip="10.0.1.9"),
+            make_event(self.client_obj.id, title="c", source_ip="2001:db8::7", host_ip="185.10.200.1"),
+            make_event(self.client_obj.id, title="d", source_ip="not-an-ip", host_ip=""),
+        ])
+        self.enterContext(mock.patch.object(filters, "_block_stats", None))
+
+    def _titles(self, query: str, kind="alerts") -> list[str]:
+        resp = self.client.get(f"/api/{kind}/?{query}")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return sorted(r["title"] for r in resp.json()["results"])
+
+    def test_keys_sort_numerically(self):
+        self.assertLess(ip_key("9.255.255.255"), ip_key("10.0.0.0"))
+        self.assertEqual(ip_key("10.0.0.1"), ip_key("::ffff:10.0.0.1"))
+        self.assertEqual(ip_key("bogus"), "")
+        self.assertEqual(ip_key(None), "")
+        first, last = cidr_range("10.0.0.0/8")
+        self.assertTrue(first <= ip_key("10.255.0.1") <= last)
+        self.assertFalse(first <= ip_key("11.0.0.0") <= last)
+        self.assertEqual(cidr_range("10.0.0.7"), (ip_key("10.0.0.7"), ip_key("10.0.0.7")))
+
+    def test_cidr_matches_either_side(self):
+        self.assertEqual(self._titles("cidr=185.10.0.0/16"), ["a", "c"])
+        self.assertEqual(self._titles("source_cidr=185.10.0.0/16"), ["a"])
+        self.assertEqual(self._titles("host_cidr=10.0.0.0/23"), ["a", "b"])
+        self.assertEqual(self._titles("cidr=2001:db8::/32"), ["c"])
+        self.assertEqual(self._titles("cidr=185.11.0.1"), ["b"])
+        self.assertEqual(self._titles("cidr=185.10.0.0/16", kind="cases"), ["a"])
+        self.assertEqual(self.client.get("/api/alerts/?cidr=10.0.0.0/33").status_code, 400)
+
+    def test_dense_blocks_give_the_same_rows(self):
+        with mock.patch.object(filters.CIDRFilter, "_dense", return_value=True):
+            self.assertEqual(self._titles("cidr=185.10.0.0/16"), ["a", "c"])
+            self.assertEqual(self._titles("host_cidr=10.0.0.0/23"), ["a", "b"])
+
+    def test_density_stats_are_cached(self):
+        self._titles("cidr=185.10.0.0/16")
+        # just the page itself: the table size and the block's match count come from the cache
+        with self.assertNumQueries(1):
+            self._titles("cidr=185.10.0.0/16")
+
+    def test_keys_follow_saved_ips(self):
+        alert = Alert.objects.create(client=self.client_obj, severity="LOW", incident_type="XSS", title="e",
+                                     raw_event={"source_ip": "172.16.0.1"})
+        self.assertEqual(alert.source_ip_num, ip_key("172.16.0.1"))
+        self.assertEqual(alert.host_ip_num, "")
+        case = Case.objects.get()
+        case.source_ip = "172.16.0.2"
+        case.save(update_fields=["source_ip"])
+        case.refresh_from_db()
+        self.assertEqual(case.source_ip_num, ip_key("172.16.0.2"))
+        self.assertEqual(self._titles("source_cidr=172.16.0.0/12", kind="cases"), ["a"])
+
+class ObservablePivotTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Acme")
+        results = ingest_events([
+            make_event(self.client_obj.id, title=title, severity=severity, source_ip=source, host_ip=host,
+                       hostname=hostname, **extra)
+            for title, severity, source, host, hostname, extra in [
+                ("a", "HIGH", "1.1.1.1", "10.0.0.1", "WEB-01.", {"username": "J.Doe"}),
+                ("b", "HIGH", "185.10.1.21", "10.0.0.2", "APP-01", {"user": "j.doe"}),
+                ("c", "HIGH", "185.10.1.21", "10.0.0.2", "DB-01", {}),
+                ("d", "LOW", "3.3.3.3", "10.0.0.9", "web-01", {}),
+            ]
+        ])
+        self.cases = {t: r["case_id"] for t, r in zip("abcd", results)}
+
+    def _pivot(self, path: str) -> dict:
+        resp = self.client.get(f"/api/observables/{path}")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()
+
+    def test_extract_normalizes_values(self):
+        pairs = dict(observables.extract({"source_ip": " 2001:DB8::1 ", "hostname": "Web-01.", "user": "Admin",
+                                          "host_ip": "nope", "url": "/Login"}))
+        self.assertEqual(pairs, {"source_ip": "2001:db8::1", "hostname": "web-01", "username": "admin",
+                                 "url": "/Login"})
+
+    def test_sightings_count_alerts_only(self):
+        user = Observable.objects.get(type="username", value="j.doe")
+        self.assertEqual(user.sightings, 2)
+        self.assertEqual(Observable.objects.get(type="hostname", value="web-01").sightings, 2)
+
+    def test_pivot_lists_cases_and_alerts_newest_first(self):
+        data = self._pivot("username/J.DOE/")
+        self.assertEqual((data["value"], data["sightings"]), ("j.doe", 2))
+        # one ingest batch shares created_at, so the link id breaks the tie
+        self.assertEqual([(r["kind"], r["title"]) for r in data["results"]],
+                         [("case", "b"), ("case", "a"), ("alert", "b"), ("alert", "a")])
+        data = self._pivot("source_ip/185.10.1.21/?kind=case")
+        self.assertEqual([r["title"] for r in data["results"]], ["c", "b"])
+        data = self._pivot("hostname/web-01/?kind=alert&page_size=1")
+        self.assertEqual([r["title"] for r in data["results"]], ["d"])
+        self.assertEqual([r["title"] for r in self.client.get(data["next"]).json()["results"]], ["a"])
+
+    def test_rebuild_indexes_history_older_than_live_rows(self):
+        with override_settings(SOC_OBSERVABLES_ENABLED=False):
+            ingest_events([make_event(self.client_obj.id, title="old", hostname="OLD-01", source_ip="4.4.4.4")])
+        ingest_events([make_event(self.client_obj.id, title="new", hostname="NEW-01", source_ip="5.5.5.5")])
+        call_command("rebuild_observables", "--chunk-size", "1", stdout=StringIO())
+        self.assertEqual([r["title"] for r in self._pivot("hostname/old-01/")["results"]], ["old"])
+        # rows already linked are left alone
+        self.assertEqual(Observable.objects.get(type="hostname", value="new-01").sightings, 1)
+
+    def test_unknown_observables(self):
+        self.assertEqual(self.client.get("/api/observables/hash/abc/").status_code, 400)
+        self.assertEqual(self.client.get("/api/observables/username/nobody/").status_code, 404)
+
+    def test_related_cases_by_shared_observables(self):
+        case_b = Case.objects.get(id=self.cases["b"])
+        related = observables.related_cases(case_b)
+        self.assertEqual([(r["case"].title, r["shared"]) for r in related], [("c", 2), ("a", 1)])
+        self.assertEqual(related[1]["observables"], ["username:j.doe"])
+        with override_settings(SOC_OBSERVABLE_MAX_FANOUT=1):
+            self.assertEqual(observables.related_cases(case_b), [])
+
+class ColumnarExportTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.client_obj = Client.objects.create(name="Acme")
+        ingest_events([make_event(self.client_obj.id, severity=sev, incident_type=itype)
+                       for sev, itype in [("LOW", "XSS"), ("HIGH", "SQL_INJECTION"), ("CRITICAL", "BRUTE_FORCE")]])
+
+    def _export(self, *args):
+        call_command("export_columnar", "--output", self.dir, *args, stdout=StringIO())
+
+    def test_export_and_reload(self):
+        self._export()
+        meta = analytics.read_meta(self.dir, "alerts")
+        self.assertEqual((meta["rows"], meta["last_id"]), (3, Alert.objects.latest("id").id))
+
+        columns = analytics.open_columns(self.dir, "alerts")
+        self.assertEqual(list(columns["id"]), list(Alert.objects.order_by("id").values_list("id", flat=True)))
+        df = analytics.frame(self.dir, "alerts")
+        self.assertEqual(list(df["severity"]), ["LOW", "HIGH", "CRITICAL"])
+        self.assertEqual(list(df["incident_type"]), ["XSS", "SQL_INJECTION", "BRUTE_FORCE"])
+        expected = [a.created_at.replace(tzinfo=None) for a in Alert.objects.order_by("id")]
+        self.assertEqual([t.to_pydatetime() for t in df["created_at"]], expected)
+
+        cases = analytics.frame(self.dir, "cases")
+        self.assertEqual(list(cases["status"]), ["OPEN", "OPEN"])
+
+    def test_incremental_append_and_patch(self):
+        self._export()
+        snapshot = analytics.Snapshot(self.dir, "cases")
+        self.assertEqual(len(snapshot.refresh()), 2)
+
+        case = Case.objects.order_by("id").first()
+        case.status, case.verdict, case.updated_at = "RESOLVED", "TRUE_POSITIVE", timezone.now()
+        case.save()
+        ingest_events([make_event(self.client_obj.id, severity="HIGH", title="later")])
+        self._export()
+
+        tail = snapshot.refresh()
+        self.assertEqual(list(tail["id"]), [Case.objects.latest("id").id])
+        df = analytics.frame(self.dir, "cases")
+        self.assertEqual(list(df["status"]), ["RESOLVED", "OPEN", "OPEN"])
+        self.assertEqual(list(df["verdict"])[0], "TRUE_POSITIVE")
+
+    def test_uncommitted_bytes_are_dropped(self):
+        self._export("--kind", "alerts")
+        with open(analytics.column_path(self.dir, "alerts", "id"), "ab") as f:
+            f.write(b"\xff" * 12)  # an export that died before writing the meta
+        ingest_events([make_event(self.client_obj.id, title="later")])
+        self._export("--kind", "alerts")
+        columns = analytics.open_columns(self.dir, "alerts")
+        self.assertEqual(list(columns["id"]), list(Alert.objects.order_by("id").values_list("id", flat=True)))
+        self.assertEqual(analytics.column_path(self.dir, "alerts", "id").stat().st_size, 4 * 8)
+
+class ChannelLayerTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = f"{tmp.name}/channels.sqlite3"
+
+    def _layer(self, **config) -> SQLiteChannelLayer:
+        # one instance per "process": each gets its own channel prefix and poller
+        return SQLiteChannelLayer(path=self.path, poll_interval=0.001, max_poll_interval=0.01, **config)
+
+    def _queued(self, layer, channel: str) -> int:
+        return layer._conn().execute("SELECT COUNT(*) FROM layer_message WHERE channel = ?", (channel,)).fetchone()[0]
+
+    def test_delivery_across_processes(self):
+        async def scenario():
+            web, writer = self._layer(), self._layer()
+            channel = await web.new_channel()
+            await web.group_add("client_1", channel)
+            await writer.group_send("client_1", {"type": "broadcast", "n": 1})
+            await writer.send(channel, {"type": "broadcast", "n": 2})
+            received = [await asyncio.wait_for(web.receive(channel), 2) for _ in range(2)]
+            await web.close()
+            return received
+
+        self.assertEqual([m["n"] for m in asyncio.run(scenario())], [1, 2])
+
+    def test_expired_messages_and_memberships_are_skipped(self):
+        async def scenario():
+            web, writer = self._layer(group_expiry=0), self._layer(expiry=0)
+            channel = await web.new_channel()
+            await web.group_add("client_1", channel)
+            await self._layer().group_send("client_1", {"type": "broadcast"})
+            self.assertEqual(self._queued(writer, channel), 0)
+            await writer.send(channel, {"type": "broadcast"})
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(web.receive(channel), 0.1)
+            await web.close()
+
+        asyncio.run(scenario())
+
+    def test_capacity_applies_to_sends_and_group_fanout(self):
+        async def scenario():
+            web = self._layer()
+            writer = self._layer(capacity=100, channel_capacity={"specific.*": 2})
+            channel = await web.new_channel()
+            await web.group_add("client_1", channel)
+            for _ in range(3):
+                await writer.group_send("client_1", {"type": "broadcast"})
+            self.assertEqual(self._queued(writer, channel), 2)
+            with self.assertRaises(ChannelFull):
+                await writer.send(channel, {"type": "broadcast"})
+
+        asyncio.run(scenario())
+
+class CoalescingBroadcasterTests(TestCase):
+    def _broadcaster(self, **options) -> CoalescingBroadcaster:
+        broadcaster = CoalescingBroadcaster(**{"window": 0.01, "max_events": 2, "max_buffer": 3, **options})
+        # frames are pulled by hand through _next_frame()
+        self.enterContext(mock.patch.object(broadcaster, "_run"))
+        return broadcaster
+
+    def test_overflow_drops_oldest_per_group(self):
+        broadcaster = self._broadcaster()
+        for n in range(5):
+            broadcaster.publish({"n": n}, ["noisy"])
+        broadcaster.publish({"n": "quiet"}, ["quiet"])
+        self.assertEqual(broadcaster.depth(), 4)
+
+        per_group, dropped = broadcaster._next_frame()
+        self.assertEqual(per_group, {"noisy": [{"n": 2}, {"n": 3}], "quiet": [{"n": "quiet"}]})
+        self.assertEqual(dropped, {"noisy": 2})
+        per_group, dropped = broadcaster._next_frame()
+        self.assertEqual((per_group, dropped), ({"noisy": [{"n": 4}]}, {}))
+        self.assertEqual(broadcaster.depth(), 0)
+
+    def test_sender_thread_sends_one_frame_per_group(self):
+        frames = []
+        broadcaster = CoalescingBroadcaster(window=0.01, max_events=2, max_buffer=10)
+        with mock.patch("soc.ws._group_send", side_effect=lambda group, message: frames.append((group, message))):
+            for n in range(3):
+                broadcaster.publish({"n": n}, ["client_1"])
+            deadline = time.monotonic() + 2
+            while broadcaster.events_sent < 3 and time.monotonic() < deadline:
+                time.sleep(0.005)
+        self.assertEqual([len(m["events"]) for _, m in frames], [2, 1])
+        self.assertEqual({(g, m["type"], m["dropped"]) for g, m in frames}, {("client_1", "broadcast_batch", 0)})
+
+class WriteExecutorTests(TransactionTestCase):
+    def test_batched_jobs_fail_independently(self):
+        executor = WriteExecutor(batch_size=10, max_wait=0.05)
+
+        def doomed():
+            Client.objects.create(name="doomed")
+            raise ValueError("boom")
+
+        futures = [executor.submit(Client.objects.create, name="a"), executor.submit(doomed),
+                   executor.submit(Client.objects.create, name="b")]
+        self.assertEqual(futures[0].result(5).name, "a")
+        with self.assertRaises(ValueError):
+            futures[1].result(5)
+        futures[2].result(5)
+        self.assertEqual(sorted(Client.objects.values_list("name", flat=True)), ["a", "b"])
+        self.assertEqual((executor.batches, executor.jobs), (1, 3))
+
+    def test_run_write_uses_the_writer_thread_and_nests_inline(self):
+        executor = WriteExecutor(batch_size=10, max_wait=0.001)
+        on_writer = lambda: threading.current_thread().name
+        with override_settings(SOC_DB_WRITER=True), mock.patch("soc.db_writer._executor", executor):
+            self.assertEqual(run_write(on_writer), "soc-db-writer")
+            # a write issued from inside a job runs inline instead of waiting on itself
+            self.assertEqual(run_write(run_write, on_writer), "soc-db-writer")
+        with override_settings(SOC_DB_WRITER=False):
+            self.assertEqual(run_write(on_writer), threading.current_thread().name)
@@ -1,15 +1,18 @@
+from django.http import HttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.utils import timezone
 from core.models import Client
 from .models import Case, Alert, Rule, IncidentType, Severity, CaseStatus, Verdict
-from .services import compute_dashboard
+from .services import get_live_dashboard
+from .observables import related_cases
+from . import metrics
 
 def _ui_lang(request):
     return request.session.get("ui_lang", "en")
 
 def dashboard_page(request):
     lang = _ui_lang(request)
-    stats = compute_dashboard()
+    stats = get_live_dashboard().stats()
     return render(request, "dashboard.html", {
         "lang": lang,
         "stats": stats,
@@ -44,6 +47,7 @@ def case_detail_page(request, case_id: int):
         "lang": lang,
         "case": case,
         "employees": client_employees,
+        "related_cases": related_cases(case),
         "statuses": CaseStatus.values,
         "verdicts": Verdict.values,
     })
@@ -70,9 +74,20 @@ def settings_page(request):
         ui_lang = request.POST.get("ui_lang", "en")
         if ui_lang in ["en", "ru"]:
             request.session["ui_lang"] = ui_lang
+        # live feed subscription, read by MonitorConsumer on connect
+        request.session["ws_clients"] = [c for c in request.POST.getlist("ws_clients") if c.isdigit()]
+        ws_min_severity = request.POST.get("ws_min_severity", "")
+        request.session["ws_min_severity"] = ws_min_severity if ws_min_severity in Severity.values else ""
+        request.session["ws_types"] = [t for t in request.POST.getlist("ws_types") if t in IncidentType.values]
         return redirect("settings")
     return render(request, "settings.html", {
         "lang": _ui_lang(request),
+        "clients": Client.objects.all().order_by("name"),
+        "severities": Severity.values,
+        "incident_types": IncidentType.values,
+        "ws_clients": request.session.get("ws_clients", []),
+        "ws_min_severity": request.session.get("ws_min_severity", ""),
+        "ws_types": request.session.get("ws_types", []),
     })
 
 def playbook_page(request, slug: str):
@@ -89,3 +104,6 @@ def playbook_page(request, slug: str):
     if not tpl:
         return render(request, "playbooks/not_found.html", {"lang": lang, "slug": slug}, status=404)
     return render(request, tpl, {"lang": lang})
+
+def metrics_page(request):
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,5 +1,158 @@
+import threading
+import time
+from collections import deque
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .metrics import ws_dropped, ws_failed, ws_sent
+
+# Low -> critical; a "min severity" subscription covers its index and above
+SEVERITY_ORDER = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+
+def group_name(client_id, severity: str) -> str:
+    """Channel group for one (client, severity); client_id None means the all-clients group."""
+    scope = "all" if client_id is None else f"c{int(client_id)}"
+    return f"monitor.{scope}.{severity}"
+
+def groups_for_event(payload: dict) -> list[str]:
+    """Groups an event is published to: its client's group and the all-clients group."""
+    severity = payload.get("severity")
+    if severity not in SEVERITY_ORDER:
+        severity = SEVERITY_ORDER[0]
+    groups = [group_name(None, severity)]
+    if payload.get("client_id") is not None:
+        groups.append(group_name(payload["client_id"], severity))
+    return groups
+
+def subscription_groups(client_ids, min_severity: str) -> list[str]:
+    """Groups a socket joins; no client ids means every client."""
+    start = SEVERITY_ORDER.index(min_severity) if min_severity in SEVERITY_ORDER else 0
+    severities = SEVERITY_ORDER[start:]
+    scopes = sorted(set(client_ids)) if client_ids else [None]
+    return [group_name(c, s) for c in scopes for s in severities]
+
+def _group_send(group: str, message: dict):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(group, message)
+    except Exception:
+        ws_failed.inc()
+        raise
+    ws_sent.inc()
+
+class CoalescingBroadcaster:
+    """
+    Buffers monitor events and sends them as one {"events": [...], "dropped": n}
+    frame per subscription group every ``window`` seconds or every
+    ``max_events`` events.
+
+    Each group buffers at most ``max_buffer`` events; when the sender falls
+    further behind, that group's oldest events are discarded and reported in
+    its next frame's ``dropped``, so a flood on one client or severity never
+    pushes out the events of quieter groups.
+    """
+
+    def __init__(self, window: float, max_events: int, max_buffer: int):
+        self.window = window
+        self.max_events = max_events
+        self._buffers: dict[str, deque] = {}
+        self._max_buffer = max_buffer
+        self._dropped: dict[str, int] = {}
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+        self.frames_sent = 0
+        self.events_sent = 0
+        self.events_dropped = 0
+
+    def depth(self) -> int:
+        with self._cond:
+            return sum(len(buffer) for buffer in self._buffers.values())
+
+    def publish(self, payload: dict, groups: list[str] | None = None):
+        with self._cond:
+            for group in groups or groups_for_event(payload):
+                buffer = self._buffers.setdefault(group, deque())
+                if len(buffer) >= self._max_buffer:
+                    buffer.popleft()
+                    self._dropped[group] = self._dropped.get(group, 0) + 1
+                    self.events_dropped += 1
+                    ws_dropped.inc(1, group)
+                buffer.append(payload)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="soc-ws-coalescer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _full(self) -> bool:
+        return any(len(buffer) >= self.max_events for buffer in self._buffers.values())
+
+    def _next_frame(self) -> tuple[dict[str, list[dict]], dict[str, int]]:
+        with self._cond:
+            while not self._buffers:
+                self._cond.wait()
+            deadline = time.monotonic() + self.window
+            while not self._full():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            per_group = {}
+            for group, buffer in list(self._buffers.items()):
+                n = min(len(buffer), self.max_events)
+                per_group[group] = [buffer.popleft() for _ in range(n)]
+                if not buffer:
+                    del self._buffers[group]
+            dropped, self._dropped = self._dropped, {}
+        return per_group, dropped
+
+    def _run(self):
+        while True:
+            per_group, dropped = self._next_frame()
+            for group in dropped.keys() - per_group.keys():
+                per_group[group] = []
+            for group, payloads in per_group.items():
+                try:
+                    _group_send(group, {
+                        "type": "broadcast_batch",
+                        "events": payloads,
+                        "dropped": dropped.get(group, 0),
+                    })
+                    self.frames_sent += 1
+                    self.events_sent += len(payloads)
+                except Exception as e:
+                    print("WS coalescer error:", e)
+
+_broadcaster: CoalescingBroadcaster | None = None
+_broadcaster_lock = threading.Lock()
+
+def get_broadcaster() -> CoalescingBroadcaster | None:
+    """The shared coalescer, or None when SOC_WS_COALESCE_MS is 0 (send every event immediately)."""
+    global _broadcaster
+    if settings.SOC_WS_COALESCE_MS <= 0:
+        return None
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                max_events = settings.SOC_WS_COALESCE_MAX_EVENTS
+                _broadcaster = CoalescingBroadcaster(
+                    window=settings.SOC_WS_COALESCE_MS / 1000.0,
+                    max_events=max_events,
+                    max_buffer=max_events * 10,
+                )
+    return _broadcaster
+
+def publish(payload: dict, groups: list[str] | None = None):
+    """Send an event to ``groups``, by default the groups subscribed to its client and severity."""
+    broadcaster = get_broadcaster()
+    if broadcaster is not None:
+        broadcaster.publish(payload, groups)
+        return
+    for group in groups or groups_for_event(payload):
+        _group_send(group, {"type": "broadcast", "payload": payload})
 
 def broadcast_event(event_name: str, obj=None):
     payload = {"event": event_name}
@@ -7,19 +160,10 @@ def broadcast_event(event_name: str, obj=None):
     if obj is not None:
         payload.update({
             "id": getattr(obj, "id", None),
+            "client_id": getattr(obj, "client_id", None),
             "severity": getattr(obj, "severity", None),
             "incident_type": getattr(obj, "incident_type", None),
             "title": getattr(obj, "title", None),
         })
 
-    channel_layer = get_channel_layer()
-    if channel_layer is None:
-        return
-
-    async_to_sync(channel_layer.group_send)(
-        "monitor",
-        {
-            "type": "broadcast",  #consumers.py -> broadcast()
-            "payload": payload
-        }
-    )
+    publish(payload)  # consumers.py -> broadcast() / broadcast_batch()
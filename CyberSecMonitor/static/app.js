@@ -1,7 +1,10 @@
 /* global Chart */
 window.MONITOR = (() => {
   let ws;
+  let wsParams = "";
   let charts = {};
+  let dashState = null;  // last /api/dashboard/ payload, patched by dashboard_delta frames
+  let dashLive = false;  // true while the socket delivers deltas for this dashboard
 
   // ===== GLOBAL CHART THEME =====
   Chart.defaults.color = "#E6EAF2";
@@ -29,34 +32,95 @@ window.MONITOR = (() => {
     el.addEventListener("hidden.bs.toast", () => el.remove());
   }
 
-  function connectWS(){
+  function connectWS(params=wsParams){
+    wsParams = params;
     const proto = (location.protocol === "https:") ? "wss" : "ws";
-    ws = new WebSocket(`${proto}://${location.host}/ws/monitor/`);
+    // Subscription (clients / min severity / types) comes from the session, see Settings
+    ws = new WebSocket(`${proto}://${location.host}/ws/monitor/${params}`);
     const badge = document.getElementById("ws-status");
 
     ws.onopen = () => { if(badge) badge.textContent = "online"; };
-    ws.onclose = () => { if(badge) badge.textContent = "offline"; setTimeout(connectWS, 1200); };
+    ws.onclose = () => {
+      if(badge) badge.textContent = "offline";
+      dashLive = false;
+      setTimeout(() => connectWS(), 1200);
+    };
     ws.onerror = () => { if(badge) badge.textContent = "offline"; };
 
     ws.onmessage = (msg) => {
       try{
         const data = JSON.parse(msg.data);
-        if(data.event === "new_case"){
-          toast("New case", `${data.severity} • ${data.incident_type}: ${data.title}`, "danger");
-          refreshDashboard();
-          if(location.pathname.startsWith("/cases/") || location.pathname.startsWith("/alerts/")){
-            if(location.pathname.startsWith("/cases/")) loadCases();
-            if(location.pathname.startsWith("/alerts/")) loadAlerts();
-          }
-        }else if(data.event === "new_alert"){
-          toast("New alert", `${data.severity} • ${data.incident_type}: ${data.title}`, "info");
-          refreshDashboard();
-          if(location.pathname.startsWith("/alerts/")) loadAlerts();
-        }
+        if(Array.isArray(data.events)) handleBatch(data);
+        else handleEvent(data);
       }catch(e){ /* ignore */ }
     };
   }
 
+  // Dashboard numbers come from deltas while live; only poll when they do not.
+  function onActivity(){
+    if(!dashLive) refreshDashboard();
+  }
+
+  function refreshLists(withCases){
+    if(withCases && location.pathname.startsWith("/cases/")) loadCases();
+    if(location.pathname.startsWith("/alerts/")) loadAlerts();
+  }
+
+  function handleEvent(data){
+    if(data.event === "subscribed"){
+      dashLive = !!data.dashboard && !!dashState;
+    }else if(data.event === "dashboard_delta"){
+      applyDashboardDelta(data);
+    }else if(data.event === "new_case"){
+      toast("New case", `${data.severity} • ${data.incident_type}: ${data.title}`, "danger");
+      onActivity();
+      refreshLists(true);
+    }else if(data.event === "new_alert"){
+      toast("New alert", `${data.severity} • ${data.incident_type}: ${data.title}`, "info");
+      onActivity();
+      refreshLists(false);
+    }else if(data.event === "batch_ingested"){
+      queueBatchToast(data);
+    }
+  }
+
+  // A batch arrives as one summary per (client, severity, type); merge them into one toast.
+  let pendingBatch = null;
+  function queueBatchToast(data){
+    if(!pendingBatch){
+      pendingBatch = {alerts: 0, cases: 0};
+      setTimeout(() => {
+        const b = pendingBatch;
+        pendingBatch = null;
+        toast("Batch ingested", `${b.alerts} alerts • ${b.cases} cases`, b.cases ? "danger" : "info");
+        onActivity();
+        refreshLists(true);
+      }, 300);
+    }
+    pendingBatch.alerts += data.alerts;
+    pendingBatch.cases += data.cases;
+  }
+
+  // Coalesced frame: {"events": [...], "dropped": n} -> one toast, one refresh
+  function handleBatch(batch){
+    const deltas = (batch.events || []).filter(e => e.event === "dashboard_delta");
+    const events = (batch.events || []).filter(e => e.event !== "dashboard_delta");
+    deltas.forEach(applyDashboardDelta);
+    if(!events.length && !batch.dropped) return;
+    if(events.length === 1 && !batch.dropped) return handleEvent(events[0]);
+    if(batch.dropped && dashLive) refreshDashboard();  // deltas may be missing, resync
+    let alerts = 0, cases = 0;
+    for(const e of events){
+      if(e.event === "batch_ingested"){ alerts += e.alerts; cases += e.cases; }
+      else if(e.event === "new_case"){ alerts += 1; cases += 1; }
+      else if(e.event === "new_alert"){ alerts += 1; }
+    }
+    const dropped = batch.dropped ? ` • ${batch.dropped} dropped` : "";
+    toast("Activity", `${alerts} alerts • ${cases} cases${dropped}`, cases ? "danger" : "info");
+    onActivity();
+    refreshLists(cases > 0);
+  }
+
   async function fetchJSON(url, opts={}){
     const r = await fetch(url, opts);
     if(!r.ok) throw new Error(await r.text());
@@ -67,9 +131,51 @@ window.MONITOR = (() => {
   async function refreshDashboard(){
     if(!document.getElementById("timelineChart")) return;
     const data = await fetchJSON("/api/dashboard/");
+    data.newest_at = data.last_scan_seconds_ago < 9999 ? Date.now() - data.last_scan_seconds_ago * 1000 : null;
+    dashState = data;
+    if(ws && ws.readyState === WebSocket.OPEN && wsParams.includes("dashboard=")) dashLive = true;
+    renderDashboard(data);
+  }
+
+  // Patch dashState with a {"event": "dashboard_delta"} frame and re-render without hitting the API.
+  function applyDashboardDelta(d){
+    if(!dashState || !dashLive) return;
+    if(dashState.day && d.day !== dashState.day) return refreshDashboard();  // midnight rollover
+    dashState.day = d.day;
+
+    for(const [sev, n] of Object.entries(d.severity)){
+      dashState.severity_counts[sev] = (dashState.severity_counts[sev] || 0) + n;
+    }
+    dashState.total_alerts_today = Object.values(dashState.severity_counts).reduce((a, b) => a + b, 0);
+    const total = dashState.total_alerts_today || 1;
+    for(const [sev, n] of Object.entries(dashState.severity_counts)){
+      dashState.severity_percent[sev] = Math.round(n * 1000 / total) / 10;
+    }
+
+    const inc = Object.fromEntries(dashState.incidents_today.map(x => [x.incident_type, x.count]));
+    for(const [t, n] of Object.entries(d.incident_types)) inc[t] = (inc[t] || 0) + n;
+    dashState.incidents_today = Object.entries(inc)
+      .map(([incident_type, count]) => ({incident_type, count}))
+      .sort((a, b) => b.count - a.count);
+
+    for(const [h, n] of Object.entries(d.timeline)) dashState.timeline_hourly[+h].cases += n;
+    dashState.threat_map_points = d.points.concat(dashState.threat_map_points).slice(0, 25);
+    if(d.newest_at) dashState.newest_at = Date.parse(d.newest_at);
+
+    renderDashboard(dashState);
+  }
+
+  function renderLastScan(){
+    const el = document.getElementById("lastScan");
+    if(!el || !dashState) return;
+    const ago = dashState.newest_at ? Math.max(0, Math.round((Date.now() - dashState.newest_at) / 1000)) : 9999;
+    el.textContent = `${ago}s ago`;
+  }
+
+  function renderDashboard(data){
 
     document.getElementById("totalAlerts").textContent = data.total_alerts_today;
-    document.getElementById("lastScan").textContent = `${data.last_scan_seconds_ago}s ago`;
+    renderLastScan();
     document.getElementById("pCritical").textContent = `${data.severity_percent.CRITICAL}%`;
     document.getElementById("pHigh").textContent = `${data.severity_percent.HIGH}%`;
     document.getElementById("pMedium").textContent = `${data.severity_percent.MEDIUM}%`;
@@ -178,9 +284,12 @@ window.MONITOR = (() => {
   }
 
   function initDashboard(){
-    connectWS();
+    connectWS("?dashboard=all");
     refreshDashboard();
-    setInterval(refreshDashboard, 5000);
+    // Fallback polling only while deltas are not flowing, plus a slow resync.
+    setInterval(() => { if(!dashLive) refreshDashboard(); }, 5000);
+    setInterval(refreshDashboard, 60000);
+    setInterval(renderLastScan, 1000);
   }
 
   // ---------- ALERTS ----------
@@ -191,13 +300,8 @@ window.MONITOR = (() => {
     return params;
   }
 
-  async function loadAlerts(){
-    const tbody = document.getElementById("alertsTbody");
-    if(!tbody) return;
-    const params = readFormParams("alertFilterForm");
-    const url = "/api/alerts/?" + params.toString();
-    const data = await fetchJSON(url);
-    const rows = data.map(a => `
+  function alertRow(a){
+    return `
       <tr>
         <td>${a.id}</td>
         <td>${new Date(a.created_at).toLocaleTimeString()}</td>
@@ -205,8 +309,27 @@ window.MONITOR = (() => {
         <td>${a.incident_type}</td>
         <td>${a.title}</td>
       </tr>
-    `).join("");
-    tbody.innerHTML = rows || `<tr><td colspan="5" class="text-secondary">No alerts</td></tr>`;
+    `;
+  }
+
+  // Lists are keyset-paginated: {next, previous, results}; "More" follows `next`.
+  function setMoreButton(btnId, nextUrl, loadMore){
+    const btn = document.getElementById(btnId);
+    if(!btn) return;
+    btn.classList.toggle("d-none", !nextUrl);
+    btn.onclick = nextUrl ? () => loadMore(nextUrl) : null;
+  }
+
+  async function loadAlerts(nextUrl=null){
+    const tbody = document.getElementById("alertsTbody");
+    if(!tbody) return;
+    const params = readFormParams("alertFilterForm");
+    const url = nextUrl || "/api/alerts/?" + params.toString();
+    const data = await fetchJSON(url);
+    const rows = data.results.map(alertRow).join("");
+    if(nextUrl) tbody.insertAdjacentHTML("beforeend", rows);
+    else tbody.innerHTML = rows || `<tr><td colspan="5" class="text-secondary">No alerts</td></tr>`;
+    setMoreButton("alertsMore", data.next, loadAlerts);
   }
 
   function initAlertsPage(){
@@ -217,17 +340,8 @@ window.MONITOR = (() => {
   }
 
   // ---------- CASES ----------
-  async function loadCases(){
-    const tbody = document.getElementById("casesTbody");
-    if(!tbody) return;
-    const params = readFormParams("caseFilterForm");
-    const qs = new URLSearchParams(location.search);
-    for(const [k,v] of qs.entries()){
-      if(!params.has(k) && v) params.set(k,v);
-    }
-    const url = "/api/cases/?" + params.toString();
-    const data = await fetchJSON(url);
-    const rows = data.map(c => `
+  function caseRow(c){
+    return `
       <tr>
         <td><a class="link-light" href="/cases/${c.id}/">CASE-${c.id}</a></td>
         <td>${new Date(c.created_at).toLocaleTimeString()}</td>
@@ -237,8 +351,23 @@ window.MONITOR = (() => {
         <td>${c.status}</td>
         <td>${c.verdict}</td>
       </tr>
-    `).join("");
-    tbody.innerHTML = rows || `<tr><td colspan="7" class="text-secondary">No cases</td></tr>`;
+    `;
+  }
+
+  async function loadCases(nextUrl=null){
+    const tbody = document.getElementById("casesTbody");
+    if(!tbody) return;
+    const params = readFormParams("caseFilterForm");
+    const qs = new URLSearchParams(location.search);
+    for(const [k,v] of qs.entries()){
+      if(!params.has(k) && v) params.set(k,v);
+    }
+    const url = nextUrl || "/api/cases/?" + params.toString();
+    const data = await fetchJSON(url);
+    const rows = data.results.map(caseRow).join("");
+    if(nextUrl) tbody.insertAdjacentHTML("beforeend", rows);
+    else tbody.innerHTML = rows || `<tr><td colspan="7" class="text-secondary">No cases</td></tr>`;
+    setMoreButton("casesMore", data.next, loadCases);
   }
 
   function initCasesPage(){